@@ -4,9 +4,14 @@ AI模块
 """
 
 from game_platform.ai.base import AIStrategy
+from game_platform.ai.stats import SearchStats
+from game_platform.ai.handle import SearchCancelled, SearchHandle
+from game_platform.ai.cache import CacheSnapshot, TranspositionTable
 from game_platform.ai.factory import AIFactory
 from game_platform.ai.random_ai import RandomAI
 from game_platform.ai.eval_ai import EvalAI
 from game_platform.ai.mcts_ai import MCTSAI
+from game_platform.ai.uct_ai import UCTAI
+from game_platform.ai.service import AIService
 
-__all__ = ['AIStrategy', 'AIFactory', 'RandomAI', 'EvalAI', 'MCTSAI']
\ No newline at end of file
+__all__ = ['AIStrategy', 'SearchStats', 'SearchHandle', 'SearchCancelled', 'TranspositionTable', 'CacheSnapshot', 'AIFactory', 'RandomAI', 'EvalAI', 'MCTSAI', 'UCTAI', 'AIService']
\ No newline at end of file
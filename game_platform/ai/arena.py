@@ -0,0 +1,368 @@
+"""
+AI对战竞技场：无界面批量进行AI对AI的对局，并估算Elo差
+
+用法:
+    python -m game_platform.ai.arena --game gomoku --size 15 -a 2 -b 3:max_depth=2 \
+        --games 200 --workers 4 --out arena.jsonl
+    
+    --cache-dir 指定 AI 服务写出的置换表快照目录时，各工作进程只读映射同一快照文件。
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from game_platform.ai.cache import CacheSnapshot, TranspositionTable, snapshot_path
+from game_platform.ai.factory import AIFactory
+from game_platform.game import GAME_CLASSES, GomokuGame
+from game_platform.replay.recorder import GameRecorder
+
+
+class ArenaEntrant:
+    """参赛AI：AI等级加构造参数"""
+    
+    def __init__(self, level, options=None, name=None):
+        self.level = level
+        self.options = options or {}
+        self.name = name or self._default_name()
+    
+    def _default_name(self):
+        name = f"Lv{self.level}"
+        if self.options:
+            name += '(' + ','.join(f"{k}={v}" for k, v in sorted(self.options.items())) + ')'
+        return name
+    
+    @classmethod
+    def parse(cls, text):
+        """解析 "3" 或 "3:max_depth=2" 形式的描述"""
+        level_text, _, option_text = text.partition(':')
+        options = {}
+        for item in filter(None, option_text.split(',')):
+            key, _, value = item.partition('=')
+            try:
+                options[key] = int(value)
+            except ValueError:
+                try:
+                    options[key] = float(value)
+                except ValueError:
+                    options[key] = value
+        return cls(int(level_text), options)
+    
+    def key(self):
+        """用于缓存AI实例的键"""
+        return self.level, tuple(sorted(self.options.items()))
+
+
+class _ArenaPlayer:
+    """供 GameRecorder 记录玩家信息的轻量玩家对象"""
+    
+    user = None
+    
+    def __init__(self, entrant):
+        self.name = entrant.name
+        self.level = entrant.level
+    
+    def is_human(self):
+        return False
+
+
+# 每个工作进程内缓存的AI实例 {(game_type, entrant.key()): AIStrategy}
+_worker_strategies = {}
+# 工作进程内的置换表（仅在指定快照时使用）
+_worker_table = None
+
+
+def _init_worker(snapshot_file):
+    """工作进程初始化：只读映射置换表快照"""
+    global _worker_table
+    if snapshot_file is None:
+        return
+    snapshot = CacheSnapshot.load(snapshot_file)
+    if snapshot is not None:
+        _worker_table = TranspositionTable(snapshot=snapshot)
+
+
+def _get_strategy(game_type, entrant):
+    """获取（并缓存）工作进程内的AI实例"""
+    key = (game_type, entrant.key())
+    strategy = _worker_strategies.get(key)
+    if strategy is None:
+        strategy = AIFactory.create_ai(game_type, entrant.level, **entrant.options)
+        if _worker_table is not None:
+            strategy.transposition_table = _worker_table
+        _worker_strategies[key] = strategy
+    return strategy
+
+
+def random_opening(game, plies, rng):
+    """随机开局：五子棋限定在天元附近，其他棋类在合法位置中随机"""
+    center = game.board_size // 2
+    for _ in range(plies):
+        if game.game_over:
+            break
+        valid_moves = game.get_valid_moves()
+        if isinstance(game, GomokuGame):
+            valid_moves = [(r, c) for r, c in valid_moves
+                           if abs(r - center) <= 2 and abs(c - center) <= 2]
+        if not valid_moves:
+            break
+        row, col = rng.choice(valid_moves)
+        try:
+            game.make_move(row, col)
+        except ValueError:
+            break
+
+
+def play_game(game_type, board_size, black, white, opening_plies=0, seed=None,
+              record_dir=None, max_moves=None, black_slot=None):
+    """进行一局AI对局
+    
+    Args:
+        game_type: 游戏类型
+        board_size: 棋盘大小
+        black: 执黑的 ArenaEntrant
+        white: 执白的 ArenaEntrant
+        opening_plies: 随机开局步数
+        seed: 随机种子
+        record_dir: 录像保存目录（None 表示不录像）
+        max_moves: 最大步数，超过判和
+        black_slot: 执黑方是对局组中的 'a' 还是 'b'（记入结果，供 summarize 统计）
+    
+    Returns:
+        dict: 对局结果
+    """
+    rng = random.Random(seed)
+    game = GAME_CLASSES[game_type](board_size)
+    random_opening(game, opening_plies, rng)
+    max_moves = max_moves or board_size * board_size * 2
+    
+    recorder = None
+    if record_dir:
+        recorder = GameRecorder()
+        recorder.start_recording(game, _ArenaPlayer(black), _ArenaPlayer(white))
+    
+    strategies = {
+        'black': _get_strategy(game_type, black),
+        'white': _get_strategy(game_type, white),
+    }
+    nodes = {'black': 0, 'white': 0}
+    think_time = {'black': 0.0, 'white': 0.0}
+    error = None
+    start_time = time.perf_counter()
+    
+    while not game.game_over and len(game.move_history) < max_moves:
+        color = game.current_player
+        strategy = strategies[color]
+        move = strategy.search(game, color)
+        nodes[color] += strategy.stats.nodes
+        think_time[color] += strategy.stats.time_spent
+        
+        try:
+            if move is None:
+                if not hasattr(game, 'pass_move'):
+                    break
+                game.pass_move()
+            else:
+                game.make_move(move[0], move[1])
+        except ValueError as e:
+            # 非法落子判负
+            error = f"{color}: {e}"
+            game.game_over = True
+            game.winner = 'white' if color == 'black' else 'black'
+            break
+        
+        if recorder:
+            recorder.record_move(game, game.move_history[-1])
+    
+    winner = game.winner if game.game_over else 'draw'
+    result = {
+        'game_type': game_type,
+        'board_size': board_size,
+        'seed': seed,
+        'black': black.name,
+        'white': white.name,
+        'winner': winner or 'draw',
+        'moves': len(game.move_history),
+        'seconds': time.perf_counter() - start_time,
+        'nodes': nodes,
+        'think_time': think_time,
+    }
+    if black_slot:
+        result['black_slot'] = black_slot
+    if error:
+        result['error'] = error
+    
+    if recorder:
+        recorder.stop_recording(game)
+        filename = os.path.join(record_dir, f"arena_{game_type}_{seed}")
+        result['replay'] = recorder.save_to_file(filename)
+    
+    return result
+
+
+def _play_task(task):
+    """进程池任务入口"""
+    return play_game(**task)
+
+
+def elo_difference(score):
+    """由得分率计算Elo差"""
+    if score <= 0:
+        return float('-inf')
+    if score >= 1:
+        return float('inf')
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(results, name_a, name_b, z=1.96):
+    """统计 A 对 B 的胜/和/负、Elo差及其置信区间
+    
+    按结果中的 black_slot 区分双方，双方同名（如 -a 2 -b 2）时也能正确计分；
+    没有 black_slot 的旧结果按名字区分。
+    
+    Elo差及其区间由加一局虚拟和棋后的得分率换算，区间为 Wilson 区间：
+    全胜或全负（如 Lv3 对 Lv1）时也能给出有限的估计，而不是 ±inf。
+    """
+    wins = draws = losses = 0
+    for result in results:
+        winner = result['winner']
+        if winner == 'draw':
+            draws += 1
+            continue
+        black_slot = result.get('black_slot')
+        if black_slot:
+            a_won = (winner == 'black') == (black_slot == 'a')
+        else:
+            a_won = result[winner] == name_a
+        if a_won:
+            wins += 1
+        else:
+            losses += 1
+    
+    games = wins + draws + losses
+    summary = {
+        'a': name_a,
+        'b': name_b,
+        'games': games,
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+    }
+    if games == 0:
+        return summary
+    
+    score = (wins + 0.5 * draws) / games
+    # 虚拟和棋先验
+    n = games + 1
+    p = (wins + 0.5 * draws + 0.5) / n
+    # Wilson 区间
+    z2 = z * z
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    margin = z / (1 + z2 / n) * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n))
+    
+    summary['score'] = score
+    summary['elo'] = elo_difference(p)
+    summary['elo_low'] = elo_difference(center - margin)
+    summary['elo_high'] = elo_difference(center + margin)
+    return summary
+
+
+def run_match(game_type, board_size, entrant_a, entrant_b, games, workers=None,
+              opening_plies=2, seed=0, out_file=None, record_dir=None, on_result=None,
+              cache_dir=None):
+    """用进程池运行一组对局（双方轮流执黑）
+    
+    Args:
+        out_file: 结果逐局追加写入的 JSON Lines 文件
+        record_dir: 录像保存目录（None 表示不录像）
+        on_result: 每局结束后的回调
+        cache_dir: 置换表快照目录（只读，None 表示不使用）
+    
+    Returns:
+        dict: summarize 的统计结果
+    """
+    tasks = []
+    for i in range(games):
+        black, white = (entrant_a, entrant_b) if i % 2 == 0 else (entrant_b, entrant_a)
+        tasks.append({
+            'black_slot': 'a' if i % 2 == 0 else 'b',
+            'game_type': game_type,
+            'board_size': board_size,
+            'black': black,
+            'white': white,
+            'opening_plies': opening_plies,
+            'seed': seed + i,
+            'record_dir': record_dir,
+        })
+    
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(16, games // (workers * 4)))
+    results = []
+    out = open(out_file, 'a', encoding='utf-8') if out_file else None
+    try:
+        snapshot_file = snapshot_path(cache_dir, game_type) if cache_dir else None
+        with multiprocessing.Pool(workers, _init_worker, (snapshot_file,)) as pool:
+            for result in pool.imap_unordered(_play_task, tasks, chunksize):
+                results.append(result)
+                if out:
+                    out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    out.flush()
+                if on_result:
+                    on_result(result)
+    finally:
+        if out:
+            out.close()
+    
+    return summarize(results, entrant_a.name, entrant_b.name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI对战竞技场")
+    parser.add_argument('--game', default='gomoku', choices=sorted(GAME_CLASSES))
+    parser.add_argument('--size', type=int, default=None, help="棋盘大小")
+    parser.add_argument('-a', default='2', help="AI A，如 3 或 3:max_depth=2")
+    parser.add_argument('-b', default='1', help="AI B")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument('--opening', type=int, default=2, help="随机开局步数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="结果输出文件（JSON Lines）")
+    parser.add_argument('--record', default=None, help="录像保存目录")
+    parser.add_argument('--cache-dir', default=None, help="置换表快照目录（只读）")
+    args = parser.parse_args(argv)
+    
+    board_size = args.size or {'gomoku': 15, 'go': 9, 'othello': 8}[args.game]
+    entrant_a = ArenaEntrant.parse(args.a)
+    entrant_b = ArenaEntrant.parse(args.b)
+    
+    finished = [0]
+    
+    def progress(result):
+        finished[0] += 1
+        if finished[0] % 10 == 0 or finished[0] == args.games:
+            print(f"已完成 {finished[0]}/{args.games} 局")
+    
+    start = time.perf_counter()
+    summary = run_match(args.game, board_size, entrant_a, entrant_b, args.games,
+                        workers=args.workers, opening_plies=args.opening, seed=args.seed,
+                        out_file=args.out, record_dir=args.record, on_result=progress,
+                        cache_dir=args.cache_dir)
+    elapsed = time.perf_counter() - start
+    
+    print(f"{summary['a']} 对 {summary['b']}: "
+          f"{summary['wins']}胜 {summary['draws']}和 {summary['losses']}负")
+    if summary['games']:
+        print(f"得分率 {summary['score']:.3f}, Elo差 {summary['elo']:+.0f} "
+              f"(95%置信区间 {summary['elo_low']:+.0f} ~ {summary['elo_high']:+.0f})")
+        print(f"用时 {elapsed:.1f}s, {summary['games'] / elapsed:.1f} 局/秒")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -1,14 +1,29 @@
-# game_platform/ai/base.py
 """
 AI策略基类
+设计模式：策略模式、模板方法模式
 """
 
+import cProfile
 from abc import ABC, abstractmethod
+from game_platform.ai.stats import SearchStats
 
 
 class AIStrategy(ABC):
     """AI策略基类"""
     
+    _stats = None
+    
+    # 可选的性能剖析器：任何带 enable()/disable() 的对象（如 cProfile.Profile）
+    profiler = None
+    
+    # 当前搜索的控制句柄（SearchHandle），用于取消搜索和汇报当前最佳落子
+    handle = None
+    
+    # 可选的置换表（TranspositionTable），缓存局面的搜索结果，可在多个AI间共享
+    transposition_table = None
+    # 落子结果是否可以缓存（结果带随机性的AI应设为 False）
+    cacheable = True
+    
     @abstractmethod
     def get_move(self, game, color):
         """获取AI的落子位置"""
@@ -17,4 +32,115 @@ class AIStrategy(ABC):
     @abstractmethod
     def get_level(self):
         """获取AI等级"""
-        pass
\ No newline at end of file
+        pass
+    
+    @property
+    def stats(self):
+        """当前（或最近一次）搜索的统计"""
+        if self._stats is None:
+            self._stats = SearchStats()
+        return self._stats
+    
+    def reset_stats(self):
+        """开始一份新的统计并返回"""
+        self._stats = SearchStats()
+        return self._stats
+    
+    def search(self, game, color, handle=None):
+        """带统计的落子入口（模板方法）
+        
+        每次调用都会新建一份统计，get_move 执行期间由子类填充。
+        传入 handle 时，搜索可被 handle.cancel() 提前中止，
+        此时返回已找到的最佳落子。
+        """
+        stats = self.reset_stats()
+        stats.start()
+        
+        table = self.transposition_table if self.cacheable else None
+        if table is not None:
+            move = self._probe_table(table, game, color)
+            if move is not None:
+                stats.tt_hits += 1
+                stats.stop()
+                stats.move = move
+                return move
+        
+        self.handle = handle
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enable()
+        try:
+            move = self.get_move(game, color)
+            complete = not self.is_cancelled()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            stats.stop()
+            self.handle = None
+        
+        stats.move = move
+        if isinstance(profiler, cProfile.Profile):
+            stats.attach_profile(profiler)
+        # 被取消的搜索结果不完整，不写入置换表
+        if table is not None and move is not None and complete:
+            self._store_table(table, game, color, move)
+        return move
+    
+    def cache_key(self):
+        """区分AI配置的键，使不同等级/参数的AI可共享同一置换表"""
+        return (self.get_level(),)
+    
+    def _probe_table(self, table, game, color):
+        """在置换表中查找当前局面的落子（按规范局面匹配对称局面）"""
+        key, transform = game.board.get_canonical_key()
+        canonical_move = table.get((key, color, self.cache_key()))
+        if canonical_move is None:
+            return None
+        
+        move = game.board.inverse_transform_position(
+            canonical_move[0], canonical_move[1], transform)
+        # 规范编码不含打劫等状态，命中后仍需确认落子合法
+        if move not in game.get_valid_moves():
+            return None
+        return move
+    
+    def _store_table(self, table, game, color, move):
+        """将落子以规范坐标写入置换表"""
+        key, transform = game.board.get_canonical_key()
+        table.put((key, color, self.cache_key()),
+                  game.board.transform_position(move[0], move[1], transform))
+    
+    def is_cancelled(self):
+        """当前搜索是否已被取消（供子类在搜索循环中检查）"""
+        handle = self.handle
+        return handle is not None and handle.cancelled()
+    
+    def report_best(self, move, score=None):
+        """汇报搜索过程中的当前最佳落子"""
+        stats = self.stats
+        stats.move = move
+        stats.score = score
+        handle = self.handle
+        if handle is not None:
+            handle.report_best(move, score)
+    
+    def enable_profiling(self, profiler=None):
+        """开启性能剖析（默认使用cProfile）"""
+        self.profiler = profiler or cProfile.Profile()
+    
+    def disable_profiling(self):
+        """关闭性能剖析"""
+        self.profiler = None
+    
+    def rank_moves(self, game, color):
+        """按廉价的启发式从好到坏排列某方的落子（不做搜索）
+        
+        默认使用二级AI的一层评估，子类可改用自己搜索时的走法排序。
+        """
+        # eval_ai 依赖本模块，在这里导入
+        from game_platform.ai.eval_ai import EvalAI
+        return EvalAI().rank_moves(game, color)
+    
+    def predict_moves(self, game, color, limit=1):
+        """预测某方最可能的 limit 个落子（供后台预读使用），取 rank_moves 的前几个"""
+        return self.rank_moves(game, color)[:limit]
\ No newline at end of file
@@ -0,0 +1,337 @@
+"""
+AI落子耗时基准测试套件
+
+在固定的五子棋、黑白棋、围棋测试局面（开局/中局/战术/残局）上运行各等级AI，
+统计每步耗时的 p50/p95/p99、每秒节点数和峰值内存。结果可保存为JSON，
+也可与之前保存的基线比较，性能退化超过阈值时以非零状态退出。
+
+用法:
+    python -m game_platform.ai.benchmark [--game othello] [--level 3] [--repeats 10]
+        [--out bench.json] [--baseline baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from game_platform.ai.factory import AIFactory
+from game_platform.game import GAME_CLASSES
+
+
+# 测试对局棋谱：(棋盘大小, 落子序列)，None 表示虚着
+# 各测试局面取棋谱的前若干步，保证局面固定且可复现
+GAME_RECORDS = {
+    'gomoku': (15, [
+        (5, 9), (8, 9), (6, 8), (7, 7), (7, 8), (8, 8), (8, 7), (9, 9), (6, 6), (7, 9),
+        (10, 9), (9, 8), (9, 7), (10, 7), (7, 10), (6, 9), (10, 10), (11, 6), (12, 5), (10, 11),
+        (9, 10), (8, 10), (8, 11), (11, 8), (10, 8), (11, 9), (11, 7), (9, 6), (12, 9), (10, 6),
+        (12, 6), (8, 6), (7, 6), (8, 5), (7, 4), (12, 7),
+    ]),
+    'othello': (8, [
+        (3, 2), (4, 2), (5, 2), (2, 2), (2, 3), (2, 4), (2, 5), (5, 3), (5, 4), (2, 6),
+        (1, 3), (0, 2), (2, 7), (5, 5), (4, 5), (3, 5), (3, 6), (5, 1), (0, 3), (0, 4),
+        (6, 2), (7, 2), (5, 0), (4, 6), (1, 5), (0, 5), (4, 7), (5, 7), (7, 3), (3, 7),
+        (6, 3), (7, 4), (3, 1), (3, 0), (2, 0), (4, 1), (4, 0), (1, 4), (2, 1), (1, 2),
+        (5, 6), (6, 4), (7, 5), (6, 5), (7, 1), (1, 7), (7, 6), (6, 0), (7, 0), (6, 1),
+        (0, 6), (0, 7),
+    ]),
+    'go': (9, [
+        (1, 8), (8, 1), (2, 2), (6, 2), (4, 2), (5, 2), (3, 2), (5, 3), (3, 3), (4, 3),
+        (2, 3), (3, 5), (2, 4), (2, 5), (3, 4), (2, 6), (4, 6), (3, 6), (4, 5), (5, 4),
+        (5, 5), (1, 5), (1, 3), (1, 4), (1, 1), (1, 6), (1, 2), (1, 7), (4, 1), (2, 8),
+        (3, 8), (2, 7), (4, 4), (0, 8), (4, 7), (3, 7), (4, 8), (5, 1), (3, 1), (6, 1),
+        (5, 6), (6, 4), (5, 7), (6, 5), (6, 6), (7, 5), (6, 7), (7, 6), (7, 7), (0, 4),
+        (0, 2), (0, 3), (0, 1), (5, 0), (3, 0), (4, 0),
+    ]),
+}
+
+# 测试局面：(阶段, 棋谱步数)
+POSITIONS = {
+    'gomoku': [
+        ('opening', 4),     # 开局，三级AI完整搜索
+        ('midgame', 20),    # 中局，候选点多
+        ('tactical', 10),   # 对手冲四/双三，需要防守
+        ('endgame', 36),    # 棋子密集，双方均有威胁
+    ],
+    'othello': [
+        ('opening', 6),
+        ('midgame', 26),    # 合法落子最多的阶段
+        ('tactical', 48),   # 可抢占角
+        ('endgame', 52),
+    ],
+    'go': [
+        ('opening', 6),
+        ('midgame', 24),
+        ('tactical', 31),   # 双方都有被打吃的棋块
+        ('endgame', 56),
+    ],
+}
+
+PHASE_NAMES = {
+    'opening': '开局',
+    'midgame': '中局',
+    'tactical': '战术',
+    'endgame': '残局',
+}
+
+GAME_NAMES = {
+    'gomoku': '五子棋',
+    'othello': '黑白棋',
+    'go': '围棋',
+}
+
+# 基线比较的指标及其最小有效差值（小于该差值视为测量噪声）
+REGRESSION_METRICS = {
+    'p50_ms': 0.25,
+    'p95_ms': 0.25,
+    'peak_kb': 64.0,
+}
+
+
+def load_position(game_type, plies):
+    """按棋谱前 plies 步构造测试局面"""
+    board_size, moves = GAME_RECORDS[game_type]
+    game = GAME_CLASSES[game_type](board_size)
+    for move in moves[:plies]:
+        if move is None:
+            game.pass_move()
+        else:
+            game.make_move(move[0], move[1])
+    return game
+
+
+def measure_latency(strategy, game, color, repeats=50):
+    """重复搜索同一局面，返回每次的搜索统计列表"""
+    results = []
+    for _ in range(repeats):
+        strategy.search(game, color)
+        results.append(strategy.stats)
+    return results
+
+
+def measure_peak_memory(strategy, game, color):
+    """用 tracemalloc 测量一次搜索的峰值内存（字节）
+    
+    每次测量重新 start/stop 以清零峰值（tracemalloc.reset_peak 需要 Python 3.9）。
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        tracemalloc.stop()
+    tracemalloc.start()
+    try:
+        start_size = tracemalloc.get_traced_memory()[0]
+        strategy.search(game, color)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if was_tracing:
+            tracemalloc.start()
+    return max(0, peak - start_size)
+
+
+def percentile(values, pct):
+    """线性插值的百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def benchmark_position(strategy, game_type, phase, plies, repeats=10, warmup=1,
+                       measure_memory=True):
+    """在一个测试局面上测量AI，返回结果字典"""
+    game = load_position(game_type, plies)
+    color = game.current_player
+    
+    # 预热：填充各类缓存，不计入统计
+    for _ in range(warmup):
+        strategy.search(game, color)
+    
+    results = measure_latency(strategy, game, color, repeats)
+    timings = [stats.time_spent * 1000 for stats in results]
+    total_time = sum(stats.time_spent for stats in results)
+    total_nodes = sum(stats.nodes for stats in results)
+    
+    entry = {
+        'game': game_type,
+        'level': strategy.get_level(),
+        'position': phase,
+        'plies': plies,
+        'samples': len(timings),
+        'mean_ms': sum(timings) / len(timings),
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings),
+        'nodes': total_nodes // len(results),
+        'nodes_per_second': total_nodes / total_time if total_time > 0 else 0.0,
+    }
+    
+    # 固定随机种子再搜索一次，记录落子以便和基线对照行为是否改变
+    random.seed(plies)
+    if measure_memory:
+        entry['peak_kb'] = measure_peak_memory(strategy, game, color) / 1024
+    else:
+        strategy.search(game, color)
+    move = strategy.stats.move
+    entry['move'] = list(move) if move else None
+    return entry
+
+
+def run_suite(games=None, levels=None, repeats=10, warmup=1, measure_memory=True,
+              on_result=None):
+    """运行基准测试套件
+    
+    Args:
+        games: 参与测试的游戏类型（默认全部）
+        levels: 参与测试的AI等级（默认 AIFactory 的全部等级）
+        repeats: 每个局面的计时次数
+        warmup: 每个局面的预热次数
+        measure_memory: 是否测量峰值内存
+        on_result: 每个局面测完后的回调
+    
+    Returns:
+        dict: 测试报告（可直接保存为JSON）
+    """
+    games = games or list(POSITIONS)
+    levels = levels or AIFactory.get_available_levels()
+    
+    results = []
+    for game_type in games:
+        for level in levels:
+            if level not in AIFactory.get_available_levels(game_type):
+                continue
+            strategy = AIFactory.create_ai(game_type, level)
+            for phase, plies in POSITIONS[game_type]:
+                entry = benchmark_position(strategy, game_type, phase, plies, repeats,
+                                           warmup, measure_memory)
+                results.append(entry)
+                if on_result:
+                    on_result(entry)
+    
+    return {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeats': repeats,
+        'results': results,
+    }
+
+
+def _entry_key(entry):
+    return entry['game'], entry['level'], entry['position']
+
+
+def compare_reports(report, baseline, threshold=0.2):
+    """与基线报告比较
+    
+    某项指标比基线增大超过 threshold（比例）且超过该指标的最小有效差值时记为退化。
+    
+    Returns:
+        tuple: (退化列表, 落子变化列表)
+    """
+    baseline_entries = {_entry_key(entry): entry for entry in baseline.get('results', [])}
+    regressions = []
+    changed_moves = []
+    
+    for entry in report['results']:
+        old = baseline_entries.get(_entry_key(entry))
+        if old is None:
+            continue
+        
+        for metric, min_delta in REGRESSION_METRICS.items():
+            if metric not in entry or metric not in old:
+                continue
+            new_value, old_value = entry[metric], old[metric]
+            delta = new_value - old_value
+            if delta > max(old_value * threshold, min_delta):
+                regressions.append({
+                    'game': entry['game'],
+                    'level': entry['level'],
+                    'position': entry['position'],
+                    'metric': metric,
+                    'baseline': old_value,
+                    'current': new_value,
+                    'ratio': new_value / old_value if old_value else float('inf'),
+                })
+        
+        if entry.get('move') != old.get('move'):
+            changed_moves.append((entry, old))
+    
+    return regressions, changed_moves
+
+
+def format_entry(entry):
+    """格式化一条测试结果"""
+    text = (f"  Lv{entry['level']} {PHASE_NAMES[entry['position']]}({entry['plies']}步): "
+            f"p50 {entry['p50_ms']:.3f}ms, p95 {entry['p95_ms']:.3f}ms, "
+            f"p99 {entry['p99_ms']:.3f}ms, {entry['nodes_per_second']:.0f} 节点/秒")
+    if 'peak_kb' in entry:
+        text += f", 峰值内存 {entry['peak_kb']:.1f}KB"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI落子耗时基准测试套件")
+    parser.add_argument('--game', action='append', choices=sorted(POSITIONS),
+                        help="只测试指定游戏（可重复）")
+    parser.add_argument('--level', type=int, action='append',
+                        choices=AIFactory.get_available_levels(),
+                        help="只测试指定AI等级（可重复）")
+    parser.add_argument('--repeats', type=int, default=10, help="每个局面的计时次数")
+    parser.add_argument('--warmup', type=int, default=1, help="每个局面的预热次数")
+    parser.add_argument('--no-memory', action='store_true', help="不测量峰值内存")
+    parser.add_argument('--out', default=None, help="结果输出文件（JSON），可作为基线")
+    parser.add_argument('--baseline', default=None, help="用于比较的基线文件（JSON）")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="允许的退化比例，默认0.2即20%%")
+    args = parser.parse_args(argv)
+    
+    current_game = [None]
+    
+    def progress(entry):
+        if entry['game'] != current_game[0]:
+            current_game[0] = entry['game']
+            print(f"{GAME_NAMES[entry['game']]}:")
+        print(format_entry(entry))
+    
+    report = run_suite(args.game, args.level, args.repeats, args.warmup,
+                       not args.no_memory, on_result=progress)
+    
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.out}")
+    
+    if not args.baseline:
+        return 0
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions, changed_moves = compare_reports(report, baseline, args.threshold)
+    
+    for entry, old in changed_moves:
+        print(f"注意: {GAME_NAMES[entry['game']]} Lv{entry['level']} "
+              f"{PHASE_NAMES[entry['position']]} 落子由 {old.get('move')} 变为 {entry.get('move')}")
+    
+    if not regressions:
+        print(f"与基线相比无超过 {args.threshold:.0%} 的性能退化")
+        return 0
+    
+    print(f"发现 {len(regressions)} 项性能退化:")
+    for item in regressions:
+        print(f"  {GAME_NAMES[item['game']]} Lv{item['level']} {PHASE_NAMES[item['position']]} "
+              f"{item['metric']}: {item['baseline']:.3f} -> {item['current']:.3f} "
+              f"({item['ratio']:.2f}x)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
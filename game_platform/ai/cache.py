@@ -0,0 +1,229 @@
+"""
+AI置换表：按局面缓存搜索结果，可在多个AI实例、多个线程间共享
+
+置换表可挂载一个只读的磁盘快照（CacheSnapshot），内存中未命中时再查快照。
+快照文件通过 mmap 只读映射，多个工作进程加载同一文件时共享操作系统的页缓存。
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+
+def snapshot_path(cache_dir, game_type):
+    """某游戏类型的置换表快照文件路径"""
+    return os.path.join(cache_dir, f"{game_type}.tt")
+
+
+class CacheSnapshot:
+    """置换表的只读磁盘快照
+    
+    文件格式（小端）:
+        文件头 16 字节: 魔数 b'GPTT'、版本号、记录数、保留字段
+        记录 10 字节:   键的 64 位哈希、落子行、落子列
+    记录按哈希升序排列，查找时直接在映射内存上二分，无需反序列化整个文件。
+    """
+    
+    MAGIC = b'GPTT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sIII')
+    RECORD = struct.Struct('<QBB')
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._file.close()
+            raise ValueError(f"无效的置换表快照: {path}")
+        
+        magic, version, count, _ = self.HEADER.unpack_from(self._map, 0)
+        expected_size = self.HEADER.size + count * self.RECORD.size
+        if magic != self.MAGIC or version != self.VERSION or len(self._map) != expected_size:
+            self.close()
+            raise ValueError(f"无效的置换表快照: {path}")
+        self._count = count
+    
+    @staticmethod
+    def hash_key(key):
+        """置换表键的64位哈希（跨进程稳定，不受 PYTHONHASHSEED 影响）"""
+        digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+    
+    @classmethod
+    def encode_value(cls, value):
+        """可写入快照的值（落子坐标），不可写入时返回 None"""
+        if (isinstance(value, tuple) and len(value) == 2
+                and all(isinstance(v, int) and 0 <= v < 256 for v in value)):
+            return value
+        return None
+    
+    def get(self, key):
+        """按键查找，未找到返回 None"""
+        return self.get_hashed(self.hash_key(key))
+    
+    def get_hashed(self, key_hash):
+        """按键的哈希查找"""
+        record = self.RECORD
+        data = self._map
+        offset = self.HEADER.size
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            h, row, col = record.unpack_from(data, offset + mid * record.size)
+            if h < key_hash:
+                low = mid + 1
+            elif h > key_hash:
+                high = mid
+            else:
+                return row, col
+        return None
+    
+    def items(self):
+        """遍历所有 (键哈希, 值)"""
+        record = self.RECORD
+        for h, row, col in record.iter_unpack(self._map[self.HEADER.size:]):
+            yield h, (row, col)
+    
+    def close(self):
+        """关闭映射"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    
+    def __len__(self):
+        return self._count
+    
+    @classmethod
+    def write(cls, path, items):
+        """写入快照文件
+        
+        先写临时文件再原子替换，已映射旧文件的进程不受影响。
+        
+        Args:
+            path: 文件路径
+            items: {键哈希: 落子坐标}
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(items), 0))
+            record = cls.RECORD
+            for key_hash in sorted(items):
+                row, col = items[key_hash]
+                f.write(record.pack(key_hash, row, col))
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """加载快照，文件不存在或无效时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+
+class TranspositionTable:
+    """线程安全的置换表
+    
+    键由调用方决定（通常为规范局面编码、执子方和AI配置），
+    表满时淘汰最久未使用的条目（LRU）。
+    """
+    
+    def __init__(self, max_entries=100000, snapshot=None):
+        """
+        Args:
+            max_entries: 内存中的最大条目数
+            snapshot: 只读的磁盘快照（CacheSnapshot），内存未命中时查找
+        """
+        self.max_entries = max_entries
+        self.snapshot = snapshot
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.snapshot_hits = 0
+    
+    def get(self, key):
+        """查找条目，未命中返回 None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        
+        snapshot = self.snapshot
+        value = snapshot.get(key) if snapshot is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.snapshot_hits += 1
+        return value
+    
+    def put(self, key, value):
+        """写入条目"""
+        with self._lock:
+            entries = self._entries
+            if key in entries:
+                entries.move_to_end(key)
+            elif len(entries) >= self.max_entries:
+                # 最久未使用的条目在最前面
+                entries.popitem(last=False)
+            entries[key] = value
+    
+    def clear(self):
+        """清空内存中的条目（不影响快照）"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.snapshot_hits = 0
+    
+    def items(self):
+        """内存中的条目列表（从最久未使用到最近使用）"""
+        with self._lock:
+            return list(self._entries.items())
+    
+    def merge(self, items, hits=0, misses=0, snapshot_hits=0):
+        """合并另一张置换表的条目与命中统计（如工作进程退出时发回的置换表）"""
+        for key, value in items:
+            self.put(key, value)
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.snapshot_hits += snapshot_hits
+    
+    def save_snapshot(self, path):
+        """将快照与内存中的条目合并写入快照文件
+        
+        Returns:
+            int: 写入的条目数
+        """
+        items = {}
+        if self.snapshot is not None:
+            items.update(self.snapshot.items())
+        for key, value in self.items():
+            value = CacheSnapshot.encode_value(value)
+            if value is not None:
+                items[CacheSnapshot.hash_key(key)] = value
+        CacheSnapshot.write(path, items)
+        return len(items)
+    
+    @property
+    def hit_rate(self):
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def __len__(self):
+        return len(self._entries)
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+候选落子生成：增量维护棋子邻域内的空位
+"""
+
+from bisect import bisect_left, insort
+
+
+# 邻域下标表缓存 {(size, radius, shape): [[flat_index, ...], ...]}
+_NEIGHBOR_TABLES = {}
+
+
+def get_neighbor_table(size, radius=2, shape='square'):
+    """获取每个格子邻域内的扁平下标列表（按参数缓存）"""
+    return CandidateGenerator._get_neighbor_table(size, radius, shape)
+
+
+class CandidateGenerator:
+    """增量维护的候选落子集合
+    
+    每个格子记录其邻域内的棋子数（引用计数），计数大于0的空位即为候选点。
+    落子和撤销时只更新该棋子邻域内的计数和有序的候选点列表，
+    不再每次扫描整个棋盘，取候选点时也无需求差集或重新排序。
+    
+    邻域形状:
+        square:  切比雪夫距离不超过 radius 的方形区域
+        diamond: 曼哈顿距离不超过 radius 的菱形区域
+        star:    radius 以内的横、竖、两条斜线（米字形）
+    """
+    
+    SHAPES = ('square', 'diamond', 'star')
+    
+    def __init__(self, size, radius=2, shape='square'):
+        if shape not in self.SHAPES:
+            raise ValueError(f"未知的候选点形状: {shape}")
+        if radius < 1:
+            raise ValueError("候选点半径至少为1")
+        self.size = size
+        self.radius = radius
+        self.shape = shape
+        self._neighbors = self._get_neighbor_table(size, radius, shape)
+        self._counts = [0] * (size * size)
+        self._occupied = bytearray(size * size)  # 已落子的格子为1
+        self._stone_count = 0
+        self._active = []  # 计数大于0的空位，按下标升序
+        self._coords = [divmod(k, size) for k in range(size * size)]
+    
+    @staticmethod
+    def _in_shape(dr, dc, radius, shape):
+        """偏移 (dr, dc) 是否属于邻域"""
+        if shape == 'square':
+            return max(abs(dr), abs(dc)) <= radius
+        if shape == 'diamond':
+            return abs(dr) + abs(dc) <= radius
+        return max(abs(dr), abs(dc)) <= radius and (dr == 0 or dc == 0 or abs(dr) == abs(dc))
+    
+    @classmethod
+    def _get_neighbor_table(cls, size, radius, shape):
+        """获取每个格子邻域内的扁平下标列表（按参数缓存）"""
+        key = (size, radius, shape)
+        table = _NEIGHBOR_TABLES.get(key)
+        if table is None:
+            offsets = [(dr, dc)
+                       for dr in range(-radius, radius + 1)
+                       for dc in range(-radius, radius + 1)
+                       if (dr or dc) and cls._in_shape(dr, dc, radius, shape)]
+            table = []
+            for row in range(size):
+                for col in range(size):
+                    table.append([(row + dr) * size + col + dc
+                                  for dr, dc in offsets
+                                  if 0 <= row + dr < size and 0 <= col + dc < size])
+            _NEIGHBOR_TABLES[key] = table
+        return table
+    
+    @classmethod
+    def from_grid(cls, grid, radius=2, shape='square'):
+        """根据已有棋盘构造"""
+        generator = cls(len(grid), radius, shape)
+        for row, line in enumerate(grid):
+            for col, stone in enumerate(line):
+                if stone is not None:
+                    generator.place(row, col)
+        return generator
+    
+    def place(self, row, col):
+        """落子：该格移出候选点，邻域内计数加一"""
+        index = row * self.size + col
+        counts = self._counts
+        occupied = self._occupied
+        active = self._active
+        occupied[index] = 1
+        self._stone_count += 1
+        if counts[index]:
+            del active[bisect_left(active, index)]
+        for k in self._neighbors[index]:
+            if counts[k] == 0 and not occupied[k]:
+                insort(active, k)
+            counts[k] += 1
+    
+    def remove(self, row, col):
+        """撤销落子：邻域内计数减一，该格仍有邻子时重新成为候选点"""
+        index = row * self.size + col
+        counts = self._counts
+        occupied = self._occupied
+        active = self._active
+        for k in self._neighbors[index]:
+            counts[k] -= 1
+            if counts[k] == 0 and not occupied[k]:
+                del active[bisect_left(active, k)]
+        occupied[index] = 0
+        self._stone_count -= 1
+        if counts[index]:
+            insort(active, index)
+    
+    def has_stones(self):
+        """棋盘上是否有棋子"""
+        return self._stone_count > 0
+    
+    def moves(self):
+        """当前候选落子，按棋盘顺序排列"""
+        coords = self._coords
+        return [coords[k] for k in self._active]
+    
+    def __len__(self):
+        return len(self._active)
\ No newline at end of file
@@ -1,11 +1,11 @@
 # game_platform/ai/eval_ai.py
 """
 二级AI：基于评估函数的AI
-使用位置权重和翻转数量进行评估
+使用位置权重、翻转数量、棋型以及围棋的气和势力进行评估
 """
 
 from game_platform.ai.base import AIStrategy
-from game_platform.game import OthelloGame, GomokuGame
+from game_platform.game import OthelloGame, GomokuGame, GoGame
 
 
 class EvalAI(AIStrategy):
@@ -23,6 +23,22 @@ class EvalAI(AIStrategy):
         [100, -20,  10,   5,   5,  10, -20, 100],
     ]
     
+    # 棋盘外圈哨兵
+    BORDER = '#'
+    
+    # 围棋相邻位置缓存 {size: {(row, col): [相邻位置]}}
+    _GO_NEIGHBORS = {}
+    
+    # 五子棋棋型分数表：GOMOKU_LINE_SCORES[连子数][开放端数]
+    GOMOKU_LINE_SCORES = [
+        [0, 0, 0],
+        [0, 0, 0],
+        [0, 10, 100],          # 眠二 / 活二
+        [0, 100, 1000],        # 眠三 / 活三
+        [0, 1000, 10000],      # 冲四 / 活四
+        [100000, 100000, 100000],  # 连五
+    ]
+    
     def get_move(self, game, color):
         """选择评估分数最高的位置"""
         valid_moves = game.get_valid_moves()
@@ -30,38 +46,79 @@ class EvalAI(AIStrategy):
         if not valid_moves:
             return None
         
+        # 二级AI只做一层评估：每个合法位置计一个节点
+        stats = self.stats
+        stats.nodes += len(valid_moves)
+        stats.record_expansion(len(valid_moves))
+        stats.record_depth(1)
+        
         if isinstance(game, OthelloGame):
             return self._get_othello_move(game, color, valid_moves)
         elif isinstance(game, GomokuGame):
             return self._get_gomoku_move(game, color, valid_moves)
+        elif isinstance(game, GoGame):
+            return self._get_go_move(game, color, valid_moves)
         else:
             # 默认选择第一个合法位置
             return valid_moves[0]
     
-    def _get_othello_move(self, game, color, valid_moves):
-        """黑白棋落子策略"""
+    def rank_moves(self, game, color):
+        """按一层评估分数从高到低排列合法落子（同分保持棋盘顺序）"""
+        valid_moves = game.get_valid_moves()
+        if isinstance(game, OthelloGame):
+            scored = self._othello_scores(game, color, valid_moves)
+        elif isinstance(game, GomokuGame):
+            scored = self._gomoku_scores(game, color, valid_moves)
+        elif isinstance(game, GoGame):
+            scored = self._go_scores(game, color, valid_moves)
+        else:
+            return valid_moves
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+    
+    def _pick_best(self, scored, best_score):
+        """取分数高于 best_score 的最高分落子（同分取先出现的），没有返回 None"""
         best_move = None
-        best_score = float('-inf')
-        
-        for row, col in valid_moves:
-            score = self._evaluate_othello_move(game, row, col, color)
+        for score, move in scored:
             if score > best_score:
                 best_score = score
-                best_move = (row, col)
-        
+                best_move = move
+        self.stats.score = best_score
         return best_move
     
-    def _evaluate_othello_move(self, game, row, col, color):
+    def _get_othello_move(self, game, color, valid_moves):
+        """黑白棋落子策略"""
+        return self._pick_best(self._othello_scores(game, color, valid_moves), float('-inf'))
+    
+    def _othello_scores(self, game, color, valid_moves):
+        """黑白棋各合法位置的评估分数 [(分数, 落子), ...]"""
+        # 对手当前的合法位置，作为增量计算行动力的基准
+        opponent = 'white' if color == 'black' else 'black'
+        opponent_moves = set(game.board.get_valid_moves(opponent))
+        return [(self._evaluate_othello_move(game, row, col, color, opponent_moves), (row, col))
+                for row, col in valid_moves]
+    
+    def _evaluate_othello_move(self, game, row, col, color, opponent_moves):
         """评估黑白棋落子
         
         考虑因素：
         1. 位置权重
         2. 翻转棋子数
         3. 稳定性（角落和边）
+        4. 对手行动力
+        
+        直接在棋盘上落子模拟，评估完成后撤销，不复制棋盘。
         """
-        # 创建棋盘副本进行模拟
-        board_copy = game.board.copy()
-        flipped = board_copy.place_and_flip(row, col, color)
+        board = game.board
+        opponent = 'white' if color == 'black' else 'black'
+        
+        flipped = board.place_and_flip(row, col, color)
+        try:
+            # 行动力（模拟落子后对手的合法位置数）
+            mobility = self._count_mobility_after_move(
+                board, row, col, flipped, opponent, opponent_moves)
+        finally:
+            board.undo_place_and_flip(row, col, flipped)
         
         score = 0
         
@@ -86,97 +143,313 @@ class EvalAI(AIStrategy):
         }
         
         for corner, danger_list in dangerous_positions.items():
-            if game.board.is_empty(corner[0], corner[1]):
+            if board.is_empty(corner[0], corner[1]):
                 if (row, col) in danger_list:
                     score -= 30
         
-        # 行动力（模拟落子后对手的合法位置数）
-        opponent = 'white' if color == 'black' else 'black'
-        opponent_moves = len(board_copy.get_valid_moves(opponent))
-        score -= opponent_moves * 1.5
+        score -= mobility * 1.5
         
         return score
     
+    def _count_mobility_after_move(self, board, row, col, flipped, player, moves_before):
+        """增量计算落子后player的合法位置数
+        
+        一个空位是否合法只取决于它八个方向上紧邻的连续棋子。只有从变化的
+        格子（落子点和被翻转的棋子）出发、沿各方向遇到的第一个空位，
+        合法性才可能改变，其余位置沿用落子前的结果。
+        """
+        size = board.size
+        grid = board.grid
+        
+        affected = set()
+        for r0, c0 in [(row, col)] + flipped:
+            for dr, dc in board.DIRECTIONS:
+                r, c = r0 + dr, c0 + dc
+                while 0 <= r < size and 0 <= c < size:
+                    if grid[r][c] is None:
+                        affected.add((r, c))
+                        break
+                    r += dr
+                    c += dc
+        
+        count = 0
+        for move in moves_before:
+            if move not in affected and move != (row, col):
+                count += 1
+        for r, c in affected:
+            if board.is_valid_move(r, c, player):
+                count += 1
+        
+        return count
+    
     def _get_gomoku_move(self, game, color, valid_moves):
-        """五子棋落子策略"""
-        best_move = None
-        best_score = float('-inf')
+        """五子棋落子策略
         
+        整盘一次性计算双方的棋型分数图，再取综合分最高的空位。
+        """
+        return self._pick_best(self._gomoku_scores(game, color, valid_moves), float('-inf'))
+    
+    def _gomoku_scores(self, game, color, valid_moves):
+        """五子棋各合法位置的综合分数 [(分数, 落子), ...]"""
+        size = game.board_size
+        width = size + 2
         opponent = 'white' if color == 'black' else 'black'
         
+        cells = self._pad_grid(game.board.grid, size)
+        attack_map = self._gomoku_score_map(cells, width, color)
+        defense_map = self._gomoku_score_map(cells, width, opponent)
+        
+        center = size // 2
+        scored = []
+        
         for row, col in valid_moves:
+            index = (row + 1) * width + col + 1
+            # 中心位置加分
+            center_bonus = max(0, 10 - abs(row - center) - abs(col - center))
             # 进攻分数
-            attack_score = self._evaluate_gomoku_position(game, row, col, color)
+            attack_score = attack_map[index] + center_bonus
             # 防守分数
-            defense_score = self._evaluate_gomoku_position(game, row, col, opponent)
+            defense_score = defense_map[index] + center_bonus
             
             # 综合评分：进攻略重于防守
-            score = attack_score * 1.1 + defense_score
+            scored.append((attack_score * 1.1 + defense_score, (row, col)))
+        
+        return scored
+    
+    def _pad_grid(self, grid, size):
+        """将棋盘展开为带一圈边界哨兵的一维列表，省去越界判断"""
+        width = size + 2
+        cells = [self.BORDER] * (width * width)
+        for r in range(size):
+            start = (r + 1) * width + 1
+            cells[start:start + size] = grid[r]
+        return cells
+    
+    def _gomoku_score_map(self, cells, width, color):
+        """计算每个空位落下color后在四个方向上的棋型分数之和
+        
+        每个方向先正反各扫一遍该颜色的棋子，得到每格沿该方向的连续同色子数，
+        之后每个空位的连子数和开放端都可以O(1)查出。
+        """
+        total = len(cells)
+        stones = [i for i in range(total) if cells[i] == color]
+        empties = [i for i in range(total) if cells[i] is None]
+        line_scores = self.GOMOKU_LINE_SCORES
+        scores = [0] * total
+        
+        # 四个方向 (0,1), (1,0), (1,1), (1,-1) 在展开后的步长
+        for step in (1, width, width + 1, width - 1):
+            forward = [0] * total
+            for i in reversed(stones):
+                forward[i] = forward[i + step] + 1
+            backward = [0] * total
+            for i in stones:
+                backward[i] = backward[i - step] + 1
             
-            if score > best_score:
-                best_score = score
-                best_move = (row, col)
+            for i in empties:
+                run_f = forward[i + step]
+                run_b = backward[i - step]
+                open_ends = ((cells[i + (run_f + 1) * step] is None)
+                             + (cells[i - (run_b + 1) * step] is None))
+                count = run_f + run_b + 1
+                scores[i] += line_scores[count if count < 5 else 5][open_ends]
         
-        return best_move
+        return scores
     
-    def _evaluate_gomoku_position(self, game, row, col, color):
-        """评估五子棋某位置的分数"""
+    def _get_go_move(self, game, color, valid_moves):
+        """围棋落子策略
+        
+        考虑因素：
+        1. 提子、长出被打吃的棋块、打吃对方
+        2. 避免自杀、自紧气（被打吃）和填自己的眼
+        3. 势力图：优先落在双方势力交界或无人区，避免填自己的实地
+        
+        没有正收益的落子时返回None（虚着）。
+        """
+        return self._pick_best(self._go_scores(game, color, valid_moves), 0)
+    
+    def _go_scores(self, game, color, valid_moves):
+        """围棋各合法位置的评估分数 [(分数, 落子), ...]，不含非法和填眼的位置"""
+        size = game.board_size
+        grid = game.board.grid
+        opponent = 'white' if color == 'black' else 'black'
+        
+        group_of, groups = self._analyze_go_groups(grid, size)
+        my_distance = self._distance_map(grid, size, color)
+        opp_distance = self._distance_map(grid, size, opponent)
+        stone_ratio = (len(group_of) / (size * size))
+        
+        scored = []
+        for row, col in valid_moves:
+            score = self._evaluate_go_move(
+                grid, size, row, col, color, group_of, groups,
+                my_distance[row][col], opp_distance[row][col], stone_ratio)
+            if score is not None:
+                scored.append((score, (row, col)))
+        return scored
+    
+    def _evaluate_go_move(self, grid, size, row, col, color, group_of, groups,
+                          my_dist, opp_dist, stone_ratio):
+        """评估围棋落子，非法或填眼的位置返回None"""
+        neighbors = self._go_neighbors(size, row, col)
+        
+        my_groups = set()
+        opp_groups = set()
+        liberties = set()
+        for pos in neighbors:
+            stone = grid[pos[0]][pos[1]]
+            if stone is None:
+                liberties.add(pos)
+            elif stone == color:
+                my_groups.add(group_of[pos])
+            else:
+                opp_groups.add(group_of[pos])
+        
+        # 不填自己的眼（四周都是己方棋子且都不在被打吃状态）
+        if not liberties and not opp_groups and \
+                all(len(groups[g][2]) > 1 for g in my_groups):
+            return None
+        
         score = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+        captured = 0
+        atari_bonus = 0
+        for g in opp_groups:
+            stones, opp_liberties = groups[g][1], groups[g][2]
+            if len(opp_liberties) == 1:
+                # 提子：被提的棋子所在位置成为新的气
+                captured += len(stones)
+                liberties.update(pos for pos in neighbors if pos in stones)
+            elif len(opp_liberties) == 2:
+                atari_bonus += 10 * len(stones)
         
-        for dr, dc in directions:
-            count, open_ends = self._count_in_direction(game, row, col, dr, dc, color)
-            
-            # 根据连子数和开放端评分
-            if count >= 5:
-                score += 100000
-            elif count == 4:
-                if open_ends == 2:
-                    score += 10000  # 活四
-                elif open_ends == 1:
-                    score += 1000   # 冲四
-            elif count == 3:
-                if open_ends == 2:
-                    score += 1000   # 活三
-                elif open_ends == 1:
-                    score += 100    # 眠三
-            elif count == 2:
-                if open_ends == 2:
-                    score += 100    # 活二
-                elif open_ends == 1:
-                    score += 10     # 眠二
-        
-        # 中心位置加分
-        center = game.board_size // 2
-        dist = abs(row - center) + abs(col - center)
-        score += max(0, 10 - dist)
+        # 落子后所在棋块的气和大小
+        merged_size = 1
+        in_atari = 0
+        for g in my_groups:
+            stones, my_liberties = groups[g][1], groups[g][2]
+            merged_size += len(stones)
+            liberties.update(my_liberties)
+            if len(my_liberties) == 1:
+                in_atari += len(stones)
+        liberties.discard((row, col))
+        
+        # 自杀
+        if not liberties and not captured:
+            return None
+        
+        score += captured * 30
+        if in_atari and len(liberties) >= 2:
+            # 长出被打吃的棋块
+            score += in_atari * 25
+        if len(liberties) == 1 and not captured:
+            # 自紧气，下一手会被提
+            score -= merged_size * 20
+        else:
+            score += atari_bonus
+        score += min(len(liberties), 4)
+        
+        # 势力：交界处最有价值，己方实地内的落子是浪费
+        if my_dist + 1 < opp_dist and my_dist <= 2:
+            score -= 6
+        elif opp_dist + 1 < my_dist and opp_dist <= 2:
+            score -= 2
+        elif abs(my_dist - opp_dist) <= 1 and my_dist <= 3:
+            score += 5
+        elif my_dist > 3 and opp_dist > 3:
+            score += 4
+        
+        # 布局阶段偏好三、四线，避免一、二线
+        line = min(row, col, size - 1 - row, size - 1 - col) + 1
+        opening_weight = max(0.0, 1.0 - stone_ratio * 4)
+        if line == 1:
+            score -= 4 + 4 * opening_weight
+        elif line == 2:
+            score -= 4 * opening_weight
+        elif line in (3, 4):
+            score += 3 * opening_weight
         
         return score
     
-    def _count_in_direction(self, game, row, col, dr, dc, color):
-        """计算某方向上的连子数和开放端数"""
-        count = 1
-        open_ends = 0
-        
-        # 正方向
-        r, c = row + dr, col + dc
-        while game.board.is_valid_position(r, c) and game.board.get_stone(r, c) == color:
-            count += 1
-            r += dr
-            c += dc
-        if game.board.is_valid_position(r, c) and game.board.is_empty(r, c):
-            open_ends += 1
-        
-        # 反方向
-        r, c = row - dr, col - dc
-        while game.board.is_valid_position(r, c) and game.board.get_stone(r, c) == color:
-            count += 1
-            r -= dr
-            c -= dc
-        if game.board.is_valid_position(r, c) and game.board.is_empty(r, c):
-            open_ends += 1
-        
-        return count, open_ends
+    def _analyze_go_groups(self, grid, size):
+        """一次遍历全盘，找出所有棋块
+        
+        Returns:
+            tuple: ({位置: 棋块编号}, [(颜色, 棋子集合, 气集合), ...])
+        """
+        group_of = {}
+        groups = []
+        
+        for i in range(size):
+            for j in range(size):
+                color = grid[i][j]
+                if color is None or (i, j) in group_of:
+                    continue
+                
+                group_id = len(groups)
+                stones = set()
+                liberties = set()
+                to_visit = [(i, j)]
+                group_of[(i, j)] = group_id
+                while to_visit:
+                    pos = to_visit.pop()
+                    stones.add(pos)
+                    for adj in self._go_neighbors(size, pos[0], pos[1]):
+                        stone = grid[adj[0]][adj[1]]
+                        if stone is None:
+                            liberties.add(adj)
+                        elif stone == color and adj not in group_of:
+                            group_of[adj] = group_id
+                            to_visit.append(adj)
+                groups.append((color, stones, liberties))
+        
+        return group_of, groups
+    
+    def _distance_map(self, grid, size, color):
+        """势力图：每个点到最近的color棋子的曼哈顿距离
+        
+        使用两遍扫描的距离变换，整盘计算一次。
+        """
+        far = size * 2
+        dist = [[0 if stone == color else far for stone in grid_row] for grid_row in grid]
+        
+        # 正向扫描（左上到右下）
+        for i in range(size):
+            row = dist[i]
+            above = dist[i - 1] if i > 0 else None
+            for j in range(size):
+                d = row[j]
+                if above is not None and above[j] + 1 < d:
+                    d = above[j] + 1
+                if j > 0 and row[j - 1] + 1 < d:
+                    d = row[j - 1] + 1
+                row[j] = d
+        
+        # 反向扫描（右下到左上）
+        for i in range(size - 1, -1, -1):
+            row = dist[i]
+            below = dist[i + 1] if i < size - 1 else None
+            for j in range(size - 1, -1, -1):
+                d = row[j]
+                if below is not None and below[j] + 1 < d:
+                    d = below[j] + 1
+                if j < size - 1 and row[j + 1] + 1 < d:
+                    d = row[j + 1] + 1
+                row[j] = d
+        
+        return dist
+    
+    def _go_neighbors(self, size, row, col):
+        """获取相邻位置（按棋盘大小缓存）"""
+        table = self._GO_NEIGHBORS.get(size)
+        if table is None:
+            table = {}
+            for i in range(size):
+                for j in range(size):
+                    table[(i, j)] = [(i + dr, j + dc)
+                                     for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                                     if 0 <= i + dr < size and 0 <= j + dc < size]
+            self._GO_NEIGHBORS[size] = table
+        return table[(row, col)]
     
     def get_level(self):
         return 2
\ No newline at end of file
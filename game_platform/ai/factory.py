@@ -7,6 +7,7 @@ AI工厂类
 from game_platform.ai.random_ai import RandomAI
 from game_platform.ai.eval_ai import EvalAI
 from game_platform.ai.mcts_ai import MCTSAI
+from game_platform.ai.uct_ai import UCTAI
 
 
 class AIFactory:
@@ -17,18 +18,25 @@ class AIFactory:
         1: RandomAI,
         2: EvalAI,
         3: MCTSAI,
+        4: UCTAI,
     }
     
     # 支持AI的游戏类型
     SUPPORTED_GAMES = ['othello', 'gomoku', 'go']
     
+    # 只支持部分游戏的AI等级
+    LEVEL_GAMES = {
+        4: ['gomoku'],
+    }
+    
     @classmethod
-    def create_ai(cls, game_type, level):
+    def create_ai(cls, game_type, level, **options):
         """创建AI实例
         
         Args:
-            game_type: 游戏类型 ('othello', 'gomoku')
-            level: AI等级 (1-3)
+            game_type: 游戏类型 ('othello', 'gomoku', 'go')
+            level: AI等级 (1-4，4级仅支持五子棋)
+            **options: 传给AI构造函数的参数（如三级AI的 max_depth）
             
         Returns:
             AIStrategy: AI实例
@@ -39,13 +47,22 @@ class AIFactory:
         if level not in cls.AI_CLASSES:
             raise ValueError(f"不支持的AI等级: {level}")
         
+        if game_type not in cls.LEVEL_GAMES.get(level, cls.SUPPORTED_GAMES):
+            raise ValueError(f"AI等级 {level} 不支持游戏类型 {game_type}")
+        
         ai_class = cls.AI_CLASSES[level]
-        return ai_class()
+        try:
+            return ai_class(**options)
+        except TypeError:
+            raise ValueError(f"AI等级 {level} 不支持参数: {', '.join(options)}")
     
     @classmethod
-    def get_available_levels(cls):
-        """获取可用的AI等级列表"""
-        return list(cls.AI_CLASSES.keys())
+    def get_available_levels(cls, game_type=None):
+        """获取可用的AI等级列表（指定游戏类型时只返回支持该游戏的等级）"""
+        if game_type is None:
+            return list(cls.AI_CLASSES.keys())
+        return [level for level in cls.AI_CLASSES
+                if game_type in cls.LEVEL_GAMES.get(level, cls.SUPPORTED_GAMES)]
     
     @classmethod
     def get_level_description(cls, level):
@@ -53,6 +70,7 @@ class AIFactory:
         descriptions = {
             1: "随机AI - 随机选择合法位置落子",
             2: "评估AI - 使用评估函数选择最优位置",
-            3: "MCTS AI - 使用蒙特卡洛树搜索"
+            3: "MCTS AI - 使用蒙特卡洛树搜索",
+            4: "UCT AI - 规则感知随机对局的蒙特卡洛树搜索（仅五子棋）"
         }
         return descriptions.get(level, "未知等级")
\ No newline at end of file
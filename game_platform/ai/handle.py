@@ -0,0 +1,104 @@
+"""
+异步AI搜索句柄
+"""
+
+import threading
+
+
+class SearchCancelled(Exception):
+    """搜索在开始前被取消（如AI服务停止时仍在排队），没有可用的落子"""
+
+
+class SearchHandle:
+    """一次后台AI搜索的句柄
+    
+    搜索在工作线程中进行，调用方通过句柄查询是否完成、获取结果、
+    取消搜索，以及在搜索过程中查询当前最佳落子（随时可用的结果）。
+    取消后搜索会尽快结束，结果为取消时的当前最佳落子（可能为 None）。
+    """
+    
+    def __init__(self):
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._error = None
+        self._best_move = None
+        self._best_score = None
+        self._callbacks = []
+        self.stats = None  # 搜索结束后的统计（SearchStats），在结果设置前写入
+    
+    def cancel(self):
+        """请求取消搜索（不等待搜索线程结束）"""
+        self._cancelled.set()
+    
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._cancelled.is_set()
+    
+    def done(self):
+        """搜索是否已结束"""
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """等待搜索结束，返回是否已结束"""
+        return self._done.wait(timeout)
+    
+    def result(self, timeout=None):
+        """获取搜索结果（阻塞直到完成）
+        
+        Raises:
+            TimeoutError: 超时仍未完成
+            Exception: 搜索线程中抛出的异常
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("AI搜索尚未完成")
+        if self._error is not None:
+            raise self._error
+        return self._result
+    
+    def best_move_so_far(self):
+        """当前最佳落子：完成后为最终结果，搜索中为目前找到的最佳落子"""
+        with self._lock:
+            if self._done.is_set() and self._error is None:
+                return self._result
+            return self._best_move
+    
+    def best_score_so_far(self):
+        """当前最佳落子的评分"""
+        with self._lock:
+            return self._best_score
+    
+    def add_done_callback(self, callback):
+        """添加搜索结束时的回调（在搜索线程中调用，参数为句柄）"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+    
+    def report_best(self, move, score=None):
+        """由AI策略在搜索过程中汇报当前最佳落子"""
+        with self._lock:
+            self._best_move = move
+            self._best_score = score
+    
+    def set_result(self, move):
+        """由搜索线程设置最终结果"""
+        with self._lock:
+            self._result = move
+            if move is not None:
+                self._best_move = move
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+    
+    def set_exception(self, error):
+        """由搜索线程设置异常"""
+        with self._lock:
+            self._error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
\ No newline at end of file
@@ -1,19 +1,47 @@
 # game_platform/ai/mcts_ai.py
 """三级AI：Alpha-Beta剪枝搜索（修复版v3 - 修复连五检测）"""
 from game_platform.ai.base import AIStrategy
+from game_platform.ai.candidates import CandidateGenerator
 from game_platform.game import OthelloGame, GomokuGame
 import random
 
 
 class MCTSAI(AIStrategy):
-    """Alpha-Beta搜索AI - 三级AI"""
+    """Alpha-Beta搜索AI - 三级AI
     
-    def __init__(self, max_depth=4):
+    五子棋使用迭代加深的主变例搜索（PVS）：除第一个走法外都先用零窗口试探，
+    试探失败才以完整窗口重新搜索；从第二轮起根节点以上一轮评分为中心设置渴望窗口。
+    """
+    
+    # 渴望窗口的半宽（评分单位，约为一个活三的分值）
+    ASPIRATION_WINDOW = 3000
+    
+    def __init__(self, max_depth=4, candidate_radius=2, candidate_shape='square'):
+        if candidate_shape not in CandidateGenerator.SHAPES:
+            raise ValueError(f"未知的候选点形状: {candidate_shape}")
         self.max_depth = max_depth
+        # 候选点：已有棋子邻域内的空位，邻域半径和形状可配置
+        self.candidate_radius = candidate_radius
+        self.candidate_shape = candidate_shape
+        self._candidates = None
+        self._root_depth = max_depth  # 当前迭代的搜索深度
         
     def get_level(self):
         return 3
     
+    def cache_key(self):
+        return (3, self.max_depth, self.candidate_radius, self.candidate_shape)
+    
+    def rank_moves(self, game, color):
+        """五子棋按搜索时的启发式排序候选点，其他棋类使用默认排序"""
+        if not isinstance(game, GomokuGame):
+            return super().rank_moves(game, color)
+        board = game.board
+        size = game.board_size
+        opponent = 'white' if color == 'black' else 'black'
+        candidates = self._get_candidate_moves(board, size)
+        return self._sort_moves(board, size, candidates, color, opponent)
+    
     def get_move(self, game, color):
         """获取最佳走法"""
         if isinstance(game, GomokuGame):
@@ -30,57 +58,50 @@ class MCTSAI(AIStrategy):
         size = board.size
         opponent = 'white' if color == 'black' else 'black'
         
-        print(f"\n[AI Lv3] === 轮到 {color} 落子 ===")
-        
         # ========== 最高优先级：自己能连五必走 ==========
         win_moves = self._find_all_winning_moves(board, size, color)
         if win_moves:
-            print(f"[AI Lv3] ★★★ 找到获胜点: {win_moves[0]} (共{len(win_moves)}个)")
             return win_moves[0]
         
         # ========== 第二优先级：对手能连五必挡 ==========
         opp_win_moves = self._find_all_winning_moves(board, size, opponent)
         if opp_win_moves:
-            print(f"[AI Lv3] !!! 必须阻挡对手连五: {opp_win_moves[0]}")
             return opp_win_moves[0]
         
         # ========== 第三优先级：自己能形成活四（必胜） ==========
         my_open_four = self._find_open_four(board, size, color)
         if my_open_four:
-            print(f"[AI Lv3] ★★ 形成活四: {my_open_four}")
             return my_open_four
         
         # ========== 第四优先级：对手能形成活四必挡 ==========
         opp_open_four = self._find_open_four(board, size, opponent)
         if opp_open_four:
-            print(f"[AI Lv3] !! 阻挡对手活四: {opp_open_four}")
             return opp_open_four
         
         # ========== 第五优先级：自己能形成冲四 ==========
         my_rush_four = self._find_rush_four(board, size, color)
         if my_rush_four:
-            print(f"[AI Lv3] ★ 形成冲四: {my_rush_four}")
             return my_rush_four
         
         # ========== 第六优先级：对手能形成冲四必挡 ==========
         opp_rush_four = self._find_rush_four(board, size, opponent)
         if opp_rush_four:
-            print(f"[AI Lv3] ! 阻挡对手冲四: {opp_rush_four}")
             return opp_rush_four
         
         # ========== 第七优先级：自己双活三 ==========
         my_double_three = self._find_double_three(board, size, color)
         if my_double_three:
-            print(f"[AI Lv3] 形成双活三: {my_double_three}")
             return my_double_three
         
         # ========== 第八优先级：对手双活三必挡 ==========
         opp_double_three = self._find_double_three(board, size, opponent)
         if opp_double_three:
-            print(f"[AI Lv3] 阻挡对手双活三: {opp_double_three}")
             return opp_double_three
         
         # ========== 搜索阶段 ==========
+        # 候选点集合在搜索过程中随落子/撤销增量更新
+        self._candidates = CandidateGenerator.from_grid(
+            board.grid, self.candidate_radius, self.candidate_shape)
         candidates = self._get_candidate_moves(board, size)
         if not candidates:
             center = size // 2
@@ -92,23 +113,85 @@ class MCTSAI(AIStrategy):
         # 排序并限制搜索宽度
         candidates = self._sort_moves(board, size, candidates, color, opponent)[:15]
         
-        # Alpha-Beta搜索
-        best_score = float('-inf')
+        # 迭代加深 + PVS + 渴望窗口
         best_move = candidates[0]
+        best_score = float('-inf')
+        stats = self.stats
+        stats.record_expansion(len(candidates))
+        # 启发式排序第一的点作为初始结果，搜索被取消时也有可用的落子
+        self.report_best(best_move)
+        
+        for depth in range(1, self.max_depth + 1):
+            if depth == 1:
+                alpha, beta = float('-inf'), float('inf')
+            else:
+                alpha = best_score - self.ASPIRATION_WINDOW
+                beta = best_score + self.ASPIRATION_WINDOW
+            
+            move, score = self._search_root(board, size, candidates, depth,
+                                            alpha, beta, color, opponent)
+            if not self.is_cancelled() and (score <= alpha or score >= beta):
+                # 评分落在渴望窗口之外，以完整窗口重新搜索
+                stats.re_searches += 1
+                move, score = self._search_root(board, size, candidates, depth,
+                                                float('-inf'), float('inf'), color, opponent)
+            
+            # 被取消时本轮结果不完整，沿用上一轮的最佳落子
+            if self.is_cancelled() or move is None:
+                break
+            
+            best_move, best_score = move, score
+            self.report_best(best_move, best_score)
+            # 下一轮优先搜索本轮的最佳落子
+            candidates.remove(best_move)
+            candidates.insert(0, best_move)
+        
+        self._candidates = None
+        stats.score = best_score
+        return best_move
+    
+    def _search_root(self, board, size, candidates, depth, alpha, beta, color, opponent):
+        """根节点PVS搜索，返回 (最佳落子, 评分)
+        
+        评分不高于 alpha 或不低于 beta 时只是界，需要调用方扩大窗口重新搜索。
+        """
+        stats = self.stats
+        generator = self._candidates
+        self._root_depth = depth
+        best_move = None
+        best_score = float('-inf')
         
-        for move in candidates:
+        for i, move in enumerate(candidates):
             board.grid[move[0]][move[1]] = color
-            score = self._alphabeta(board, size, self.max_depth - 1, 
-                                   float('-inf'), float('inf'), 
-                                   False, color, opponent)
+            generator.place(move[0], move[1])
+            if i == 0:
+                score = self._alphabeta(board, size, depth - 1, alpha, beta,
+                                        False, color, opponent)
+            else:
+                # 零窗口试探：只判断是否优于当前最佳
+                score = self._alphabeta(board, size, depth - 1, alpha, alpha + 1,
+                                        False, color, opponent)
+                if alpha < score < beta:
+                    stats.re_searches += 1
+                    score = self._alphabeta(board, size, depth - 1, alpha, beta,
+                                            False, color, opponent)
+            generator.remove(move[0], move[1])
             board.grid[move[0]][move[1]] = None
             
+            # 被取消时该分支的评分不完整，不再采用
+            if self.is_cancelled():
+                break
+            
             if score > best_score:
                 best_score = score
                 best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                stats.cutoffs += 1
+                break
         
-        print(f"[AI Lv3] 搜索选择: {best_move}, 评分: {best_score}")
-        return best_move
+        return best_move, best_score
     
     def _find_all_winning_moves(self, board, size, color):
         """找出所有能连成5子的点（全方向扫描）"""
@@ -254,10 +337,17 @@ class MCTSAI(AIStrategy):
         return None
     
     def _alphabeta(self, board, size, depth, alpha, beta, is_maximizing, my_color, opponent):
-        """Alpha-Beta剪枝搜索"""
+        """Alpha-Beta剪枝搜索（PVS：首个走法完整窗口，其余零窗口试探）"""
         current = my_color if is_maximizing else opponent
         other = opponent if is_maximizing else my_color
         
+        stats = self.stats
+        stats.nodes += 1
+        stats.record_depth(self._root_depth - depth)
+        
+        if self.is_cancelled():
+            return 0
+        
         # 检查是否有人获胜
         winner = self._check_winner(board, size)
         if winner == my_color:
@@ -286,29 +376,49 @@ class MCTSAI(AIStrategy):
                     candidates.insert(0, m)
         
         candidates = self._sort_moves(board, size, candidates, current, other)[:12]
+        stats.record_expansion(len(candidates))
+        generator = self._candidates
         
         if is_maximizing:
             max_eval = float('-inf')
-            for move in candidates:
+            for i, move in enumerate(candidates):
                 board.grid[move[0]][move[1]] = current
-                eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, False, my_color, opponent)
+                generator.place(move[0], move[1])
+                if i == 0:
+                    eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, False, my_color, opponent)
+                else:
+                    eval_score = self._alphabeta(board, size, depth - 1, alpha, alpha + 1, False, my_color, opponent)
+                    if alpha < eval_score < beta:
+                        stats.re_searches += 1
+                        eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, False, my_color, opponent)
+                generator.remove(move[0], move[1])
                 board.grid[move[0]][move[1]] = None
                 
                 max_eval = max(max_eval, eval_score)
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    stats.cutoffs += 1
                     break
             return max_eval
         else:
             min_eval = float('inf')
-            for move in candidates:
+            for i, move in enumerate(candidates):
                 board.grid[move[0]][move[1]] = current
-                eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, True, my_color, opponent)
+                generator.place(move[0], move[1])
+                if i == 0:
+                    eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, True, my_color, opponent)
+                else:
+                    eval_score = self._alphabeta(board, size, depth - 1, beta - 1, beta, True, my_color, opponent)
+                    if alpha < eval_score < beta:
+                        stats.re_searches += 1
+                        eval_score = self._alphabeta(board, size, depth - 1, alpha, beta, True, my_color, opponent)
+                generator.remove(move[0], move[1])
                 board.grid[move[0]][move[1]] = None
                 
                 min_eval = min(min_eval, eval_score)
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    stats.cutoffs += 1
                     break
             return min_eval
     
@@ -334,26 +444,17 @@ class MCTSAI(AIStrategy):
         return None
     
     def _get_candidate_moves(self, board, size):
-        """获取候选走法（棋子附近的空位）"""
-        neighbors = set()
-        has_stones = False
+        """获取候选走法（棋子邻域内的空位，由候选点生成器增量维护）"""
+        generator = self._candidates
+        if generator is None:
+            generator = CandidateGenerator.from_grid(
+                board.grid, self.candidate_radius, self.candidate_shape)
         
-        for i in range(size):
-            for j in range(size):
-                if board.grid[i][j]:
-                    has_stones = True
-                    for di in range(-2, 3):
-                        for dj in range(-2, 3):
-                            ni, nj = i + di, j + dj
-                            if 0 <= ni < size and 0 <= nj < size:
-                                if board.grid[ni][nj] is None:
-                                    neighbors.add((ni, nj))
-        
-        if not has_stones:
+        if not generator.has_stones():
             center = size // 2
             return [(center, center)]
         
-        return list(neighbors)
+        return generator.moves()
     
     def _sort_moves(self, board, size, moves, color, opponent):
         """按启发式评分排序"""
@@ -509,6 +610,8 @@ class MCTSAI(AIStrategy):
         
         best_score = float('-inf')
         best_move = valid_moves[0]
+        self.stats.nodes += len(valid_moves)
+        self.stats.record_expansion(len(valid_moves))
         
         for move in valid_moves:
             score = weights[move[0]][move[1]]
@@ -516,4 +619,5 @@ class MCTSAI(AIStrategy):
                 best_score = score
                 best_move = move
         
+        self.stats.score = best_score
         return best_move
\ No newline at end of file
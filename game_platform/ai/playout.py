@@ -0,0 +1,254 @@
+"""
+五子棋快速随机对局（playout）：按规则增量检测威胁
+
+棋盘上每条长度为5的线段称为一个"窗口"。每个窗口记录黑白双方各有几子，
+落子时只更新经过该点的窗口（最多20个）：
+    - 某方在窗口内有5子：连五获胜
+    - 某方有4子且窗口内无对方棋子：剩下的空位是该方的成五点（威胁）
+随机对局的走子策略：能成五必走，对手有成五点必挡，否则随机落子。
+"""
+
+import random
+
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+COLOR_CODES = {'black': BLACK, 'white': WHITE}
+
+# 只有一方棋子的窗口按棋子数计分，用于候选点排序
+WINDOW_SCORES = (0, 1, 10, 100, 1000, 0)
+
+# 窗口表缓存 {size: (窗口列表, 每个格子所在的窗口编号列表)}
+_WINDOW_TABLES = {}
+
+
+def get_window_table(size):
+    """获取棋盘的窗口表（按棋盘大小缓存）
+    
+    Returns:
+        tuple: (windows, cell_windows)。windows[w] 为窗口 w 的5个扁平下标，
+        cell_windows[k] 为经过格子 k 的窗口编号列表。
+    """
+    table = _WINDOW_TABLES.get(size)
+    if table is None:
+        windows = []
+        cell_windows = [[] for _ in range(size * size)]
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(size):
+                for col in range(size):
+                    end_row, end_col = row + 4 * dr, col + 4 * dc
+                    if not (0 <= end_row < size and 0 <= end_col < size):
+                        continue
+                    cells = tuple((row + i * dr) * size + col + i * dc for i in range(5))
+                    for k in cells:
+                        cell_windows[k].append(len(windows))
+                    windows.append(cells)
+        table = (windows, cell_windows)
+        _WINDOW_TABLES[size] = table
+    return table
+
+
+class GomokuPlayoutState:
+    """可快速复制的五子棋局面，增量维护双方的成五点"""
+    
+    __slots__ = ('size', 'board', 'counts', 'threats', 'to_move', 'winner', 'plies',
+                 'stones', '_windows', '_cell_windows')
+    
+    def __init__(self, size):
+        self.size = size
+        self.board = [EMPTY] * (size * size)
+        self._windows, self._cell_windows = get_window_table(size)
+        # counts[color][w]: 窗口 w 内该方棋子数（下标0不用）
+        self.counts = [None, [0] * len(self._windows), [0] * len(self._windows)]
+        # threats[color]: 该方落下即成五的空位
+        self.threats = [None, set(), set()]
+        self.to_move = BLACK
+        self.winner = None  # BLACK / WHITE / EMPTY（和棋）/ None（未结束）
+        self.plies = 0
+        self.stones = []
+    
+    @classmethod
+    def from_game(cls, game):
+        """由 GomokuGame 构造（以当前执子方为下一手）"""
+        size = game.board.size
+        state = cls(size)
+        for row, line in enumerate(game.board.grid):
+            for col, stone in enumerate(line):
+                if stone is not None:
+                    state.to_move = COLOR_CODES[stone]
+                    state.play(row * size + col)
+        state.to_move = COLOR_CODES[game.current_player]
+        state.plies = 0
+        return state
+    
+    def copy(self):
+        """复制局面（窗口表共享）"""
+        state = GomokuPlayoutState.__new__(GomokuPlayoutState)
+        state.size = self.size
+        state.board = self.board[:]
+        state.counts = [None, self.counts[1][:], self.counts[2][:]]
+        state.threats = [None, set(self.threats[1]), set(self.threats[2])]
+        state.to_move = self.to_move
+        state.winner = self.winner
+        state.plies = self.plies
+        state.stones = self.stones[:]
+        state._windows = self._windows
+        state._cell_windows = self._cell_windows
+        return state
+    
+    def play(self, k):
+        """当前执子方在扁平下标 k 落子"""
+        color = self.to_move
+        board = self.board
+        board[k] = color
+        self.stones.append(k)
+        self.plies += 1
+        threats = self.threats
+        threats[1].discard(k)
+        threats[2].discard(k)
+        
+        own = self.counts[color]
+        other = self.counts[3 - color]
+        own_threats = threats[color]
+        windows = self._windows
+        for w in self._cell_windows[k]:
+            count = own[w] + 1
+            own[w] = count
+            if other[w]:
+                continue
+            if count == 5:
+                self.winner = color
+            elif count == 4:
+                for cell in windows[w]:
+                    if board[cell] == EMPTY:
+                        own_threats.add(cell)
+                        break
+        
+        if self.winner is None and len(self.stones) == len(board):
+            self.winner = EMPTY
+        self.to_move = 3 - color
+    
+    def forced_moves(self):
+        """规则强制的落子：能成五只走成五点，对手有成五点只能挡，否则返回 None"""
+        own = self.threats[self.to_move]
+        if own:
+            return [min(own)]
+        opponent = self.threats[3 - self.to_move]
+        if opponent:
+            return sorted(opponent)
+        return None
+    
+    def move_score(self, k):
+        """空位 k 的启发式分值：经过该点、只含一方棋子的窗口分值之和（攻守合计）"""
+        own = self.counts[self.to_move]
+        other = self.counts[3 - self.to_move]
+        score = 0
+        for w in self._cell_windows[k]:
+            if not other[w]:
+                score += WINDOW_SCORES[own[w]]
+            elif not own[w]:
+                score += WINDOW_SCORES[other[w]]
+        return score
+    
+    def candidate_moves(self, neighbors, limit=None):
+        """候选落子：强制落子，或已有棋子邻域内的空位
+        
+        Args:
+            neighbors: 每个格子邻域内的扁平下标表（见 CandidateGenerator）
+            limit: 给出时按 move_score 从高到低只保留前 limit 个
+        """
+        forced = self.forced_moves()
+        if forced is not None:
+            return forced
+        if not self.stones:
+            center = self.size // 2
+            return [center * self.size + center]
+        board = self.board
+        moves = set()
+        for k in self.stones:
+            for n in neighbors[k]:
+                if board[n] == EMPTY:
+                    moves.add(n)
+        moves = sorted(moves)
+        if limit is not None and len(moves) > limit:
+            moves.sort(key=self.move_score, reverse=True)
+            del moves[limit:]
+        return moves
+    
+    def playout(self, rng=random, max_plies=None, neighbors=None):
+        """从当前局面随机下完一局（就地修改局面）
+        
+        Args:
+            rng: 随机数生成器
+            max_plies: 最多再走的步数，超过按和棋计
+            neighbors: 邻域下标表，给出时优先在上一手的邻域内随机落子
+        
+        Returns:
+            int: 胜方（BLACK / WHITE），和棋返回 EMPTY
+        """
+        if self.winner is not None:
+            return self.winner
+        
+        board = self.board
+        counts = self.counts
+        threats = self.threats
+        windows = self._windows
+        cell_windows = self._cell_windows
+        color = self.to_move
+        empties = [k for k, stone in enumerate(board) if stone == EMPTY]
+        remaining = len(empties)
+        limit = remaining if max_plies is None else min(max_plies, remaining)
+        randbelow = rng.randrange
+        last = self.stones[-1] if self.stones else None
+        
+        for _ in range(limit):
+            opponent = 3 - color
+            if threats[color]:
+                # 能成五必走
+                self.winner = color
+                return color
+            if threats[opponent]:
+                # 对手有成五点必挡（有两个以上时挡一个，对手仍然获胜）
+                blocks = threats[opponent]
+                if len(blocks) > 1:
+                    self.winner = opponent
+                    return opponent
+                k = blocks.pop()
+            else:
+                k = None
+                if neighbors is not None and last is not None:
+                    # 先在上一手邻域内随机试一个点
+                    near = neighbors[last]
+                    k = near[randbelow(len(near))]
+                    if board[k] != EMPTY:
+                        k = None
+            if k is None:
+                # 随机空位（已被强制落子占用的空位延迟删除）
+                while True:
+                    i = randbelow(remaining)
+                    k = empties[i]
+                    remaining -= 1
+                    empties[i] = empties[remaining]
+                    if board[k] == EMPTY:
+                        break
+            
+            board[k] = color
+            last = k
+            threats[opponent].discard(k)
+            own = counts[color]
+            other = counts[opponent]
+            own_threats = threats[color]
+            for w in cell_windows[k]:
+                count = own[w] + 1
+                own[w] = count
+                if count == 4 and not other[w]:
+                    for cell in windows[w]:
+                        if board[cell] == EMPTY:
+                            own_threats.add(cell)
+                            break
+            color = opponent
+        
+        self.to_move = color
+        self.winner = EMPTY
+        return EMPTY
\ No newline at end of file
@@ -10,6 +10,8 @@ from game_platform.ai.base import AIStrategy
 class RandomAI(AIStrategy):
     """随机AI - 一级AI"""
     
+    cacheable = False
+    
     def get_move(self, game, color):
         """随机选择一个合法位置落子"""
         valid_moves = game.get_valid_moves()
@@ -17,6 +19,11 @@ class RandomAI(AIStrategy):
         if not valid_moves:
             return None
         
+        # 每个合法位置计一个节点（与二级AI一致）
+        stats = self.stats
+        stats.nodes += len(valid_moves)
+        stats.record_expansion(len(valid_moves))
+        stats.record_depth(1)
         return random.choice(valid_moves)
     
     def get_level(self):
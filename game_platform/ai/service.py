@@ -0,0 +1,536 @@
+"""
+AI服务：多局对弈共享的AI工作进程池
+
+各局的搜索请求进入按对局区分的队列，工作进程在对局之间轮流取请求（公平调度），
+一局请求再多也不会让其他对局饿死。每个请求可设置时间预算，到时结束搜索并返回
+当前最佳落子。每个工作进程按游戏类型各持一份置换表，停止时合并回服务的置换表。
+指定缓存目录时，各进程启动时加载置换表快照，停止时将合并后的新结果写回。
+
+用法（压测）:
+    python -m game_platform.ai.service --game othello --games 50 --workers 2 --level 2 \
+        --cache-dir ai_cache
+"""
+
+import argparse
+import copy
+import multiprocessing
+import os
+import pickle
+import random
+import threading
+import time
+from collections import deque
+
+from game_platform.ai.cache import CacheSnapshot, TranspositionTable, snapshot_path
+from game_platform.ai.factory import AIFactory
+from game_platform.ai.handle import SearchCancelled, SearchHandle
+
+
+class AIRequest:
+    """一次搜索请求"""
+    
+    def __init__(self, game, color, level, options, game_id, budget):
+        self.game = game
+        self.color = color
+        self.game_type = game.get_game_type()
+        self.level = level
+        self.options = options
+        self.game_id = game_id
+        self.budget = budget
+        self.handle = SearchHandle()
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.expired = False  # 是否因时间预算用完而提前结束
+    
+    def strategy_key(self):
+        """工作进程内缓存AI实例的键"""
+        return self.game_type, self.level, tuple(sorted(self.options.items()))
+
+
+class ServiceMetrics:
+    """AI服务的吞吐量与排队延迟统计"""
+    
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.expired = 0
+        self.total_queue_time = 0.0
+        self.total_search_time = 0.0
+        self._queue_samples = deque(maxlen=window)  # 最近请求的排队时间（秒）
+    
+    def record_submit(self):
+        with self._lock:
+            self.submitted += 1
+    
+    def record_done(self, request, search_time, failed=False):
+        """记录一个处理完的请求"""
+        queue_time = request.started_at - request.submitted_at
+        with self._lock:
+            self.total_queue_time += queue_time
+            self.total_search_time += search_time
+            self._queue_samples.append(queue_time)
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            if request.expired:
+                self.expired += 1
+    
+    def record_cancel(self):
+        """记录一个排队期间被取消的请求"""
+        with self._lock:
+            self.cancelled += 1
+    
+    @property
+    def moves_per_second(self):
+        """服务启动以来所有对局合计的每秒落子数"""
+        elapsed = time.perf_counter() - self.started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
+    
+    def queue_latency(self, pct=50):
+        """最近请求排队时间的百分位数（秒）"""
+        with self._lock:
+            samples = sorted(self._queue_samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+    
+    def snapshot(self):
+        """当前统计的字典形式"""
+        handled = self.completed + self.failed
+        with self._lock:
+            mean_queue = self.total_queue_time / handled if handled else 0.0
+            mean_search = self.total_search_time / handled if handled else 0.0
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'failed': self.failed,
+            'expired': self.expired,
+            'moves_per_second': self.moves_per_second,
+            'queue_mean_ms': mean_queue * 1000,
+            'queue_p50_ms': self.queue_latency(50) * 1000,
+            'queue_p95_ms': self.queue_latency(95) * 1000,
+            'search_mean_ms': mean_search * 1000,
+        }
+
+
+class _WorkerHandle(SearchHandle):
+    """工作进程内的搜索句柄
+    
+    取消标志放在与父进程共享的内存中，当前最佳落子经管道转发给父进程的句柄。
+    """
+    
+    def __init__(self, conn, cancel_flag):
+        super().__init__()
+        self._conn = conn
+        self._cancel_flag = cancel_flag
+    
+    def cancel(self):
+        self._cancel_flag.value = 1
+    
+    def cancelled(self):
+        return bool(self._cancel_flag.value)
+    
+    def report_best(self, move, score=None):
+        super().report_best(move, score)
+        self._conn.send(('best', move, score))
+
+
+def _worker_main(conn, cancel_flag, cache_dir, table_size):
+    """工作进程主循环：逐个执行父进程发来的请求，收到 None 时发回置换表后退出
+    
+    AI实例按 (游戏类型, 等级, 参数) 缓存；置换表按游戏类型各一份，
+    指定缓存目录时从快照加载。
+    """
+    strategies = {}
+    tables = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            conn.send(('tables', {game_type: (table.items(), table.hits, table.misses,
+                                              table.snapshot_hits)
+                                  for game_type, table in tables.items()}))
+            return
+        
+        key, game, color = message
+        game_type, level, options = key
+        handle = _WorkerHandle(conn, cancel_flag)
+        try:
+            # 等级与游戏类型不匹配、参数错误等在这里抛出，交给句柄而不是结束工作进程
+            strategy = strategies.get(key)
+            if strategy is None:
+                strategy = AIFactory.create_ai(game_type, level, **dict(options))
+                table = tables.get(game_type)
+                if table is None:
+                    snapshot = None
+                    if cache_dir:
+                        snapshot = CacheSnapshot.load(snapshot_path(cache_dir, game_type))
+                    table = tables[game_type] = TranspositionTable(table_size, snapshot)
+                strategy.transposition_table = table
+                strategies[key] = strategy
+            move = strategy.search(game, color, handle)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            conn.send(('error', e))
+        else:
+            conn.send(('done', move, strategy.stats))
+
+
+class AIService:
+    """多局共享的AI工作进程池
+    
+    submit 提交局面后立即返回 SearchHandle，可等待结果、取消或查询当前最佳落子。
+    搜索在工作进程中进行（不受GIL限制，可用满多核）；父进程中每个工作进程
+    对应一个转发线程，负责取请求、转发取消和当前最佳落子，只等待管道不占CPU。
+    """
+    
+    def __init__(self, workers=None, default_budget=None, table_size=100000, cache_dir=None):
+        """
+        Args:
+            workers: 工作进程数（默认CPU核数）
+            default_budget: 默认每步时间预算（秒），None 表示不限时
+            table_size: 每种游戏置换表的最大条目数
+            cache_dir: 置换表快照目录（None 表示不持久化）
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.default_budget = default_budget
+        self.table_size = table_size
+        self.cache_dir = cache_dir
+        self.metrics = ServiceMetrics()
+        
+        self._queues = {}      # {对局ID: deque[AIRequest]}
+        self._ready = deque()  # 有待处理请求的对局ID（轮转顺序）
+        self._active = set()   # 工作进程正在处理的请求
+        self._cond = threading.Condition()
+        self._tables = {}      # {游戏类型: TranspositionTable}，工作进程退出时合并进来
+        self._tables_lock = threading.Lock()
+        self._threads = []
+        self._running = False
+    
+    def start(self):
+        """启动工作进程及其转发线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        
+        self.metrics = ServiceMetrics()
+        # 先创建全部进程再启动线程，尽量在单线程状态下 fork
+        workers = [self._spawn() for _ in range(self.workers)]
+        for i, worker in enumerate(workers):
+            thread = threading.Thread(target=self._worker, args=(worker,),
+                                      name=f"AIService-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+    
+    def shutdown(self, wait=True):
+        """停止服务
+        
+        排队中的请求以 SearchCancelled 结束；进行中的搜索被取消，尽快结束，
+        结果为取消时的当前最佳落子。两种情况下句柄的 cancelled() 均为 True。
+        wait 为 True 时等待各工作进程退出并合并置换表，设置了缓存目录时写回快照。
+        """
+        with self._cond:
+            self._running = False
+            pending = [request for queue in self._queues.values() for request in queue]
+            active = list(self._active)
+            self._queues.clear()
+            self._ready.clear()
+            self._cond.notify_all()
+        
+        for request in pending:
+            request.handle.cancel()
+            request.handle.set_exception(SearchCancelled("AI服务已停止"))
+        for request in active:
+            request.handle.cancel()
+        
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            if self.cache_dir:
+                self.save_snapshots()
+        self._threads = []
+    
+    def get_table(self, game_type):
+        """获取某游戏类型的置换表（各工作进程退出时把自己的条目合并到这里）"""
+        with self._tables_lock:
+            table = self._tables.get(game_type)
+            if table is None:
+                snapshot = None
+                if self.cache_dir:
+                    snapshot = CacheSnapshot.load(snapshot_path(self.cache_dir, game_type))
+                table = TranspositionTable(self.table_size, snapshot)
+                self._tables[game_type] = table
+            return table
+    
+    def save_snapshots(self):
+        """将各游戏的置换表写回缓存目录，返回 {游戏类型: 条目数}"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._tables_lock:
+            tables = dict(self._tables)
+        return {game_type: table.save_snapshot(snapshot_path(self.cache_dir, game_type))
+                for game_type, table in tables.items()}
+    
+    def submit(self, game, color, level, game_id=None, budget=None, **options):
+        """提交搜索请求
+        
+        Args:
+            game: 游戏对象（会被复制，提交后可继续修改）
+            color: 执子方
+            level: AI等级
+            game_id: 对局标识，公平调度按此轮转（默认每个请求单独一份）
+            budget: 本步时间预算（秒），默认使用 default_budget
+            **options: 传给AI构造函数的参数
+        
+        Returns:
+            SearchHandle: 搜索句柄
+        """
+        if not self._running:
+            raise RuntimeError("AI服务未启动")
+        
+        if budget is None:
+            budget = self.default_budget
+        request = AIRequest(copy.deepcopy(game), color, level, options, game_id, budget)
+        if game_id is None:
+            request.game_id = id(request)
+        
+        with self._cond:
+            queue = self._queues.get(request.game_id)
+            if queue is None:
+                queue = self._queues[request.game_id] = deque()
+                self._ready.append(request.game_id)
+            queue.append(request)
+            self._cond.notify()
+        
+        self.metrics.record_submit()
+        return request.handle
+    
+    def pending_count(self):
+        """排队中的请求数"""
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+    
+    def _next_request(self):
+        """按对局轮转取出下一个请求，服务停止时返回 None"""
+        with self._cond:
+            while self._running and not self._ready:
+                self._cond.wait()
+            if not self._running:
+                return None
+            
+            game_id = self._ready.popleft()
+            queue = self._queues[game_id]
+            request = queue.popleft()
+            if queue:
+                # 该对局还有请求，排到轮转队尾
+                self._ready.append(game_id)
+            else:
+                del self._queues[game_id]
+            self._active.add(request)
+            return request
+    
+    def _spawn(self):
+        """创建一个工作进程，返回 (进程, 管道, 共享的取消标志)"""
+        conn, child_conn = multiprocessing.Pipe()
+        cancel_flag = multiprocessing.RawValue('b', 0)
+        process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn, cancel_flag, self.cache_dir, self.table_size))
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        return process, conn, cancel_flag
+    
+    def _worker(self, worker):
+        """转发线程：把请求交给对应的工作进程，服务停止时收回其置换表"""
+        try:
+            while True:
+                request = self._next_request()
+                if request is None:
+                    return
+                try:
+                    worker = self._process(request, worker)
+                finally:
+                    with self._cond:
+                        self._active.discard(request)
+        finally:
+            self._stop_worker(worker)
+    
+    def _process(self, request, worker):
+        """处理一个请求，返回之后使用的工作进程（原进程退出时换新进程）"""
+        handle = request.handle
+        if handle.cancelled():
+            handle.set_exception(SearchCancelled("搜索开始前已取消"))
+            self.metrics.record_cancel()
+            return worker
+        
+        process, conn, cancel_flag = worker
+        request.started_at = time.perf_counter()
+        try:
+            message = pickle.dumps((request.strategy_key(), request.game, request.color))
+        except Exception as e:
+            # AI参数无法传给工作进程
+            self.metrics.record_done(request, 0.0, failed=True)
+            handle.set_exception(e)
+            return worker
+        
+        cancel_flag.value = 0
+        timer = None
+        if request.budget:
+            timer = threading.Timer(request.budget, self._expire, args=(request, cancel_flag))
+            timer.daemon = True
+            timer.start()
+        try:
+            conn.send_bytes(message)
+            reply = self._wait_reply(request, conn, cancel_flag)
+        except (EOFError, OSError) as e:
+            self.metrics.record_done(request, time.perf_counter() - request.started_at,
+                                     failed=True)
+            handle.set_exception(RuntimeError(f"AI工作进程异常退出: {e!r}"))
+            process.join(1.0)
+            return self._spawn()
+        finally:
+            if timer is not None:
+                timer.cancel()
+        
+        search_time = time.perf_counter() - request.started_at
+        if reply[0] == 'error':
+            self.metrics.record_done(request, search_time, failed=True)
+            handle.set_exception(reply[1])
+            return worker
+        
+        _, move, stats = reply
+        self.metrics.record_done(request, search_time)
+        handle.stats = stats
+        handle.set_result(move)
+        return worker
+    
+    @staticmethod
+    def _wait_reply(request, conn, cancel_flag):
+        """等待工作进程的结果，期间转发当前最佳落子和调用方的取消"""
+        handle = request.handle
+        while True:
+            if not conn.poll(0.02):
+                if handle.cancelled():
+                    cancel_flag.value = 1
+                continue
+            reply = conn.recv()
+            if reply[0] != 'best':
+                return reply
+            handle.report_best(reply[1], reply[2])
+    
+    def _stop_worker(self, worker):
+        """通知工作进程退出，把它的置换表合并到服务的置换表"""
+        process, conn, cancel_flag = worker
+        try:
+            conn.send(None)
+            _, tables = conn.recv()
+        except (EOFError, OSError):
+            tables = {}
+        finally:
+            conn.close()
+        process.join()
+        for game_type, (items, hits, misses, snapshot_hits) in tables.items():
+            self.get_table(game_type).merge(items, hits, misses, snapshot_hits)
+    
+    @staticmethod
+    def _expire(request, cancel_flag):
+        """时间预算用完：让工作进程结束搜索，结果为当前最佳落子
+        
+        只设置共享的取消标志，不取消调用方的句柄：handle.cancelled() 只表示
+        调用方或服务停止时的取消，这类结果应被丢弃，而超时的结果照常使用。
+        """
+        if not request.handle.done():
+            request.expired = True
+            cancel_flag.value = 1
+
+
+def main(argv=None):
+    """压测：模拟多局人机对弈同时向AI服务提交局面"""
+    from game_platform.game import GAME_CLASSES
+    
+    parser = argparse.ArgumentParser(description="AI服务压测")
+    parser.add_argument('--game', default='othello', choices=sorted(GAME_CLASSES))
+    parser.add_argument('--size', type=int, default=None, help="棋盘大小")
+    parser.add_argument('--games', type=int, default=20, help="同时进行的对局数")
+    parser.add_argument('--moves', type=int, default=10, help="每局AI的落子数")
+    parser.add_argument('--level', type=int, default=2, help="AI等级")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数")
+    parser.add_argument('--budget', type=float, default=None, help="每步时间预算（秒）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache-dir', default=None, help="置换表快照目录")
+    args = parser.parse_args(argv)
+    
+    board_size = args.size or {'gomoku': 15, 'go': 9, 'othello': 8}[args.game]
+    rng = random.Random(args.seed)
+    service = AIService(args.workers, args.budget, cache_dir=args.cache_dir)
+    service.start()
+    
+    def human_move(game):
+        """模拟人类：随机合法落子"""
+        valid_moves = game.get_valid_moves()
+        if valid_moves:
+            game.make_move(*rng.choice(valid_moves))
+        elif hasattr(game, 'pass_move'):
+            game.pass_move()
+    
+    # 人类执黑先走，AI执白
+    games = {}
+    for game_id in range(args.games):
+        game = GAME_CLASSES[args.game](board_size)
+        human_move(game)
+        games[game_id] = [game, service.submit(game, 'white', args.level, game_id), 0]
+    
+    start = time.perf_counter()
+    while games:
+        progressed = False
+        for game_id, entry in list(games.items()):
+            game, handle, moves = entry
+            if not handle.done():
+                continue
+            progressed = True
+            move = handle.result()
+            try:
+                if move is None:
+                    game.pass_move()
+                else:
+                    game.make_move(move[0], move[1])
+            except (ValueError, AttributeError):
+                del games[game_id]
+                continue
+            
+            entry[2] = moves = moves + 1
+            if not game.game_over:
+                human_move(game)
+            if game.game_over or moves >= args.moves or game.current_player != 'white':
+                del games[game_id]
+                continue
+            entry[1] = service.submit(game, 'white', args.level, game_id)
+        if not progressed:
+            time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    service.shutdown()
+    
+    metrics = service.metrics.snapshot()
+    table = service.get_table(args.game)
+    print(f"{args.games} 局 x {args.moves} 步, {service.workers} 个工作进程, 用时 {elapsed:.2f}s")
+    print(f"  吞吐量: {metrics['completed'] / elapsed:.1f} 步/秒 "
+          f"(完成 {metrics['completed']}, 超时 {metrics['expired']}, 失败 {metrics['failed']})")
+    print(f"  排队延迟: 平均 {metrics['queue_mean_ms']:.1f}ms, "
+          f"p50 {metrics['queue_p50_ms']:.1f}ms, p95 {metrics['queue_p95_ms']:.1f}ms")
+    print(f"  搜索耗时: 平均 {metrics['search_mean_ms']:.1f}ms")
+    print(f"  置换表: {len(table)} 条, 命中率 {table.hit_rate:.1%}"
+          f" (快照命中 {table.snapshot_hits})")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
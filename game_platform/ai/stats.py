@@ -0,0 +1,91 @@
+"""
+AI搜索统计
+"""
+
+import io
+import pstats
+import time
+
+
+class SearchStats:
+    """单次落子搜索的统计信息"""
+    
+    def __init__(self):
+        self.nodes = 0           # 搜索/评估的节点数
+        self.max_depth = 0       # 达到的最大搜索深度
+        self.time_spent = 0.0    # 耗时（秒）
+        self.tt_hits = 0         # 置换表命中次数
+        self.cutoffs = 0         # 剪枝次数
+        self.re_searches = 0     # 零窗口/渴望窗口试探失败后的重新搜索次数
+        self.expanded = 0        # 展开的内部节点数
+        self.children = 0        # 展开节点的子节点总数
+        self.move = None         # 选出的落子
+        self.score = None        # 选出落子的评分
+        self.ponder_hit = False  # 是否直接使用了预读结果
+        self.profile = None      # 性能剖析摘要（文本）
+        self._start_time = None
+    
+    def start(self):
+        """开始计时"""
+        self._start_time = time.perf_counter()
+    
+    def stop(self):
+        """停止计时"""
+        if self._start_time is not None:
+            self.time_spent = time.perf_counter() - self._start_time
+            self._start_time = None
+    
+    def record_expansion(self, branches):
+        """记录一次节点展开及其分支数"""
+        self.expanded += 1
+        self.children += branches
+    
+    def record_depth(self, depth):
+        """记录到达的搜索深度"""
+        if depth > self.max_depth:
+            self.max_depth = depth
+    
+    @property
+    def branching_factor(self):
+        """平均分支因子"""
+        if self.expanded == 0:
+            return 0.0
+        return self.children / self.expanded
+    
+    @property
+    def nodes_per_second(self):
+        """每秒搜索节点数"""
+        if self.time_spent <= 0:
+            return 0.0
+        return self.nodes / self.time_spent
+    
+    def attach_profile(self, profiler, limit=15):
+        """保存 cProfile 剖析结果的摘要"""
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        self.profile = output.getvalue()
+    
+    def summary(self):
+        """简短的文字摘要（用于状态栏）"""
+        if self.ponder_hit:
+            return "命中预读"
+        text = f"节点 {self.nodes} | 深度 {self.max_depth} | 用时 {self.time_spent * 1000:.0f}ms"
+        if self.tt_hits:
+            text += f" | 置换表命中 {self.tt_hits}"
+        return text
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'nodes': self.nodes,
+            'max_depth': self.max_depth,
+            'time_spent': self.time_spent,
+            'tt_hits': self.tt_hits,
+            'cutoffs': self.cutoffs,
+            're_searches': self.re_searches,
+            'branching_factor': self.branching_factor,
+            'nodes_per_second': self.nodes_per_second,
+            'move': list(self.move) if self.move else None,
+            'score': self.score,
+            'ponder_hit': self.ponder_hit,
+        }
\ No newline at end of file
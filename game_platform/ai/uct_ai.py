@@ -0,0 +1,167 @@
+# game_platform/ai/uct_ai.py
+"""
+四级AI：蒙特卡洛树搜索（UCT）
+使用规则感知的快速随机对局评估局面，仅支持五子棋
+"""
+
+import math
+import random
+import time
+from game_platform.ai.base import AIStrategy
+from game_platform.ai.candidates import get_neighbor_table
+from game_platform.ai.playout import EMPTY, GomokuPlayoutState
+from game_platform.game import GomokuGame
+
+
+class _Node:
+    """搜索树节点"""
+    
+    __slots__ = ('move', 'parent', 'player', 'children', 'untried', 'wins', 'visits')
+    
+    def __init__(self, move, parent, player, untried):
+        self.move = move          # 到达该节点的落子（扁平下标）
+        self.parent = parent
+        self.player = player      # 走出该落子的一方，wins 按其视角统计
+        self.children = []
+        self.untried = untried    # 尚未展开的落子
+        self.wins = 0.0
+        self.visits = 0
+
+
+class UCTAI(AIStrategy):
+    """蒙特卡洛树搜索AI - 四级AI
+    
+    树内按 UCT 公式选择，叶子节点用 GomokuPlayoutState.playout 随机下完。
+    展开时遵守强制规则（能成五只走成五点，对手有成五点只能挡），
+    其余候选为已有棋子邻域内的空位，按窗口分值排序后只保留前 max_children 个，
+    并按分值从高到低依次展开。
+    """
+    
+    # 随机模拟且受时间限制，结果不可复现，不写入置换表
+    cacheable = False
+    # 每隔多少次迭代检查一次时间和取消
+    CHECK_INTERVAL = 64
+    
+    def __init__(self, iterations=50000, time_limit=2.0, exploration=1.0,
+                 candidate_radius=2, max_children=12, playout_plies=None,
+                 local_playout=True, seed=None):
+        """
+        Args:
+            iterations: 最大迭代（随机对局）次数
+            time_limit: 每步时间上限（秒），None 表示只按迭代次数
+            exploration: UCT 探索系数
+            candidate_radius: 展开候选点的邻域半径
+            max_children: 每个节点最多展开的子节点数
+            playout_plies: 随机对局最多走的步数，超过按和棋计（None 表示下完）
+            local_playout: 随机对局是否优先在上一手附近落子
+            seed: 随机种子
+        """
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.candidate_radius = candidate_radius
+        self.max_children = max_children
+        self.playout_plies = playout_plies
+        self.local_playout = local_playout
+        self._rng = random.Random(seed)
+    
+    def get_level(self):
+        return 4
+    
+    def cache_key(self):
+        return (4, self.iterations, self.time_limit, self.exploration,
+                self.candidate_radius, self.max_children, self.playout_plies,
+                self.local_playout)
+    
+    def rank_moves(self, game, color):
+        """五子棋按展开顺序（强制规则和窗口分值）排列候选点，其他情况使用默认排序"""
+        if not isinstance(game, GomokuGame) or color != game.current_player:
+            return super().rank_moves(game, color)
+        size = game.board.size
+        state = GomokuPlayoutState.from_game(game)
+        neighbors = get_neighbor_table(size, self.candidate_radius)
+        return [divmod(k, size) for k in state.candidate_moves(neighbors, self.max_children)]
+    
+    def get_move(self, game, color):
+        """获取最佳走法"""
+        if not isinstance(game, GomokuGame):
+            valid_moves = game.get_valid_moves()
+            return self._rng.choice(valid_moves) if valid_moves else None
+        
+        size = game.board.size
+        root_state = GomokuPlayoutState.from_game(game)
+        neighbors = get_neighbor_table(size, self.candidate_radius)
+        untried = root_state.candidate_moves(neighbors, self.max_children)
+        if len(untried) == 1:
+            # 成五或唯一的挡点，无需搜索
+            return divmod(untried[0], size)
+        
+        root = _Node(None, None, 3 - root_state.to_move, untried)
+        self._search(root, root_state, neighbors)
+        if not root.children:
+            return divmod(untried[0], size)
+        
+        best = max(root.children, key=lambda node: node.visits)
+        move = divmod(best.move, size)
+        self.report_best(move, best.wins / best.visits)
+        return move
+    
+    def _search(self, root, root_state, neighbors):
+        """UCT 主循环：选择、展开、随机对局、回传"""
+        stats = self.stats
+        rng = self._rng
+        exploration = self.exploration
+        playout_plies = self.playout_plies
+        playout_neighbors = neighbors if self.local_playout else None
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        size = root_state.size
+        max_children = self.max_children
+        
+        for i in range(self.iterations):
+            if i % self.CHECK_INTERVAL == 0 and i:
+                if self.is_cancelled() or (deadline is not None and time.perf_counter() >= deadline):
+                    break
+                best = max(root.children, key=lambda node: node.visits)
+                self.report_best(divmod(best.move, size), best.wins / best.visits)
+            
+            node = root
+            state = root_state.copy()
+            depth = 0
+            
+            # 选择：节点已完全展开时按 UCT 走到子节点
+            while not node.untried and node.children:
+                log_visits = math.log(node.visits)
+                node = max(node.children, key=lambda child: child.wins / child.visits
+                           + exploration * math.sqrt(log_visits / child.visits))
+                state.play(node.move)
+                depth += 1
+            
+            # 展开：取分值最高的未展开落子
+            if node.untried:
+                move = node.untried.pop(0)
+                player = state.to_move
+                state.play(move)
+                untried = []
+                if state.winner is None:
+                    untried = state.candidate_moves(neighbors, max_children)
+                child = _Node(move, node, player, untried)
+                node.children.append(child)
+                stats.record_expansion(len(untried))
+                node = child
+                depth += 1
+            
+            # 随机对局
+            winner = state.playout(rng, playout_plies, playout_neighbors)
+            stats.nodes += 1
+            stats.record_depth(depth)
+            
+            # 回传
+            while node is not None:
+                node.visits += 1
+                if winner == node.player:
+                    node.wins += 1.0
+                elif winner == EMPTY:
+                    node.wins += 0.5
+                node = node.parent
\ No newline at end of file
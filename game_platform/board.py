@@ -7,12 +7,28 @@
 from abc import ABC, abstractmethod
 
 
+# 对称变换下标表缓存 {(size, transform): [flat_index, ...]}
+_SYMMETRY_TABLES = {}
+
+
 class Board(ABC):
     """棋盘基类"""
     
+    # 二面体群D4的8种变换编号：
+    # 0=恒等, 1=顺时针90°, 2=180°, 3=顺时针270°,
+    # 4=左右镜像, 5=上下镜像, 6=主对角线转置, 7=副对角线转置
+    SYMMETRY_TRANSFORMS = range(8)
+    # 各变换的逆变换
+    INVERSE_TRANSFORMS = (0, 3, 2, 1, 4, 5, 6, 7)
+    # 编码棋盘局面时使用的字符
+    STONE_CHARS = {None: '.', 'black': 'b', 'white': 'w'}
+    # 支持的棋盘大小范围
+    MIN_SIZE = 8
+    MAX_SIZE = 19
+    
     def __init__(self, size):
-        if not (8 <= size <= 19):
-            raise ValueError("棋盘大小必须在8到19之间")
+        if not (self.MIN_SIZE <= size <= self.MAX_SIZE):
+            raise ValueError(f"棋盘大小必须在{self.MIN_SIZE}到{self.MAX_SIZE}之间")
         self.size = size
         self.grid = [[None for _ in range(size)] for _ in range(size)]
         
@@ -71,6 +87,73 @@ class Board(ABC):
                     count += 1
         return count
 
+    def transform_position(self, row, col, transform):
+        """将坐标按对称变换映射到变换后棋盘上的坐标"""
+        n = self.size - 1
+        if transform == 0:
+            return row, col
+        elif transform == 1:
+            return col, n - row
+        elif transform == 2:
+            return n - row, n - col
+        elif transform == 3:
+            return n - col, row
+        elif transform == 4:
+            return row, n - col
+        elif transform == 5:
+            return n - row, col
+        elif transform == 6:
+            return col, row
+        elif transform == 7:
+            return n - col, n - row
+        raise ValueError(f"未知的对称变换: {transform}")
+    
+    def inverse_transform_position(self, row, col, transform):
+        """将变换后棋盘上的坐标映射回原棋盘"""
+        return self.transform_position(row, col, self.INVERSE_TRANSFORMS[transform])
+    
+    def _get_symmetry_table(self, transform):
+        """获取变换后每个格子对应的原棋盘扁平下标（按棋盘大小缓存）"""
+        key = (self.size, transform)
+        table = _SYMMETRY_TABLES.get(key)
+        if table is None:
+            inverse = self.INVERSE_TRANSFORMS[transform]
+            table = []
+            for i in range(self.size):
+                for j in range(self.size):
+                    r, c = self.transform_position(i, j, inverse)
+                    table.append(r * self.size + c)
+            _SYMMETRY_TABLES[key] = table
+        return table
+    
+    def position_key(self, transform=0):
+        """获取局面编码字符串（可指定对称变换）"""
+        chars = self.STONE_CHARS
+        flat = [chars[stone] for row in self.grid for stone in row]
+        if transform == 0:
+            return ''.join(flat)
+        return ''.join([flat[k] for k in self._get_symmetry_table(transform)])
+    
+    def get_canonical_key(self):
+        """获取局面的规范编码
+        
+        在8种对称变换中取编码最小者，对称等价的局面得到相同编码。
+        
+        Returns:
+            tuple: (规范编码, 变换编号)。用 transform_position 将原棋盘坐标
+            映射到规范局面，用 inverse_transform_position 映射回来。
+        """
+        chars = self.STONE_CHARS
+        flat = [chars[stone] for row in self.grid for stone in row]
+        best_key = ''.join(flat)
+        best_transform = 0
+        for transform in self.SYMMETRY_TRANSFORMS[1:]:
+            key = ''.join([flat[k] for k in self._get_symmetry_table(transform)])
+            if key < best_key:
+                best_key = key
+                best_transform = transform
+        return best_key, best_transform
+
 
 class GomokuBoard(Board):
     """五子棋棋盘"""
@@ -236,6 +319,14 @@ class OthelloBoard(Board):
         
         return []
     
+    def undo_place_and_flip(self, row, col, flipped):
+        """撤销 place_and_flip：移除落子并将翻转的棋子翻回"""
+        color = self.grid[row][col]
+        opponent = 'white' if color == 'black' else 'black'
+        self.grid[row][col] = None
+        for r, c in flipped:
+            self.grid[r][c] = opponent
+    
     def copy(self):
         """创建棋盘的深拷贝"""
         new_board = OthelloBoard(self.size)
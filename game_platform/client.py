@@ -106,7 +106,7 @@ class GameClient:
                 "用法: start <game_type> <size> [black_type] [white_type] [black_ai_level] [white_ai_level]\n"
                 "  game_type: gomoku, go, othello\n"
                 "  player_type: human, ai\n"
-                "  ai_level: 1-3",
+                "  ai_level: 1-4 (4仅五子棋)",
                 'error'))
             return
         
@@ -386,7 +386,7 @@ start <type> <size> [black_type] [white_type] [black_ai] [white_ai]
                     - 开始游戏
                       type: gomoku/go/othello
                       player_type: human/ai
-                      ai_level: 1(随机)/2(评估)/3(MCTS)
+                      ai_level: 1(随机)/2(评估)/3(MCTS)/4(UCT,仅五子棋)
 move <row> <col>    - 落子 (如: move 8 H)
 pass                - 弃权 (围棋/黑白棋)
 undo                - 悔棋
@@ -590,4 +590,11 @@ class OthelloGame(Game):
         
         for i in range(self.board_size):
             for j in range(self.board_size):
-                self.board.grid[i][j] = game_state['board'][i][j]
\ No newline at end of file
+                self.board.grid[i][j] = game_state['board'][i][j]
+
+# 游戏类型名到游戏类的映射
+GAME_CLASSES = {
+    'gomoku': GomokuGame,
+    'go': GoGame,
+    'othello': OthelloGame,
+}
\ No newline at end of file
@@ -4,7 +4,10 @@
 """
 
 from game_platform.network.server import GameServer
+from game_platform.network.async_server import AsyncGameServer
 from game_platform.network.client import NetworkClient
+from game_platform.network.room import Room, RoomManager
+from game_platform.network.matchmaking import Matchmaker
 from game_platform.network.protocol import Protocol, MessageType
 
-__all__ = ['GameServer', 'NetworkClient', 'Protocol', 'MessageType']
\ No newline at end of file
+__all__ = ['GameServer', 'AsyncGameServer', 'NetworkClient', 'Room', 'RoomManager', 'Matchmaker', 'Protocol', 'MessageType']
\ No newline at end of file
@@ -0,0 +1,210 @@
+# game_platform/network/async_server.py
+"""
+基于 asyncio 的网络对战服务器
+
+与 GameServer 使用相同的消息协议（JSON 行或协商后的二进制帧），消息处理逻辑直接继承自 GameServer，
+只替换传输层：单线程事件循环，每个连接一个协程，不再每个客户端一个线程、
+也不再用一秒超时轮询 recv，可以同时承载数千个连接。
+"""
+
+import asyncio
+from game_platform.network.protocol import FrameDecoder, ProtocolError
+from game_platform.network.server import GameServer
+
+
+class _Connection:
+    """一个客户端连接（在 clients 字典中代替 socket 作为键）"""
+    
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info('peername')
+        self.closing = False
+        self.wakeup = asyncio.Event()  # 发送队列有新消息
+    
+    def close(self):
+        if not self.closing:
+            self.closing = True
+            self.writer.close()
+
+    def abort(self):
+        """立即断开，丢弃未写出的数据（对方不读时 close 会一直等缓冲区写完）"""
+        self.closing = True
+        self.writer.transport.abort()
+
+
+class AsyncGameServer(GameServer):
+    """asyncio 游戏服务器
+    
+    写入不阻塞：消息进入连接的发送队列（与 GameServer 相同的 Outbox 和满队列策略），
+    每个连接有一个写协程取出消息写入并等待 drain，慢客户端只会让自己的队列变长，
+    不会拖慢其他连接。
+    """
+    
+    def __init__(self, host='0.0.0.0', port=9999, backlog=1024, max_line=64 * 1024,
+                 queue_size=256, queue_policy='snapshot', spectator_interval=0.0, session_timeout=60.0,
+                 heartbeat_interval=15.0, idle_timeout=45.0):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口
+            backlog: 监听队列长度
+            max_line: 单条消息的最大长度（字节）
+            queue_size: 每个连接最多排队的消息数
+            queue_policy: 队列满时的处理策略（'snapshot' 或 'disconnect'）
+            spectator_interval: 观战者增量消息的合并间隔（秒），0 表示不合并
+            session_timeout: 断线玩家保留座位的时间（秒），0 表示断线立即释放
+            heartbeat_interval: 发送 ping 的间隔（秒），0 表示不发心跳
+            idle_timeout: 多久没有收到数据就断开连接（秒），0 表示不检测
+        """
+        super().__init__(host, port, queue_size, queue_policy, spectator_interval, session_timeout,
+                         heartbeat_interval, idle_timeout, backlog)
+        self.max_line = max_line
+        self._loop = None
+        self._server = None
+        self._stopped = None
+        self._tasks = set()
+    
+    def start(self):
+        """启动服务器（阻塞直到 stop 被调用）"""
+        asyncio.run(self.serve())
+    
+    async def serve(self, ready=None):
+        """在当前事件循环中运行服务器
+        
+        Args:
+            ready: 开始监听后调用的回调（可选）
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, backlog=self.backlog)
+        if not self.port:
+            # 端口为0时由系统分配
+            self.port = self._server.sockets[0].getsockname()[1]
+        self.running = True
+        self.log(f"服务器启动在 {self.host}:{self.port}")
+        if ready:
+            ready()
+        
+        maintenance = asyncio.ensure_future(self._maintenance_task())
+        try:
+            await self._stopped.wait()
+        finally:
+            maintenance.cancel()
+            await self._shutdown()
+        self.log("服务器已停止")
+    
+    def stop(self):
+        """停止服务器（可从其他线程调用）"""
+        self.running = False
+        loop = self._loop
+        if loop is not None and self._stopped is not None:
+            try:
+                loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+    
+    async def _shutdown(self, timeout=5.0, drain_timeout=1.0):
+        """优雅关闭：停止接受新连接，等待发送队列写出，关闭现有连接并等待连接协程结束
+        
+        Args:
+            timeout: 等待连接协程结束的最长时间（秒）
+            drain_timeout: 等待发送队列写出的最长时间（秒），不读数据的客户端剩余的消息丢弃
+        """
+        self.running = False
+        self._server.close()
+        await self._server.wait_closed()
+        
+        if self.spectator_interval > 0:
+            # 合并中的观战增量也在关闭前发出
+            self._flush_spectators()
+        with self.lock:
+            connections = [(conn, info['outbox']) for conn, info in self.clients.items()]
+        deadline = self._loop.time() + drain_timeout
+        while any(len(outbox) for _, outbox in connections) and self._loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        # 写协程取出的消息已写入传输层，close 会在写完缓冲区后再断开
+        for conn, _ in connections:
+            conn.close()
+        
+        if self._tasks:
+            _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+    
+    async def _handle_connection(self, reader, writer):
+        """处理一个客户端连接"""
+        conn = _Connection(reader, writer)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        info = self._new_client_info(conn, conn.addr)
+        with self.lock:
+            self.clients[conn] = info
+        self.log(f"新连接: {conn.addr}")
+        decoder = FrameDecoder(max_frame=self.max_line)
+        write_task = asyncio.ensure_future(self._writer(conn, info['outbox']))
+        
+        try:
+            while self.running and not conn.closing:
+                data = await reader.read(65536)
+                if not data:
+                    self.log(f"客户端 {conn.addr} 关闭连接")
+                    break
+                
+                decoder.feed(data)
+                try:
+                    self._process_buffered(conn, decoder)
+                except ProtocolError as e:
+                    # 单条消息超过 max_line
+                    self.log(f"客户端 {conn.addr} 协议错误: {e}")
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._remove_client(conn)
+            try:
+                await write_task
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            self._tasks.discard(task)
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+    
+    async def _writer(self, conn, outbox):
+        """写协程：把发送队列中的消息合并写出，等待 drain 后再取下一批"""
+        while not outbox.closed:
+            await conn.wakeup.wait()
+            conn.wakeup.clear()
+            items = outbox.take_nowait()
+            if not items:
+                continue
+            try:
+                conn.writer.write(b''.join(data for data, _ in items))
+                await conn.writer.drain()
+            except ConnectionError as e:
+                self.log(f"发送失败: {e}")
+                conn.close()
+                break
+            outbox.mark_sent(items)
+    
+    async def _maintenance_task(self):
+        """定时任务（协程版）"""
+        interval = self._maintenance_interval()
+        while self.running:
+            await asyncio.sleep(interval)
+            try:
+                self._maintenance()
+            except Exception as e:
+                self.log(f"定时任务出错: {e}")
+                import traceback
+                traceback.print_exc()
+    
+    def _wake_writer(self, conn):
+        conn.wakeup.set()
+    
+    def _close_connection(self, conn):
+        conn.abort()
\ No newline at end of file
@@ -2,21 +2,46 @@
 """
 网络对战客户端（修复版v2）
 """
+import selectors
 import socket
 import threading
-import json
 import time
 from game_platform.board import GomokuBoard, GoBoard, OthelloBoard
+from game_platform.network.protocol import FrameDecoder, ProtocolError, encode_frame, encode_line
 
 
 class NetworkClient:
-    """网络客户端"""
+    """网络客户端
+    
+    加入房间后服务器下发会话令牌。连接意外断开时接收线程自动重连并发送 resume，
+    服务器恢复座位后只补发错过的增量（落后太多时发完整快照）。
+    
+    接收线程阻塞在 selector 上，只在有数据或到了心跳时间才醒来：每 heartbeat_interval 秒
+    发一次 ping 测量往返时间（rtt），heartbeat_timeout 秒内没有收到任何数据则认为连接已断。
+    """
+    
+    RECONNECT_DELAYS = (0, 0.05, 0.1, 0.2, 0.5, 1, 2, 4, 8, 8)  # 每次重连前等待的秒数
     
     def __init__(self):
         self.socket = None
         self.connected = False
+        self.host = None
+        self.port = None
+        self.session = None  # 服务器下发的会话令牌
+        self.auto_reconnect = True  # 连接意外断开时自动重连
+        self.heartbeat_interval = 15.0  # 发送 ping 的间隔（秒），0 表示不发
+        self.heartbeat_timeout = 45.0  # 多久没有收到数据视为连接已断（秒）
+        self.rtt = None  # 平滑后的往返时间（秒）
+        self._last_seen = 0.0
+        self._last_ping = 0.0
+        self._offer_binary = True
+        self.binary = False  # 服务器已确认二进制帧
         self.color = None
         self.username = None
+        self.room_id = None
+        self.spectator = False  # 以观战者身份加入
+        self.rooms = []  # 最近一次收到的房间列表
+        self.matching = False  # 正在匹配队列中
         self.lock = threading.Lock()
         
         # 游戏状态
@@ -27,6 +52,8 @@ class NetworkClient:
         self.winner = None
         self.game_type = None
         self.players = {}
+        self.seq = None  # 已应用的最后一条状态序号
+        self._sync_pending = False
         
         # 回调函数
         self.on_message = None
@@ -34,17 +61,31 @@ class NetworkClient:
         self.on_game_start = None
         self.on_game_over = None
         self.on_undo_request = None
+        self.on_room_list = None
         
         # 接收线程
         self._recv_thread = None
         self._running = False
     
-    def connect(self, host, port, username, preferred_color='black'):
-        """连接到服务器"""
+    def connect(self, host, port, username, preferred_color='black', room_id=None, binary=True,
+                spectate=False, join=True):
+        """连接到服务器
+        
+        Args:
+            room_id: 要加入的房间，None 时加入默认房间
+            binary: 是否提出升级为二进制帧（服务器不支持时继续使用 JSON）
+            spectate: 以观战者身份加入（只接收棋局，不能落子）
+            join: 是否立即加入房间（False 时只连接，之后再 find_match 或 join_room）
+        """
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((host, int(port)))
             self.connected = True
+            self.binary = False
+            self.host = host
+            self.port = int(port)
+            self.session = None
+            self._offer_binary = binary
             self.username = username
             self._running = True
             
@@ -58,13 +99,22 @@ class NetworkClient:
             # 等待接收线程启动
             time.sleep(0.1)
             
+            if not join:
+                return
+            
             # 发送加入请求
             print(f"[Client] 发送 join 请求: {username}, {preferred_color}")
-            success = self._send({
+            join_msg = {
                 'type': 'join',
                 'username': username,
-                'color': preferred_color
-            })
+                'color': preferred_color,
+                'binary': binary
+            }
+            if room_id is not None:
+                join_msg['room_id'] = room_id
+            if spectate:
+                join_msg['spectate'] = True
+            success = self._send(join_msg)
             print(f"[Client] join 请求发送结果: {success}")
             
         except Exception as e:
@@ -73,82 +123,182 @@ class NetworkClient:
             raise
     
     def disconnect(self):
-        """断开连接"""
+        """断开连接（主动离开房间，服务器不再保留座位）"""
+        if self.connected and self.room_id is not None:
+            self._send({
+                'type': 'leave_room'
+            })
         self._running = False
         self.connected = False
         
         if self.socket:
-            try:
-                self.socket.close()
-            except:
-                pass
+            self._close_socket(self.socket)
             self.socket = None
         
         print("[Client] 已断开连接")
     
     def _receive_loop(self):
-        """接收消息循环"""
-        buffer = ""
-        
+        """接收消息循环（连接意外断开且有会话时自动重连）"""
         print("[Client] 接收线程已启动")
         
+        while True:
+            self._receive_messages()
+            if not (self._running and self.auto_reconnect and self.session):
+                break
+            print("[Client] 连接中断，尝试重连")
+            if not self._reconnect():
+                break
+        
+        self.connected = False
+        print("[Client] 接收线程已退出")
+    
+    def _receive_messages(self):
+        """从当前连接接收并处理消息，直到连接断开"""
+        decoder = FrameDecoder()
+        sock = self.socket
+        # 阻塞模式（其他线程的 sendall 共用这个 socket），等待交给 selector
+        sock.settimeout(None)
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        self._last_seen = self._last_ping = time.monotonic()
+        
         while self._running and self.connected:
             try:
-                self.socket.settimeout(1.0)
                 try:
-                    data = self.socket.recv(4096)
-                    if not data:
+                    ready = selector.select(self._heartbeat_wait())
+                    if self._heartbeat_wait() == 0:
+                        # 到了心跳时间
+                        if time.monotonic() - self._last_seen >= self.heartbeat_timeout:
+                            print("[Client] 心跳超时，连接已断开")
+                            break
+                        self.ping()
+                    if not ready:
+                        continue
+                    
+                    received = decoder.recv_into(sock)
+                    if not received:
                         print("[Client] 连接已关闭")
                         break
                     
-                    decoded = data.decode('utf-8')
-                    print(f"[Client] 收到原始数据: {decoded[:200]}")
-                    buffer += decoded
+                    self._last_seen = time.monotonic()
+                    print(f"[Client] 收到数据: {received} 字节")
                     
                     # 处理可能的多条消息
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        if line.strip():
-                            self._process_message(line.strip())
-                            
-                except socket.timeout:
-                    continue
+                    while True:
+                        try:
+                            msg = decoder.next_message()
+                        except ValueError as e:
+                            print(f"[Client] 消息解析错误: {e}")
+                            continue
+                        if msg is None:
+                            break
+                        self._process_message(msg)
+                
+                except ProtocolError as e:
+                    print(f"[Client] 协议错误: {e}")
+                    break
                     
             except Exception as e:
                 if self._running:
                     print(f"[Client] 接收错误: {e}")
                 break
         
+        selector.close()
         self.connected = False
-        print("[Client] 接收线程已退出")
     
-    def _process_message(self, data):
+    def _heartbeat_wait(self):
+        """距离下一次发 ping 的秒数，不发心跳时返回 None（一直等待）"""
+        if self.heartbeat_interval <= 0:
+            return None
+        return max(0.0, self._last_ping + self.heartbeat_interval - time.monotonic())
+    
+    def _close_socket(self, sock):
+        """关闭 socket（shutdown 唤醒阻塞在 selector 上的接收线程）"""
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except:
+            pass
+        try:
+            sock.close()
+        except:
+            pass
+    
+    def _reconnect(self):
+        """重新连接并发送 resume（会话令牌 + 已应用的序号），成功返回 True"""
+        if self.socket:
+            self._close_socket(self.socket)
+        
+        for delay in self.RECONNECT_DELAYS:
+            time.sleep(delay)
+            if not self._running:
+                return False
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=5.0)
+            except OSError as e:
+                print(f"[Client] 重连失败: {e}")
+                continue
+            
+            self.socket = sock
+            self.binary = False
+            self.connected = True
+            self._sync_pending = False
+            if self._send({
+                'type': 'resume',
+                'session': self.session,
+                'seq': self.seq,
+                'binary': self._offer_binary
+            }):
+                print(f"[Client] 已重连到 {self.host}:{self.port}")
+                return True
+            self.connected = False
+        return False
+    
+    def _process_message(self, msg):
         """处理服务器消息"""
         try:
-            msg = json.loads(data)
             msg_type = msg.get('type')
             
             print(f"[Client] 处理消息: {msg_type}")
             
             if msg_type == 'color_assigned':
                 self._handle_color_assigned(msg)
+            elif msg_type == 'resumed':
+                self._handle_resumed(msg)
+            elif msg_type == 'resume_failed':
+                self._handle_resume_failed(msg)
+            elif msg_type == 'queued':
+                self._handle_queued(msg)
+            elif msg_type == 'queue_left':
+                self._handle_queue_left(msg)
+            elif msg_type == 'match_found':
+                self._handle_match_found(msg)
+            elif msg_type == 'ping':
+                self._send({'type': 'pong', 'time': msg.get('time')})
+            elif msg_type == 'pong':
+                self._handle_pong(msg)
             elif msg_type == 'players_update':
                 self._handle_players_update(msg)
             elif msg_type == 'game_start':
                 self._handle_game_start(msg)
             elif msg_type == 'state_update':
                 self._handle_state_update(msg)
+            elif msg_type == 'state_delta':
+                self._handle_state_delta(msg)
             elif msg_type == 'game_over':
                 self._handle_game_over(msg)
             elif msg_type == 'undo_request':
                 self._handle_undo_request(msg)
+            elif msg_type == 'room_created':
+                self._handle_room_created(msg)
+            elif msg_type == 'room_list':
+                self._handle_room_list(msg)
+            elif msg_type == 'room_left':
+                self._handle_room_left(msg)
             elif msg_type == 'message':
                 self._handle_message(msg)
             elif msg_type == 'error':
                 self._handle_error(msg)
                 
-        except json.JSONDecodeError as e:
-            print(f"[Client] JSON解析错误: {e}, 数据: {data[:100]}")
         except Exception as e:
             print(f"[Client] 处理消息错误: {e}")
             import traceback
@@ -157,11 +307,70 @@ class NetworkClient:
     def _handle_color_assigned(self, msg):
         """处理颜色分配"""
         self.color = msg.get('color')
-        print(f"[Client] ★★★ 分配到颜色: {self.color}")
+        self.spectator = msg.get('role') == 'spectator'
+        self.room_id = msg.get('room_id', self.room_id)
+        self.session = msg.get('session', self.session)
+        # 服务器确认后改发二进制帧
+        self.binary = self.binary or bool(msg.get('binary'))
+        print(f"[Client] ★★★ 分配到颜色: {self.color}, 房间: {self.room_id}")
         
         if self.on_message:
-            color_name = "黑方" if self.color == 'black' else "白方"
-            self.on_message('info', f"你是{color_name}")
+            if self.spectator:
+                self.on_message('info', "你正在观战")
+            else:
+                color_name = "黑方" if self.color == 'black' else "白方"
+                self.on_message('info', f"你是{color_name}")
+    
+    def _handle_resumed(self, msg):
+        """处理重连成功（随后服务器补发错过的增量或完整快照）"""
+        self.color = msg.get('color')
+        self.spectator = msg.get('role') == 'spectator'
+        self.room_id = msg.get('room_id', self.room_id)
+        self.session = msg.get('session', self.session)
+        self.binary = self.binary or bool(msg.get('binary'))
+        print(f"[Client] 会话已恢复: {self.color}, 房间: {self.room_id}, 本地序号 {self.seq}, 服务器序号 {msg.get('seq')}")
+        
+        if self.on_message:
+            self.on_message('info', "已重新连接")
+    
+    def _handle_resume_failed(self, msg):
+        """处理重连失败（会话已过期，座位已释放）"""
+        self.session = None
+        self._handle_room_left(msg)
+        message = msg.get('message', '会话已失效')
+        print(f"[Client] 重连失败: {message}")
+        if self.on_message:
+            self.on_message('error', message)
+    
+    def _handle_pong(self, msg):
+        """处理心跳回应：更新往返时间（平滑系数 1/8）"""
+        sent_at = msg.get('time')
+        if not isinstance(sent_at, (int, float)):
+            return
+        sample = time.monotonic() - sent_at
+        if sample >= 0:
+            self.rtt = sample if self.rtt is None else self.rtt + (sample - self.rtt) / 8
+    
+    def _handle_queued(self, msg):
+        """处理进入匹配队列"""
+        self.matching = True
+        print(f"[Client] 排队匹配: {msg.get('game_type')} {msg.get('board_size')}, 等级分 {msg.get('rating')}")
+        if self.on_message:
+            self.on_message('info', f"正在匹配（等级分 {msg.get('rating')}）...")
+    
+    def _handle_queue_left(self, msg):
+        """处理退出匹配队列"""
+        self.matching = False
+        if self.on_message:
+            self.on_message('info', "已取消匹配")
+    
+    def _handle_match_found(self, msg):
+        """处理匹配成功（随后服务器会发送 color_assigned 和 game_start）"""
+        self.matching = False
+        opponent = msg.get('opponent')
+        print(f"[Client] 匹配成功: 对手 {opponent}（{msg.get('opponent_rating')}），房间 {msg.get('room_id')}")
+        if self.on_message:
+            self.on_message('info', f"匹配成功，对手: {opponent}（等级分 {msg.get('opponent_rating')}）")
     
     def _handle_players_update(self, msg):
         """处理玩家更新"""
@@ -190,6 +399,7 @@ class NetworkClient:
         self.game_over = False
         self.winner = None
         self.current_player = 'black'
+        self.seq = msg.get('seq')
         
         print(f"[Client] 游戏开始: {self.game_type} {self.board_size}x{self.board_size}")
         
@@ -200,7 +410,7 @@ class NetworkClient:
             })
     
     def _handle_state_update(self, msg):
-        """处理状态更新"""
+        """处理状态更新（完整快照）"""
         board_data = msg.get('board', [])
         self.board_size = msg.get('board_size', self.board_size)
         self.current_player = msg.get('current_player', 'black')
@@ -226,10 +436,41 @@ class NetworkClient:
                 for j in range(len(board_data[i])):
                     self.board.grid[i][j] = board_data[i][j]
         
+        self.seq = msg.get('seq')
+        self._sync_pending = False
+        
         # 触发回调
         if self.on_state_update:
             self.on_state_update(self.get_game_state())
     
+    def _handle_state_delta(self, msg):
+        """处理增量状态更新：只改动变化的格子，序号不连续时请求快照
+        
+        观战合并的增量带 base_seq，本地序号在 [base_seq, seq) 内都可以应用。
+        """
+        seq = msg.get('seq')
+        base_seq = msg.get('base_seq', seq - 1 if seq is not None else None)
+        if self.board is None or self.seq is None or seq is None \
+                or not base_seq <= self.seq < seq:
+            if self.seq is not None and seq is not None and seq <= self.seq:
+                # 已经包含在快照里的旧增量
+                return
+            print(f"[Client] 状态序号不连续: 本地 {self.seq}, 收到 {seq}，请求同步")
+            self.request_sync()
+            return
+        
+        grid = self.board.grid
+        for row, col, color in msg.get('changes', ()):
+            grid[row][col] = color
+        
+        self.seq = seq
+        self.current_player = msg.get('current_player', self.current_player)
+        self.game_over = msg.get('game_over', False)
+        self.winner = msg.get('winner')
+        
+        if self.on_state_update:
+            self.on_state_update(self.get_game_state())
+    
     def _handle_game_over(self, msg):
         """处理游戏结束"""
         self.game_over = True
@@ -247,6 +488,28 @@ class NetworkClient:
         if self.on_undo_request:
             self.on_undo_request(msg)
     
+    def _handle_room_created(self, msg):
+        """处理房间创建"""
+        room = msg.get('room', {})
+        print(f"[Client] 房间已创建: {room.get('room_id')} {room.get('name')}")
+        if self.on_message:
+            self.on_message('info', f"房间已创建: {room.get('name')}")
+    
+    def _handle_room_list(self, msg):
+        """处理房间列表"""
+        self.rooms = msg.get('rooms', [])
+        if self.on_room_list:
+            self.on_room_list(self.rooms)
+    
+    def _handle_room_left(self, msg):
+        """处理离开房间"""
+        self.room_id = None
+        self.color = None
+        self.board = None
+        self.players = {}
+        self.game_over = False
+        self.winner = None
+    
     def _handle_message(self, msg):
         """处理普通消息"""
         message = msg.get('message', '')
@@ -267,14 +530,72 @@ class NetworkClient:
             return False
         
         try:
-            data = json.dumps(msg) + '\n'
-            self.socket.sendall(data.encode('utf-8'))  # 使用 sendall 确保全部发送
+            data = encode_frame(msg) if self.binary else encode_line(msg)
+            # 接收线程（心跳、同步请求）和界面线程都会发送，加锁避免两条消息交错
+            with self.lock:
+                self.socket.sendall(data)  # 使用 sendall 确保全部发送
             print(f"[Client] 已发送: {msg.get('type')}")
             return True
         except Exception as e:
             print(f"[Client] 发送失败: {e}")
             return False
     
+    def create_room(self, name=None, game_type='gomoku', board_size=15, preferred_color='black'):
+        """创建房间并加入"""
+        self._send({
+            'type': 'create_room',
+            'name': name,
+            'game_type': game_type,
+            'board_size': board_size,
+            'username': self.username,
+            'color': preferred_color
+        })
+    
+    def list_rooms(self):
+        """请求房间列表（结果通过 on_room_list 回调和 self.rooms 返回）"""
+        self._send({
+            'type': 'list_rooms'
+        })
+    
+    def join_room(self, room_id, preferred_color='black'):
+        """加入房间（会先离开当前房间）"""
+        self._send({
+            'type': 'join',
+            'username': self.username,
+            'color': preferred_color,
+            'room_id': room_id
+        })
+    
+    def spectate_room(self, room_id):
+        """以观战者身份进入房间（会先离开当前房间）"""
+        self._send({
+            'type': 'join',
+            'username': self.username,
+            'room_id': room_id,
+            'spectate': True
+        })
+    
+    def find_match(self, game_type='gomoku', board_size=15):
+        """加入匹配队列，配对成功后服务器自动建房间并开局"""
+        self._send({
+            'type': 'queue_join',
+            'username': self.username,
+            'game_type': game_type,
+            'board_size': board_size
+        })
+    
+    def cancel_match(self):
+        """退出匹配队列"""
+        self._send({
+            'type': 'queue_leave'
+        })
+    
+    def leave_room(self):
+        """离开当前房间"""
+        self._send({
+            'type': 'leave_room'
+        })
+    
     def create_game(self, game_type, board_size):
         """创建游戏"""
         self._send({
@@ -316,6 +637,23 @@ class NetworkClient:
             'accepted': accepted
         })
     
+    def ping(self):
+        """发送心跳（服务器回 pong 后更新 self.rtt）"""
+        self._last_ping = time.monotonic()
+        return self._send({
+            'type': 'ping',
+            'time': self._last_ping
+        })
+    
+    def request_sync(self):
+        """请求完整状态快照（已在等待快照时不重复请求）"""
+        if self._sync_pending:
+            return
+        self._sync_pending = True
+        self._send({
+            'type': 'sync_request'
+        })
+    
     def get_game_state(self):
         """获取游戏状态"""
         return {
@@ -326,6 +664,8 @@ class NetworkClient:
             'winner': self.winner,
             'my_color': self.color,
             'is_my_turn': self.current_player == self.color,
+            'spectator': self.spectator,
             'players': self.players,
-            'game_type': self.game_type
+            'game_type': self.game_type,
+            'room_id': self.room_id
         }
\ No newline at end of file
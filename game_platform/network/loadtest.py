@@ -0,0 +1,367 @@
+# game_platform/network/loadtest.py
+"""
+网络服务器压测：大量空闲连接 + 一批活跃连接，或一个房间 + 大量观战者
+
+服务器在子进程中运行（AsyncGameServer），客户端全部在本进程的一个事件循环里。
+空闲连接只建立连接并接收广播；活跃连接反复发送请求并等待回复，统计往返延迟。
+观战模式下两名玩家在一个房间里连续落子，统计每步棋到达观战者的延迟和服务器CPU。
+匹配模式不连接服务器，直接模拟大量玩家排队配对，统计等待时间、分差和配对耗时。
+
+用法:
+    python -m game_platform.network.loadtest --idle 3000 --active 200 --requests 20
+    python -m game_platform.network.loadtest --spectators 1000 --moves 300 --coalesce 0.05
+    python -m game_platform.network.loadtest --matchmaking 5000 --rate 50
+    python -m game_platform.network.loadtest --host 192.168.1.10 --port 9999   # 压测已有服务器
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import time
+
+from game_platform.network.matchmaking import simulate
+
+
+def _run_server(port, ready, spectator_interval=0.0):
+    """子进程：运行 AsyncGameServer"""
+    from game_platform.network.async_server import AsyncGameServer
+    server = AsyncGameServer('127.0.0.1', port, spectator_interval=spectator_interval)
+    server.verbose = False
+    asyncio.run(server.serve(ready.set))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _process_rss_kb(pid):
+    """进程常驻内存（KB），读取不到时返回 None（仅 Linux）"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _process_cpu_seconds(pid):
+    """进程累计CPU时间（秒），读取不到时返回 None（仅 Linux）"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def _drain(reader, writer):
+    """空闲连接：丢弃广播、回应心跳，直到连接关闭"""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if b'"ping"' in line:
+                msg = json.loads(line)
+                writer.write((json.dumps({'type': 'pong', 'time': msg.get('time')}) + '\n').encode('utf-8'))
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+
+
+async def _open(host, port, semaphore):
+    async with semaphore:
+        return await asyncio.open_connection(host, port)
+
+
+async def _active_client(host, port, index, requests, latencies, semaphore):
+    """活跃连接：加入请求 -> 等待回复（入座或房间已满），重复 requests 次"""
+    reader, writer = await _open(host, port, semaphore)
+    request = (json.dumps({'type': 'join', 'username': f'load{index}'}) + '\n').encode('utf-8')
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            # 跳过广播，等待发给自己的回复
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                msg_type = json.loads(line).get('type')
+                if msg_type in ('color_assigned', 'error'):
+                    break
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, idle, active, requests, concurrency=200):
+    """执行压测
+    
+    Returns:
+        dict: 连接耗时、请求数、往返延迟百分位等
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    start = time.perf_counter()
+    idle_connections = await asyncio.gather(*[_open(host, port, semaphore) for _ in range(idle)])
+    connect_seconds = time.perf_counter() - start
+    drainers = [asyncio.ensure_future(_drain(reader, writer)) for reader, writer in idle_connections]
+    
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_active_client(host, port, i, requests, latencies, semaphore)
+                           for i in range(active)])
+    active_seconds = time.perf_counter() - start
+    
+    for _, writer in idle_connections:
+        writer.close()
+    for task in drainers:
+        task.cancel()
+    await asyncio.gather(*drainers, return_exceptions=True)
+    
+    return {
+        'idle': idle,
+        'active': active,
+        'connect_seconds': connect_seconds,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / active_seconds if active_seconds else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+    }
+
+
+async def _send(writer, msg):
+    writer.write((json.dumps(msg) + '\n').encode('utf-8'))
+    await writer.drain()
+
+
+async def _read_until(reader, predicate):
+    """读取消息直到满足 predicate，返回该消息"""
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("连接已关闭")
+        msg = json.loads(line)
+        if predicate(msg):
+            return msg
+
+
+async def _spectator(host, port, room_id, index, sent_at, latencies, counters, semaphore):
+    """观战连接：加入房间后接收增量，记录每个序号到达的延迟"""
+    reader, writer = await _open(host, port, semaphore)
+    await _send(writer, {'type': 'join', 'username': f'watch{index}', 'room_id': room_id,
+                         'spectate': True})
+    await _read_until(reader, lambda m: m.get('type') in ('color_assigned', 'error'))
+    counters['joined'] += 1
+    
+    async def receive():
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                now = time.perf_counter()
+                counters['messages'] += 1
+                counters['bytes'] += len(line)
+                msg = json.loads(line)
+                if msg.get('type') == 'state_delta':
+                    seq = msg['seq']
+                    counters['last_seq'][index] = seq
+                    # 合并增量覆盖 (base_seq, seq] 内的每一步
+                    for covered in range(msg.get('base_seq', seq - 1) + 1, seq + 1):
+                        if covered in sent_at:
+                            latencies.append(now - sent_at[covered])
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+    
+    return writer, asyncio.ensure_future(receive())
+
+
+async def run_spectators(host, port, spectators, moves, concurrency=200, seed=0):
+    """观战压测：两名玩家在一个房间里连续落子，spectators 个观战者接收
+    
+    Returns:
+        dict: 落子数、每秒步数、观战者收到的消息数/字节数、到达延迟百分位等
+    """
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    size = 15
+    
+    black_reader, black_writer = await asyncio.open_connection(host, port)
+    await _send(black_writer, {'type': 'create_room', 'name': 'loadtest', 'game_type': 'gomoku',
+                               'board_size': size, 'username': 'black', 'color': 'black'})
+    room_id = (await _read_until(black_reader, lambda m: m.get('type') == 'color_assigned'))['room_id']
+    white_reader, white_writer = await asyncio.open_connection(host, port)
+    await _send(white_writer, {'type': 'join', 'username': 'white', 'color': 'white',
+                               'room_id': room_id})
+    await _read_until(white_reader, lambda m: m.get('type') == 'color_assigned')
+    
+    sent_at = {}
+    latencies = []
+    counters = {'joined': 0, 'messages': 0, 'bytes': 0, 'last_seq': [0] * spectators}
+    start = time.perf_counter()
+    watchers = await asyncio.gather(*[
+        _spectator(host, port, room_id, i, sent_at, latencies, counters, semaphore)
+        for i in range(spectators)])
+    join_seconds = time.perf_counter() - start
+    
+    players = {'black': (black_reader, black_writer), 'white': (white_reader, white_writer)}
+    
+    async def wait_delta(seq):
+        """两名玩家都收到序号 seq 的增量，返回该增量"""
+        delta = None
+        for reader, _ in players.values():
+            delta = await _read_until(reader, lambda m: m.get('type') == 'state_delta'
+                                      and m['seq'] >= seq)
+        return delta
+    
+    async def new_game():
+        await _send(black_writer, {'type': 'create_game', 'game_type': 'gomoku',
+                                   'board_size': size})
+        start_msg = await _read_until(black_reader, lambda m: m.get('type') == 'game_start')
+        await _read_until(white_reader, lambda m: m.get('type') == 'game_start')
+        delta = await wait_delta(start_msg['seq'] + 1)
+        return delta['seq'], set((r, c) for r in range(size) for c in range(size))
+    
+    seq, empty = await new_game()
+    current = 'black'
+    start = time.perf_counter()
+    for _ in range(moves):
+        row, col = rng.choice(sorted(empty))
+        sent_at[seq + 1] = time.perf_counter()
+        await _send(players[current][1], {'type': 'move', 'row': row, 'col': col})
+        delta = await wait_delta(seq + 1)
+        seq = delta['seq']
+        for r, c, _ in delta['changes']:
+            empty.discard((r, c))
+        current = delta['current_player']
+        if delta['game_over']:
+            seq, empty = await new_game()
+            current = 'black'
+    move_seconds = time.perf_counter() - start
+    
+    # 等观战者收完最后一步
+    deadline = time.perf_counter() + 10
+    while min(counters['last_seq'], default=seq) < seq and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    
+    for writer, task in watchers:
+        writer.close()
+        task.cancel()
+    await asyncio.gather(*[task for _, task in watchers], return_exceptions=True)
+    black_writer.close()
+    white_writer.close()
+    
+    return {
+        'spectators': counters['joined'],
+        'join_seconds': join_seconds,
+        'moves': moves,
+        'moves_per_second': moves / move_seconds if move_seconds else 0.0,
+        'messages': counters['messages'],
+        'bytes_per_spectator': counters['bytes'] / spectators if spectators else 0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+    }
+
+
+def _print_matchmaking(result):
+    print(f"{result['players']} 名玩家: 配对 {result['pairs']} 局, 未配上 {result['unmatched']} 人, "
+          f"队列峰值 {result['peak_queue']} 人")
+    print(f"  等待时间: 平均 {result['wait_avg']:.1f}s, p50 {result['wait_p50']:.1f}s, "
+          f"p95 {result['wait_p95']:.1f}s, 最长 {result['wait_max']:.1f}s")
+    print(f"  分差: 平均 {result['gap_avg']:.0f}, p95 {result['gap_p95']:.0f}, 最大 {result['gap_max']:.0f}")
+    print(f"  配对耗时: 合计 {result['match_ms']:.1f}ms, 单轮最长 {result['max_match_ms']:.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="网络服务器压测")
+    parser.add_argument('--host', default=None, help="已有服务器地址（默认在子进程中启动）")
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--idle', type=int, default=2000, help="空闲连接数")
+    parser.add_argument('--active', type=int, default=100, help="活跃连接数")
+    parser.add_argument('--requests', type=int, default=20, help="每个活跃连接的请求数")
+    parser.add_argument('--concurrency', type=int, default=200, help="同时进行的建连数")
+    parser.add_argument('--spectators', type=int, default=0,
+                        help="观战模式：一个房间的观战者数（大于0时不做空闲/活跃压测）")
+    parser.add_argument('--moves', type=int, default=200, help="观战模式的落子数")
+    parser.add_argument('--coalesce', type=float, default=0.0,
+                        help="观战者增量合并间隔（秒），仅对子进程服务器有效")
+    parser.add_argument('--matchmaking', type=int, default=0,
+                        help="匹配模式：模拟排队的玩家数（大于0时只模拟匹配队列）")
+    parser.add_argument('--rate', type=float, default=50.0,
+                        help="匹配模式每秒入队的玩家数（0 表示全部同时入队）")
+    args = parser.parse_args(argv)
+    
+    if args.matchmaking:
+        _print_matchmaking(simulate(args.matchmaking, args.rate))
+        return
+    
+    process = None
+    host, port = args.host, args.port
+    if host is None:
+        host, port = '127.0.0.1', args.port or _free_port()
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_run_server, args=(port, ready, args.coalesce),
+                                          daemon=True)
+        process.start()
+        if not ready.wait(10):
+            raise RuntimeError("服务器启动超时")
+    
+    try:
+        cpu_before = _process_cpu_seconds(process.pid) if process else None
+        if args.spectators:
+            result = asyncio.run(run_spectators(host, port, args.spectators, args.moves,
+                                                args.concurrency))
+        else:
+            result = asyncio.run(run_load(host, port, args.idle, args.active, args.requests,
+                                          args.concurrency))
+        rss = _process_rss_kb(process.pid) if process else None
+        cpu_after = _process_cpu_seconds(process.pid) if process else None
+    finally:
+        if process:
+            process.terminate()
+            process.join()
+    
+    if args.spectators:
+        print(f"1 个房间, {result['spectators']} 个观战者 (加入用时 {result['join_seconds']:.2f}s)")
+        print(f"  落子: {result['moves']} 步, {result['moves_per_second']:.1f} 步/秒")
+        print(f"  观战者收到: {result['messages']} 条消息, "
+              f"平均每人 {result['bytes_per_spectator'] / 1024:.1f} KB")
+        print(f"  到达延迟: p50 {result['p50_ms']:.2f}ms, p95 {result['p95_ms']:.2f}ms, "
+              f"p99 {result['p99_ms']:.2f}ms")
+        if cpu_before is not None and cpu_after is not None:
+            print(f"  服务器CPU: {cpu_after - cpu_before:.2f}s, "
+                  f"每步 {(cpu_after - cpu_before) / result['moves'] * 1000:.2f}ms")
+        if rss:
+            print(f"  服务器内存: {rss / 1024:.1f} MB")
+        return
+    
+    print(f"{result['idle']} 个空闲连接 + {result['active']} 个活跃连接 (客户端进程 {os.getpid()})")
+    print(f"  建立空闲连接: {result['connect_seconds']:.2f}s")
+    print(f"  请求: {result['requests']} 次, {result['requests_per_second']:.0f} 次/秒")
+    print(f"  往返延迟: p50 {result['p50_ms']:.2f}ms, p95 {result['p95_ms']:.2f}ms, "
+          f"p99 {result['p99_ms']:.2f}ms")
+    if rss:
+        print(f"  服务器内存: {rss / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,295 @@
+# game_platform/network/matchmaking.py
+"""
+匹配队列：按游戏类型、棋盘大小和等级分自动配对
+
+等级分由 UserManager 中的战绩估算。每种（游戏类型, 棋盘大小）一个队列，
+队列内按等级分分桶；配对时从自己的桶向两侧查找分差最小的对手，
+可接受的分差随等待时间放宽，等得越久越容易匹配。
+
+simulate() 模拟大量玩家排队（python -m game_platform.network.loadtest --matchmaking 5000）。
+"""
+
+import math
+import random
+import threading
+import time
+
+from game_platform.user.account import User
+from game_platform.user.manager import UserManager
+
+
+DEFAULT_RATING = 1500
+
+# 模拟时各游戏的排队比例
+_SIM_GAMES = [(('gomoku', 15), 0.6), (('go', 19), 0.1), (('go', 9), 0.15), (('othello', 8), 0.15)]
+
+
+def rating_from_stats(wins, games):
+    """由战绩估算等级分：胜率按 (胜+1)/(场+2) 平滑后换算为相对 1500 的 Elo 分"""
+    score = (wins + 1) / (games + 2)
+    return DEFAULT_RATING + 400 * math.log10(score / (1 - score))
+
+
+def user_rating(username, user_manager=None):
+    """用户的等级分，未注册的用户按初始分"""
+    user = (user_manager or UserManager()).get_user(username)
+    if user is None:
+        return DEFAULT_RATING
+    return rating_from_stats(user.wins, user.games)
+
+
+class _Pool:
+    """一种（游戏类型, 棋盘大小）的队列"""
+    
+    def __init__(self, bucket_width):
+        self.bucket_width = bucket_width
+        self.order = {}    # {玩家: 票}，按入队先后
+        self.buckets = {}  # {桶号: {玩家: 票}}
+    
+    def add(self, ticket):
+        self.order[ticket['player']] = ticket
+        index = int(ticket['rating'] // self.bucket_width)
+        self.buckets.setdefault(index, {})[ticket['player']] = ticket
+    
+    def remove(self, ticket):
+        del self.order[ticket['player']]
+        index = int(ticket['rating'] // self.bucket_width)
+        bucket = self.buckets[index]
+        del bucket[ticket['player']]
+        if not bucket:
+            del self.buckets[index]
+    
+    def closest(self, ticket, window):
+        """分差不超过 window 的对手中分差最小的一个（同分差取先入队的），没有返回 None"""
+        rating = ticket['rating']
+        center = int(rating // self.bucket_width)
+        best = None
+        best_gap = window
+        reach = int(window // self.bucket_width) + 1
+        for offset in range(reach + 1):
+            for index in ((center,) if offset == 0 else (center - offset, center + offset)):
+                bucket = self.buckets.get(index)
+                if not bucket:
+                    continue
+                for other in bucket.values():
+                    if other is ticket:
+                        continue
+                    gap = abs(other['rating'] - rating)
+                    if gap < best_gap or (best is None and gap <= best_gap):
+                        if not gap:
+                            # 同分（新玩家多为初始分）不会有更近的
+                            return other
+                        best = other
+                        best_gap = gap
+            # 更远的桶分差至少 offset * 桶宽，不可能更近
+            if best is not None and best_gap <= offset * self.bucket_width:
+                break
+        return best
+
+
+class Matchmaker:
+    """匹配队列（线程安全）
+    
+    入队得到一张票（dict）：player（调用方的玩家标识，如连接）、username、game_type、
+    board_size、rating、queued_at。match() 每次把能配对的玩家两两取出，
+    先入队的一方执黑。
+    """
+    
+    def __init__(self, bucket_width=10, base_window=50, widen_rate=10.0, max_window=400):
+        """
+        Args:
+            bucket_width: 等级分分桶的宽度
+            base_window: 刚入队时可接受的最大分差
+            widen_rate: 每等待一秒可接受的分差增加多少
+            max_window: 可接受分差的上限
+        """
+        self.bucket_width = bucket_width
+        self.base_window = base_window
+        self.widen_rate = widen_rate
+        self.max_window = max_window
+        self.lock = threading.Lock()
+        self._tickets = {}  # {玩家: 票}
+        self._pools = {}    # {(game_type, board_size): _Pool}
+        
+        # 统计
+        self.matches = 0
+        self.total_wait = 0.0
+        self.total_gap = 0.0
+    
+    def __len__(self):
+        return len(self._tickets)
+    
+    def window(self, waited):
+        """等待 waited 秒后可接受的最大分差"""
+        return min(self.max_window, self.base_window + self.widen_rate * waited)
+    
+    def enqueue(self, player, username, game_type, board_size, rating, now=None):
+        """入队（已在队列中时按新条件重新排队），返回票"""
+        ticket = {
+            'player': player,
+            'username': username,
+            'game_type': game_type,
+            'board_size': board_size,
+            'rating': rating,
+            'queued_at': time.monotonic() if now is None else now,
+        }
+        with self.lock:
+            self._remove(player)
+            key = (game_type, board_size)
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _Pool(self.bucket_width)
+            pool.add(ticket)
+            self._tickets[player] = ticket
+        return ticket
+    
+    def cancel(self, player):
+        """退出队列，返回是否在队列中"""
+        with self.lock:
+            return self._remove(player)
+    
+    def _remove(self, player):
+        ticket = self._tickets.pop(player, None)
+        if ticket is None:
+            return False
+        key = (ticket['game_type'], ticket['board_size'])
+        pool = self._pools[key]
+        pool.remove(ticket)
+        if not pool.order:
+            del self._pools[key]
+        return True
+    
+    def waiting(self, game_type, board_size):
+        """某个队列中等待的人数"""
+        pool = self._pools.get((game_type, board_size))
+        return len(pool.order) if pool else 0
+    
+    def match(self, now=None):
+        """配对一轮：按入队先后为每个玩家找分差最小的对手
+        
+        Returns:
+            list: [(先入队的票, 对手的票), ...]，配上的玩家已移出队列
+        """
+        now = time.monotonic() if now is None else now
+        pairs = []
+        with self.lock:
+            for key, pool in list(self._pools.items()):
+                for ticket in list(pool.order.values()):
+                    if ticket['player'] not in pool.order:
+                        # 本轮已被别人配走
+                        continue
+                    opponent = pool.closest(ticket, self.window(now - ticket['queued_at']))
+                    if opponent is None:
+                        continue
+                    pool.remove(ticket)
+                    pool.remove(opponent)
+                    del self._tickets[ticket['player']]
+                    del self._tickets[opponent['player']]
+                    pairs.append((ticket, opponent))
+                    self.matches += 1
+                    self.total_wait += 2 * now - ticket['queued_at'] - opponent['queued_at']
+                    self.total_gap += abs(ticket['rating'] - opponent['rating'])
+                if not pool.order:
+                    del self._pools[key]
+        return pairs
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'waiting': len(self._tickets),
+                'queues': {f'{game_type} {board_size}': len(pool.order)
+                           for (game_type, board_size), pool in self._pools.items()},
+                'matches': self.matches,
+                'avg_wait': self.total_wait / (2 * self.matches) if self.matches else 0.0,
+                'avg_gap': self.total_gap / self.matches if self.matches else 0.0,
+            }
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _simulated_user(index, rng):
+    """模拟用户：按隐藏实力随机生成战绩"""
+    skill = rng.gauss(DEFAULT_RATING, 250)
+    user = User(f'sim{index}')
+    user.games = rng.randint(0, 200)
+    win_prob = 1 / (1 + 10 ** ((DEFAULT_RATING - skill) / 400))
+    user.wins = sum(1 for _ in range(user.games) if rng.random() < win_prob)
+    return user
+
+
+def simulate(players=5000, rate=50.0, tick=1.0, seed=0, matchmaker=None):
+    """模拟玩家排队
+    
+    Args:
+        players: 模拟的玩家数
+        rate: 每秒入队的玩家数（泊松到达），0 表示全部同时入队
+        tick: 配对间隔（模拟时间，秒）
+        seed: 随机种子
+        matchmaker: 使用的 Matchmaker（默认参数新建）
+    
+    Returns:
+        dict: 配对数、未配上的人数、等待时间和分差的分布、配对耗时
+    """
+    rng = random.Random(seed)
+    if matchmaker is None:
+        matchmaker = Matchmaker()
+    games, weights = zip(*_SIM_GAMES)
+    
+    arrivals = []
+    clock = 0.0
+    for index in range(players):
+        if rate > 0:
+            clock += rng.expovariate(rate)
+        user = _simulated_user(index, rng)
+        game_type, board_size = rng.choices(games, weights)[0]
+        arrivals.append((clock, user, game_type, board_size))
+    
+    # 最后一人入队后，等到可接受分差达到上限再多一轮
+    give_up = clock + (matchmaker.max_window - matchmaker.base_window) / matchmaker.widen_rate + 2 * tick
+    waits = []
+    gaps = []
+    match_seconds = 0.0
+    max_match_seconds = 0.0
+    peak_queue = 0
+    arrived = 0
+    now = 0.0
+    while now <= give_up and (arrived < players or len(matchmaker)):
+        while arrived < players and arrivals[arrived][0] <= now:
+            queued_at, user, game_type, board_size = arrivals[arrived]
+            matchmaker.enqueue(user.username, user.username, game_type, board_size,
+                               rating_from_stats(user.wins, user.games), now=queued_at)
+            arrived += 1
+        peak_queue = max(peak_queue, len(matchmaker))
+        
+        start = time.perf_counter()
+        pairs = matchmaker.match(now)
+        seconds = time.perf_counter() - start
+        match_seconds += seconds
+        max_match_seconds = max(max_match_seconds, seconds)
+        
+        for first, second in pairs:
+            waits.append(now - first['queued_at'])
+            waits.append(now - second['queued_at'])
+            gaps.append(abs(first['rating'] - second['rating']))
+        now += tick
+    
+    return {
+        'players': players,
+        'pairs': len(gaps),
+        'unmatched': len(matchmaker),
+        'peak_queue': peak_queue,
+        'wait_avg': sum(waits) / len(waits) if waits else 0.0,
+        'wait_p50': _percentile(waits, 50),
+        'wait_p95': _percentile(waits, 95),
+        'wait_max': max(waits, default=0.0),
+        'gap_avg': sum(gaps) / len(gaps) if gaps else 0.0,
+        'gap_p95': _percentile(gaps, 95),
+        'gap_max': max(gaps, default=0.0),
+        'match_ms': match_seconds * 1000,
+        'max_match_ms': max_match_seconds * 1000,
+    }
\ No newline at end of file
@@ -0,0 +1,115 @@
+# game_platform/network/outbox.py
+"""
+每个连接的有界发送队列
+
+广播只把编码好的消息放进各连接的队列（不阻塞），由连接自己的写线程/写协程
+取出并写入 socket。慢客户端只会让自己的队列变长，队列满时按服务器配置的策略处理。
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class Outbox:
+    """有界发送队列（线程安全），附带队列深度和排队延迟统计"""
+    
+    def __init__(self, maxsize=256):
+        """
+        Args:
+            maxsize: 最多排队的消息数
+        """
+        self.maxsize = maxsize
+        self.closed = False
+        self._queue = deque()  # [(数据, 入队时间)]
+        self._ready = threading.Condition(threading.Lock())
+        
+        # 统计
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0      # 因快照策略被清掉的消息
+        self.overflows = 0    # 队列满的次数
+        self.max_depth = 0
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+    
+    def __len__(self):
+        return len(self._queue)
+    
+    def put(self, data):
+        """入队，不阻塞；队列已满或已关闭返回 False"""
+        with self._ready:
+            if self.closed:
+                return False
+            if len(self._queue) >= self.maxsize:
+                self.overflows += 1
+                return False
+            self._queue.append((data, time.perf_counter()))
+            self.enqueued += 1
+            if len(self._queue) > self.max_depth:
+                self.max_depth = len(self._queue)
+            self._ready.notify()
+            return True
+    
+    def take(self, timeout=None):
+        """取出当前排队的全部消息（阻塞直到有消息或关闭）
+        
+        Returns:
+            list: [(数据, 入队时间), ...]，已关闭时返回空列表
+        """
+        with self._ready:
+            while not self._queue and not self.closed:
+                if not self._ready.wait(timeout):
+                    return []
+            return self._take_all()
+    
+    def take_nowait(self):
+        """取出当前排队的全部消息（不阻塞）"""
+        with self._ready:
+            return self._take_all()
+    
+    def _take_all(self):
+        if self.closed:
+            return []
+        items = list(self._queue)
+        self._queue.clear()
+        return items
+    
+    def mark_sent(self, items):
+        """记录一批消息已写出（更新排队延迟）"""
+        now = time.perf_counter()
+        with self._ready:
+            for _, queued_at in items:
+                latency = now - queued_at
+                self._latency_total += latency
+                if latency > self.max_latency:
+                    self.max_latency = latency
+            self.sent += len(items)
+    
+    def clear(self):
+        """丢弃所有排队的消息，返回丢弃的条数"""
+        with self._ready:
+            count = len(self._queue)
+            self._queue.clear()
+            self.dropped += count
+            return count
+    
+    def close(self):
+        """关闭队列，唤醒等待中的写线程"""
+        with self._ready:
+            self.closed = True
+            self._queue.clear()
+            self._ready.notify_all()
+    
+    def stats(self):
+        with self._ready:
+            return {
+                'depth': len(self._queue),
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'sent': self.sent,
+                'dropped': self.dropped,
+                'overflows': self.overflows,
+                'avg_latency_ms': self._latency_total / self.sent * 1000 if self.sent else 0.0,
+                'max_latency_ms': self.max_latency * 1000,
+            }
\ No newline at end of file
@@ -4,6 +4,7 @@
 """
 
 import json
+import struct
 from enum import Enum
 
 
@@ -59,4 +60,207 @@ class Protocol:
             
             return messages
         except Exception as e:
-            return [(MessageType.ERROR, {'error': str(e)})]
\ No newline at end of file
+            return [(MessageType.ERROR, {'error': str(e)})]
+
+# ---------------------------------------------------------------------------
+# 二进制帧
+#
+# 连接建立时双方都发送换行分隔的 JSON；客户端在 join 中带 'binary': True 提出升级，
+# 服务器在 color_assigned 中回 'binary': True 表示接受，此后双方改发二进制帧。
+# 每条消息的第一个字节区分两种格式：'{' 开头的是一行 JSON，其余是二进制帧，
+# 所以解码器不需要知道升级发生在哪一条消息上。
+#
+# 二进制帧 = 帧头 <BI（类型, 负载长度）+ 负载：
+#   FRAME_JSON   负载为 UTF-8 JSON（没有专用格式的消息，以及带 base_seq 的合并增量）
+#   FRAME_MOVE   <BB 行, 列
+#   FRAME_DELTA  <IBBBH 序号, 执子方, 是否结束, 胜者, 变化数 + 变化数 × <BBB 行, 列, 颜色
+#   FRAME_PING / FRAME_PONG  <d 发送时间
+# 颜色编码: 0 空, 1 黑, 2 白, 3 和棋（仅胜者）
+# ---------------------------------------------------------------------------
+
+FRAME_JSON = 1
+FRAME_MOVE = 2
+FRAME_DELTA = 3
+FRAME_PING = 4
+FRAME_PONG = 5
+
+_HEADER = struct.Struct('<BI')
+_MOVE = struct.Struct('<BB')
+_DELTA = struct.Struct('<IBBBH')
+_CHANGE = struct.Struct('<BBB')
+_HEARTBEAT = struct.Struct('<d')
+
+_FIXED_SIZES = {FRAME_MOVE: _MOVE.size, FRAME_PING: _HEARTBEAT.size, FRAME_PONG: _HEARTBEAT.size}
+
+_COLOR_CODES = {None: 0, 'black': 1, 'white': 2, 'draw': 3}
+_CODE_COLORS = {code: color for color, code in _COLOR_CODES.items()}
+
+_JSON_START = ord('{')
+_WHITESPACE = b' \t\r\n'
+
+
+class ProtocolError(Exception):
+    """无法恢复的流错误（帧过大等），应断开连接"""
+    pass
+
+
+def encode_line(msg):
+    """编码为一行 JSON"""
+    return (json.dumps(msg) + '\n').encode('utf-8')
+
+
+def encode_frame(msg):
+    """编码为二进制帧（move/state_delta/ping/pong 用专用格式，其余消息用 JSON 负载）"""
+    msg_type = msg.get('type')
+    if msg_type == 'move' and len(msg) == 3:
+        return _HEADER.pack(FRAME_MOVE, _MOVE.size) + _MOVE.pack(msg['row'], msg['col'])
+    if msg_type == 'state_delta' and 'base_seq' not in msg:
+        changes = msg['changes']
+        payload = bytearray(_DELTA.size + _CHANGE.size * len(changes))
+        _DELTA.pack_into(payload, 0, msg['seq'], _COLOR_CODES[msg['current_player']],
+                         1 if msg['game_over'] else 0, _COLOR_CODES[msg['winner']], len(changes))
+        offset = _DELTA.size
+        for row, col, color in changes:
+            _CHANGE.pack_into(payload, offset, row, col, _COLOR_CODES[color])
+            offset += _CHANGE.size
+        return _HEADER.pack(FRAME_DELTA, len(payload)) + payload
+    if msg_type in ('ping', 'pong'):
+        kind = FRAME_PING if msg_type == 'ping' else FRAME_PONG
+        return _HEADER.pack(kind, _HEARTBEAT.size) + _HEARTBEAT.pack(msg['time'])
+    
+    payload = json.dumps(msg).encode('utf-8')
+    return _HEADER.pack(FRAME_JSON, len(payload)) + payload
+
+
+def decode_frame(kind, view, offset, length):
+    """解码二进制帧负载（直接从缓冲区 view 的 offset 处读取）"""
+    fixed = _FIXED_SIZES.get(kind)
+    if fixed is not None and fixed != length:
+        raise ValueError(f"帧长度不符: 类型 {kind}, 长度 {length}")
+    if kind == FRAME_MOVE:
+        row, col = _MOVE.unpack_from(view, offset)
+        return {'type': 'move', 'row': row, 'col': col}
+    if kind == FRAME_DELTA:
+        if length < _DELTA.size:
+            raise ValueError("增量帧长度不符")
+        seq, player, game_over, winner, count = _DELTA.unpack_from(view, offset)
+        if _DELTA.size + _CHANGE.size * count != length:
+            raise ValueError("增量帧长度不符")
+        offset += _DELTA.size
+        changes = []
+        for row, col, color in _CHANGE.iter_unpack(view[offset:offset + _CHANGE.size * count]):
+            changes.append([row, col, _CODE_COLORS[color]])
+        return {
+            'type': 'state_delta',
+            'seq': seq,
+            'changes': changes,
+            'current_player': _CODE_COLORS[player],
+            'game_over': bool(game_over),
+            'winner': _CODE_COLORS[winner]
+        }
+    if kind in (FRAME_PING, FRAME_PONG):
+        return {'type': 'ping' if kind == FRAME_PING else 'pong',
+                'time': _HEARTBEAT.unpack_from(view, offset)[0]}
+    if kind == FRAME_JSON:
+        return json.loads(bytes(view[offset:offset + length]))
+    raise ValueError(f"未知帧类型: {kind}")
+
+
+class FrameDecoder:
+    """从字节流中切分消息（JSON 行与二进制帧可以混在同一个流里）
+    
+    数据直接收进一块复用的 bytearray，按偏移量解析，不再对整个缓冲区做字符串
+    拼接和 split：每个字节只被扫描一次，缓冲区只在尾部空间不足时整体前移一次，
+    多条消息一起到达时也是线性时间。
+    """
+    
+    def __init__(self, capacity=16 * 1024, max_frame=1024 * 1024):
+        """
+        Args:
+            capacity: 缓冲区初始大小（第一次收到数据时才分配，空闲连接不占内存）
+            max_frame: 单条消息的最大长度（字节），超过抛出 ProtocolError
+        """
+        self.capacity = capacity
+        self.max_frame = max_frame
+        self._buffer = bytearray()
+        self._view = memoryview(self._buffer)
+        self._start = 0  # 未解析数据的起点
+        self._end = 0    # 已收数据的终点
+        self._scanned = 0  # JSON 行已扫描过（不含换行）的位置，避免重复查找
+    
+    def _reserve(self, size):
+        """保证尾部至少有 size 字节空闲"""
+        pending = self._end - self._start
+        if len(self._buffer) - self._end >= size:
+            return
+        if pending + size <= len(self._buffer):
+            # 前移未解析数据（memoryview 赋值按重叠区域处理）
+            self._view[:pending] = self._view[self._start:self._end]
+        else:
+            capacity = max(len(self._buffer), self.capacity)
+            while capacity < pending + size:
+                capacity *= 2
+            buffer = bytearray(capacity)
+            buffer[:pending] = self._view[self._start:self._end]
+            self._view.release()
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        self._scanned -= self._start
+        self._start, self._end = 0, pending
+    
+    def recv_into(self, sock, size=16384):
+        """从 socket 直接读入缓冲区，返回读到的字节数（0 表示连接关闭）"""
+        self._reserve(size)
+        received = sock.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+    
+    def feed(self, data):
+        """追加收到的数据"""
+        self._reserve(len(data))
+        self._view[self._end:self._end + len(data)] = data
+        self._end += len(data)
+    
+    def next_message(self):
+        """取出下一条完整消息
+        
+        Returns:
+            dict: 消息；数据不足一条时返回 None
+        
+        Raises:
+            ValueError: 这条消息无法解析（已跳过，可以继续调用）
+            ProtocolError: 流已损坏，应断开连接
+        """
+        buffer = self._buffer
+        start, end = self._start, self._end
+        while start < end and buffer[start] in _WHITESPACE:
+            start += 1
+        self._start = start
+        if start == end:
+            self._start = self._end = self._scanned = 0
+            return None
+        
+        if buffer[start] == _JSON_START:
+            newline = buffer.find(b'\n', max(start, self._scanned), end)
+            if newline < 0:
+                if end - start > self.max_frame:
+                    raise ProtocolError("消息过长")
+                self._scanned = end
+                return None
+            self._start = self._scanned = newline + 1
+            return json.loads(bytes(self._view[start:newline]))
+        
+        if end - start < _HEADER.size:
+            return None
+        kind, length = _HEADER.unpack_from(buffer, start)
+        if length > self.max_frame:
+            raise ProtocolError("帧过长")
+        offset = start + _HEADER.size
+        if end - offset < length:
+            self._reserve(length - (end - offset))
+            return None
+        self._start = offset + length
+        try:
+            return decode_frame(kind, self._view, offset, length)
+        except (KeyError, struct.error) as e:
+            raise ValueError(f"帧内容无效: {e}")
\ No newline at end of file
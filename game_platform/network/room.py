@@ -0,0 +1,339 @@
+# game_platform/network/room.py
+"""
+网络对战房间：每个房间有独立的棋局状态、成员和锁
+"""
+
+import itertools
+import threading
+from collections import deque
+from game_platform.game import GomokuGame, GoGame, OthelloGame
+
+
+class Room:
+    """一个房间
+    
+    成员表 members 与服务器的 clients 共用同一份客户端信息字典（玩家和观战者都在其中，
+    观战者没有颜色），房间内的状态读写都在 room.lock 下进行，不同房间之间互不竞争。
+    
+    棋局由房间内的 Game 实例（GomokuGame/GoGame/OthelloGame）负责，落子、弃权、
+    悔棋都经过它的规则校验，服务器是棋局状态的唯一来源。
+    
+    每次状态变化生成一条增量消息（state_delta），带递增的序号 seq；
+    客户端按序号应用增量，缺号时再请求完整快照（state_update）。
+    最近的增量保存在事件日志 events 中，断线重连的客户端只需补发错过的部分。
+    
+    玩家断线后座位保留在 reserved 中（等待重连），期间不会分配给别人。
+    """
+    
+    EVENT_LOG_SIZE = 256  # 事件日志保留的增量条数
+    
+    def __init__(self, room_id, name=None, game_type='gomoku', board_size=15, persistent=False):
+        self.room_id = room_id
+        self.name = name or f"房间{room_id}"
+        self.persistent = persistent  # 常驻房间（成员清空后不删除）
+        self.lock = threading.Lock()
+        self.members = {}  # {连接: 客户端信息}
+        
+        # 游戏状态
+        self.game_type = game_type
+        self.board_size = board_size
+        self.game = None
+        self.game_started = False
+        self.undo_requester = None  # 等待对方答复的悔棋请求方颜色
+        self.seq = 0  # 状态序号，每条增量消息加一
+        self.spectator_delta = None  # 尚未推给观战者的合并增量
+        self.events = deque(maxlen=self.EVENT_LOG_SIZE)  # 最近的增量消息
+        self.game_seq = 0  # 本局开局时的序号
+        self.reserved = {}  # 断线玩家保留的座位 {颜色: {'session': 会话令牌, 'username': 用户名}}
+    
+    @property
+    def board(self):
+        return self.game.board if self.game else None
+    
+    @property
+    def current_player(self):
+        return self.game.current_player if self.game else 'black'
+    
+    @property
+    def game_over(self):
+        return self.game.game_over if self.game else False
+    
+    @property
+    def winner(self):
+        return self.game.winner if self.game else None
+    
+    def assign_color(self, preferred_color):
+        """为新玩家分配颜色，房间已满返回 None（调用方持有 lock）"""
+        taken_colors = {info['color'] for info in self.members.values() if info.get('color')}
+        taken_colors.update(self.reserved)
+        for color in (preferred_color, 'black', 'white'):
+            if color in ('black', 'white') and color not in taken_colors:
+                return color
+        return None
+    
+    def players(self):
+        """{颜色: 用户名}，包括断线保留座位的玩家（调用方持有 lock）"""
+        players = {color: seat['username'] for color, seat in self.reserved.items()}
+        for info in self.members.values():
+            color = info.get('color')
+            username = info.get('username')
+            if color and username:
+                players[color] = username
+        return players
+    
+    def summary(self):
+        """房间列表中的一项（调用方持有 lock）"""
+        return {
+            'room_id': self.room_id,
+            'name': self.name,
+            'game_type': self.game_type,
+            'board_size': self.board_size,
+            'players': self.players(),
+            'members': len(self.members),
+            'spectators': sum(1 for info in self.members.values() if info.get('spectator')),
+            'offline': sorted(self.reserved),
+            'game_started': self.game_started,
+            'game_over': self.game_over,
+        }
+    
+    def new_game(self, game_type, board_size):
+        """开始新的一局，返回开局棋子 [[行, 列, 颜色], ...]（调用方持有 lock）"""
+        if game_type == 'go':
+            self.game = GoGame(board_size)
+        elif game_type == 'othello':
+            self.game = OthelloGame(board_size)
+        else:
+            game_type = 'gomoku'
+            self.game = GomokuGame(board_size)
+        
+        self.game_type = game_type
+        self.board_size = board_size
+        self.game_started = True
+        self.undo_requester = None
+        self.game_seq = self.seq
+        self.events.clear()
+        
+        grid = self.game.board.grid
+        return [[i, j, grid[i][j]]
+                for i in range(board_size) for j in range(board_size)
+                if grid[i][j] is not None]
+    
+    def apply_move(self, row, col):
+        """当前执子方落子，由 Game.make_move 校验规则（调用方持有 lock）
+        
+        Returns:
+            tuple: (错误信息, 变化的格子 [[行, 列, 颜色], ...])，合法时错误信息为 None
+        """
+        if not isinstance(row, int) or not isinstance(col, int):
+            return '无效的落子', []
+        if not (0 <= row < self.board_size and 0 <= col < self.board_size):
+            return '无效的落子', []
+        
+        try:
+            self.game.make_move(row, col)
+        except ValueError as e:
+            return str(e), []
+        
+        self.undo_requester = None
+        return None, self._move_changes(self.game.move_history[-1])
+    
+    def apply_pass(self):
+        """当前执子方弃权（调用方持有 lock），返回错误信息（合法时为 None）"""
+        if not hasattr(self.game, 'pass_move'):
+            return '该游戏不能弃权'
+        try:
+            self.game.pass_move()
+        except ValueError as e:
+            return str(e)
+        self.undo_requester = None
+        return None
+    
+    def resign(self, color):
+        """color 方认输（调用方持有 lock）"""
+        self.game.game_over = True
+        self.game.winner = 'white' if color == 'black' else 'black'
+    
+    def undo(self, color):
+        """悔棋：撤销到 color 方最近一步之前，轮到 color 方（调用方持有 lock）
+        
+        Returns:
+            tuple: (错误信息, 变化的格子)，合法时错误信息为 None
+        """
+        history = self.game.move_history
+        if not any(record['player'] == color for record in history):
+            return '没有可悔的棋', []
+        
+        changes = []
+        while True:
+            record = self.game.undo_move()
+            changes.extend(self._undo_changes(record))
+            if record['player'] == color:
+                break
+        self.undo_requester = None
+        return None, changes
+    
+    def _move_changes(self, record):
+        """一条落子记录对应的格子变化"""
+        if record.get('row') is None:
+            return []
+        color = record['player']
+        changes = [[record['row'], record['col'], color]]
+        # 围棋提子 / 黑白棋翻转
+        changes.extend([r, c, None] for r, c in record.get('captured', ()))
+        changes.extend([r, c, color] for r, c in record.get('flipped', ()))
+        return changes
+    
+    def _undo_changes(self, record):
+        """撤销一条落子记录对应的格子变化"""
+        if record.get('row') is None:
+            return []
+        opponent = 'white' if record['player'] == 'black' else 'black'
+        changes = [[record['row'], record['col'], None]]
+        changes.extend([r, c, opponent] for r, c in record.get('captured', ()))
+        changes.extend([r, c, opponent] for r, c in record.get('flipped', ()))
+        return changes
+    
+    def state_message(self):
+        """完整状态消息（调用方持有 lock）"""
+        grid = self.game.board.grid
+        board_data = [list(grid[i]) for i in range(self.board_size)]
+        return {
+            'type': 'state_update',
+            'room_id': self.room_id,
+            'seq': self.seq,
+            'board': board_data,
+            'board_size': self.board_size,
+            'current_player': self.current_player,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'game_type': self.game_type,
+            'players': self.players()
+        }
+    
+    def delta_message(self, changes):
+        """增量状态消息，序号加一（调用方持有 lock）
+        
+        Args:
+            changes: 变化的格子 [[行, 列, 颜色], ...]，颜色为 None 表示提子
+        """
+        self.seq += 1
+        delta = {
+            'type': 'state_delta',
+            'room_id': self.room_id,
+            'seq': self.seq,
+            'changes': changes,
+            'current_player': self.current_player,
+            'game_over': self.game_over,
+            'winner': self.winner
+        }
+        self.events.append(delta)
+        return delta
+    
+    def events_since(self, seq):
+        """序号 seq 之后的增量（调用方持有 lock）
+        
+        Returns:
+            list: 按序排列的增量消息；seq 不属于本局或已超出事件日志范围时返回 None（需要完整快照）。
+            seq 等于开局序号时分不清是旧局的最后一步还是新局开局，也按快照处理。
+        """
+        if self.game is None or not isinstance(seq, int):
+            return None
+        if not self.game_seq < seq <= self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.events or self.events[0]['seq'] > seq + 1:
+            return None
+        return [delta for delta in self.events if delta['seq'] > seq]
+
+    def merge_spectator_delta(self, delta):
+        """把一条增量并入观战者的待发增量（调用方持有 lock）"""
+        pending = self.spectator_delta
+        if pending is None:
+            pending = self.spectator_delta = dict(delta, base_seq=delta['seq'] - 1, changes={})
+        cells = pending['changes']
+        for row, col, color in delta['changes']:
+            cells[(row, col)] = color
+        pending['seq'] = delta['seq']
+        pending['current_player'] = delta['current_player']
+        pending['game_over'] = delta['game_over']
+        pending['winner'] = delta['winner']
+    
+    def take_spectator_delta(self):
+        """取出观战者的待发增量，没有时返回 None（调用方持有 lock）
+        
+        合并后的增量带 base_seq：客户端序号在 [base_seq, seq) 内都可以直接应用
+        （变化的格子都是最终值）。只合并了一条时去掉 base_seq，与普通增量相同。
+        """
+        pending = self.spectator_delta
+        if pending is None:
+            return None
+        self.spectator_delta = None
+        pending['changes'] = [[row, col, color] for (row, col), color in pending['changes'].items()]
+        if pending['base_seq'] == pending['seq'] - 1:
+            del pending['base_seq']
+        return pending
+
+
+class RoomManager:
+    """房间表：按房间ID O(1) 查找
+    
+    只在创建、删除房间时持有表锁，房间内的操作只用各房间自己的锁。
+    """
+    
+    DEFAULT_ROOM = 'default'
+    
+    def __init__(self):
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # 默认房间：加入时不指定房间的客户端（兼容单房间协议）进入这里
+        self.create(name='默认房间', room_id=self.DEFAULT_ROOM, persistent=True)
+    
+    def create(self, name=None, game_type='gomoku', board_size=15, room_id=None, persistent=False):
+        """创建房间"""
+        with self._lock:
+            if room_id is None:
+                room_id = str(next(self._ids))
+                while room_id in self._rooms:
+                    room_id = str(next(self._ids))
+            elif room_id in self._rooms:
+                raise ValueError(f"房间已存在: {room_id}")
+            room = Room(room_id, name, game_type, board_size, persistent)
+            self._rooms[room_id] = room
+            return room
+    
+    def get(self, room_id):
+        """按ID查找房间，不存在返回 None"""
+        return self._rooms.get(room_id)
+    
+    def remove_if_empty(self, room):
+        """成员为空（且没有保留座位）的非常驻房间从表中删除，返回是否删除"""
+        if room.persistent:
+            return False
+        with self._lock:
+            with room.lock:
+                if room.members or room.reserved:
+                    return False
+            if self._rooms.get(room.room_id) is room:
+                del self._rooms[room.room_id]
+                return True
+        return False
+    
+    def rooms(self):
+        """所有房间对象（快照）"""
+        with self._lock:
+            return list(self._rooms.values())
+    
+    def list(self):
+        """所有房间的摘要"""
+        with self._lock:
+            rooms = list(self._rooms.values())
+        summaries = []
+        for room in rooms:
+            with room.lock:
+                summaries.append(room.summary())
+        return summaries
+    
+    def __len__(self):
+        return len(self._rooms)
\ No newline at end of file
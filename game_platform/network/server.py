@@ -2,38 +2,96 @@
 """
 网络对战服务器（修复版v2）
 """
+import secrets
+import selectors
 import socket
 import threading
-import json
-from game_platform.board import GomokuBoard, GoBoard, OthelloBoard
+import time
+from game_platform.board import Board
+from game_platform.network.matchmaking import Matchmaker, user_rating
+from game_platform.network.outbox import Outbox
+from game_platform.network.protocol import FrameDecoder, ProtocolError, encode_frame, encode_line
+from game_platform.network.room import RoomManager
 
 
 class GameServer:
-    """游戏服务器"""
+    """游戏服务器
     
-    def __init__(self, host='0.0.0.0', port=9999):
+    一个服务器可同时承载多个房间，每个房间有自己的棋局和锁。
+    self.lock 只保护连接表 clients，房间内的操作只持有该房间的锁。
+    
+    发送不阻塞：每个连接有一个有界发送队列（Outbox）和自己的写线程，
+    广播只是逐个入队。队列满时按 queue_policy 处理：
+    'snapshot' 清空该连接的队列，改发一份完整快照；'disconnect' 直接断开。
+    
+    房间成员分为玩家（最多两人，有颜色）和观战者（人数不限，只读）。广播时每种编码
+    只序列化一次，同一份字节放进所有成员的队列。spectator_interval > 0 时观战者的
+    增量消息按间隔合并发送（玩家仍然逐条实时收到）。
+    
+    加入房间时下发会话令牌（session）。玩家断线后座位保留 session_timeout 秒，
+    客户端重连后发送 resume（令牌 + 已应用的序号），服务器恢复座位并从房间的事件日志
+    补发错过的增量；落后太多（超出日志范围或已开新局）时改发完整快照。
+    
+    心跳：每 heartbeat_interval 秒向所有连接发 ping，客户端回 pong，据此估算每个连接的
+    往返时间（rtt）；idle_timeout 秒内没有收到任何数据的连接视为已断开。
+    所有连接共用一个定时任务，空闲连接不需要各自轮询。
+    
+    匹配：客户端发送 queue_join（游戏类型、棋盘大小）进入匹配队列，等级分由 UserManager
+    中的战绩估算。定时任务每轮配对一次，配上的两人自动进入新建的房间并开局。
+    """
+    
+    QUEUE_POLICIES = ('snapshot', 'disconnect')
+    
+    def __init__(self, host='0.0.0.0', port=9999, queue_size=256, queue_policy='snapshot',
+                 spectator_interval=0.0, session_timeout=60.0, heartbeat_interval=15.0,
+                 idle_timeout=45.0, backlog=1024):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口（0 表示由系统分配，启动后写回 port）
+            queue_size: 每个连接最多排队的消息数
+            queue_policy: 队列满时的处理策略（'snapshot' 或 'disconnect'）
+            spectator_interval: 观战者增量消息的合并间隔（秒），0 表示不合并
+            session_timeout: 断线玩家保留座位的时间（秒），0 表示断线立即释放
+            heartbeat_interval: 发送 ping 的间隔（秒），0 表示不发心跳
+            idle_timeout: 多久没有收到数据就断开连接（秒），0 表示不检测
+            backlog: 监听队列长度
+        """
+        if queue_policy not in self.QUEUE_POLICIES:
+            raise ValueError(f"不支持的队列策略: {queue_policy}")
         self.host = host
         self.port = port
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.spectator_interval = spectator_interval
+        self.session_timeout = session_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
         self.server_socket = None
-        self.clients = {}  # {socket: {'username': str, 'color': str, 'buffer': str}}
+        self._wakeup = None  # 唤醒 accept 循环的 socket 对
+        self._next_heartbeat = 0.0
+        self.clients = {}  # {socket: {'username': str, 'color': str, 'binary': bool, 'room': Room, 'session': str, 'outbox': Outbox}}
+        self.sessions = {}  # {会话令牌: 客户端信息}，断线保留期间仍指向旧连接的信息
+        self._detached = {}  # 等待重连的会话 {会话令牌: 过期时间}
         self.running = False
         self.lock = threading.Lock()
+        self.disconnects = 0  # 因发送队列满被断开的连接数
+        self.timeouts = 0  # 因心跳超时被断开的连接数
         
-        # 游戏状态
-        self.game_type = None
-        self.board_size = 15
-        self.board = None
-        self.current_player = 'black'
-        self.game_started = False
-        self.game_over = False
-        self.winner = None
+        # 房间
+        self.rooms = RoomManager()
+        self.matchmaker = Matchmaker()
         
         # 回调
         self.on_log = None
+        # 是否把日志打印到控制台（连接数多时可关闭）
+        self.verbose = True
         
     def log(self, msg):
         """输出日志"""
-        print(f"[Server] {msg}")
+        if self.verbose:
+            print(f"[Server] {msg}")
         if self.on_log:
             try:
                 self.on_log(msg)
@@ -45,51 +103,70 @@ class GameServer:
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(2)
+        self.server_socket.listen(self.backlog)
+        if self.port == 0:
+            # 端口为0时由系统分配
+            self.port = self.server_socket.getsockname()[1]
         self.running = True
         
         self.log(f"服务器启动在 {self.host}:{self.port}")
         
-        while self.running:
-            try:
-                self.server_socket.settimeout(1.0)
+        maintenance = threading.Thread(target=self._maintenance_loop)
+        maintenance.daemon = True
+        maintenance.start()
+        
+        # 等待新连接或 stop 的唤醒，不再用超时轮询
+        self._wakeup = socket.socketpair()
+        selector = selectors.DefaultSelector()
+        selector.register(self.server_socket, selectors.EVENT_READ)
+        selector.register(self._wakeup[0], selectors.EVENT_READ)
+        
+        try:
+            while self.running:
                 try:
-                    client_socket, addr = self.server_socket.accept()
-                    self.log(f"新连接: {addr}")
-                    
-                    # 初始化客户端数据（在启动线程之前！）
-                    with self.lock:
-                        self.clients[client_socket] = {
-                            'username': None,
-                            'color': None,
-                            'buffer': '',
-                            'addr': addr
-                        }
-                    
-                    # 启动客户端处理线程
-                    thread = threading.Thread(target=self._handle_client, args=(client_socket, addr))
-                    thread.daemon = True
-                    thread.start()
-                    
-                except socket.timeout:
-                    continue
-            except Exception as e:
-                if self.running:
-                    self.log(f"接受连接错误: {e}")
-                break
+                    for key, _ in selector.select():
+                        if key.fileobj is not self.server_socket or not self.running:
+                            continue
+                        client_socket, addr = self.server_socket.accept()
+                        self.log(f"新连接: {addr}")
+                        
+                        # 初始化客户端数据（在启动线程之前！）
+                        info = self._new_client_info(client_socket, addr)
+                        with self.lock:
+                            self.clients[client_socket] = info
+                        
+                        # 启动客户端处理线程和写线程
+                        thread = threading.Thread(target=self._handle_client, args=(client_socket, addr))
+                        thread.daemon = True
+                        thread.start()
+                        writer = threading.Thread(target=self._write_loop, args=(client_socket, info['outbox']))
+                        writer.daemon = True
+                        writer.start()
+                
+                except Exception as e:
+                    if self.running:
+                        self.log(f"接受连接错误: {e}")
+                    break
+        finally:
+            selector.close()
+            for sock in self._wakeup:
+                sock.close()
         
         self.log("服务器已停止")
     
     def stop(self):
         """停止服务器"""
         self.running = False
+        if self._wakeup:
+            try:
+                self._wakeup[1].send(b'\0')
+            except OSError:
+                pass
         
         with self.lock:
-            for client_socket in list(self.clients.keys()):
-                try:
-                    client_socket.close()
-                except:
-                    pass
+            for client_socket, info in list(self.clients.items()):
+                info['outbox'].close()
+                self._close_connection(client_socket)
             self.clients.clear()
         
         if self.server_socket:
@@ -102,41 +179,31 @@ class GameServer:
         """处理客户端连接"""
         self.log(f"开始处理客户端 {addr}")
         
+        decoder = FrameDecoder()
         try:
-            # 短超时，便于检测断开
-            client_socket.settimeout(1.0)
+            # 阻塞读：写线程共用这个 socket，不能设超时（sendall 超时会写出半条消息）；
+            # 关闭时由 _close_connection 的 shutdown 唤醒
+            client_socket.settimeout(None)
             
             while self.running:
                 try:
-                    data = client_socket.recv(4096)
-                    if not data:
+                    received = decoder.recv_into(client_socket)
+                    if not received:
                         self.log(f"客户端 {addr} 关闭连接")
                         break
                     
-                    decoded = data.decode('utf-8')
-                    self.log(f"收到数据 from {addr}: {decoded[:100]}")
-                    
-                    # 获取并更新缓冲区
-                    with self.lock:
-                        if client_socket not in self.clients:
-                            self.log(f"客户端 {addr} 不在列表中")
-                            break
-                        self.clients[client_socket]['buffer'] += decoded
-                        buffer = self.clients[client_socket]['buffer']
+                    if client_socket not in self.clients:
+                        self.log(f"客户端 {addr} 不在列表中")
+                        break
                     
                     # 处理完整消息
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        
-                        with self.lock:
-                            if client_socket in self.clients:
-                                self.clients[client_socket]['buffer'] = buffer
-                        
-                        if line.strip():
-                            self._process_message(client_socket, line.strip())
-                            
+                    self._process_buffered(client_socket, decoder)
+                
                 except socket.timeout:
                     continue
+                except ProtocolError as e:
+                    self.log(f"客户端 {addr} 协议错误: {e}")
+                    break
                 except Exception as e:
                     self.log(f"接收错误 from {addr}: {e}")
                     break
@@ -148,16 +215,91 @@ class GameServer:
         finally:
             self._remove_client(client_socket)
     
-    def _process_message(self, client_socket, data):
+    def _new_client_info(self, client_socket, addr):
+        """新连接的客户端信息"""
+        return {
+            'username': None,
+            'color': None,
+            'binary': False,
+            'addr': addr,
+            'conn': client_socket,
+            'room': None,
+            'spectator': False,
+            'session': None,
+            'last_seen': time.monotonic(),  # 最后一次收到数据的时间
+            'rtt': None,  # 平滑后的往返时间（秒）
+            'outbox': Outbox(self.queue_size)
+        }
+    
+    def _write_loop(self, client_socket, outbox):
+        """写线程：把发送队列中的消息合并写出，队列关闭后退出"""
+        while True:
+            items = outbox.take()
+            if not items:
+                break
+            try:
+                client_socket.sendall(b''.join(data for data, _ in items))
+            except Exception as e:
+                self.log(f"发送失败: {e}")
+                self._close_connection(client_socket)
+                break
+            outbox.mark_sent(items)
+    
+    def _close_connection(self, client_socket):
+        """关闭连接（读线程随之退出并移除客户端）"""
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except:
+            pass
+        try:
+            client_socket.close()
+        except:
+            pass
+    
+    def _process_buffered(self, client_socket, decoder):
+        """处理解码器中所有完整的消息"""
+        info = self.clients.get(client_socket)
+        if info is not None:
+            info['last_seen'] = time.monotonic()
+        while True:
+            try:
+                msg = decoder.next_message()
+            except ValueError as e:
+                self.log(f"消息解析错误: {e}")
+                continue
+            if msg is None:
+                return
+            self._process_message(client_socket, msg)
+    
+    def _process_message(self, client_socket, msg):
         """处理消息"""
         try:
-            msg = json.loads(data)
             msg_type = msg.get('type')
             
+            # 心跳消息不记日志
+            if msg_type == 'ping':
+                self._send_to_client(client_socket, {'type': 'pong', 'time': msg.get('time')})
+                return
+            elif msg_type == 'pong':
+                self._handle_pong(client_socket, msg)
+                return
+            
             self.log(f"收到消息类型: {msg_type}")
             
             if msg_type == 'join':
                 self._handle_join(client_socket, msg)
+            elif msg_type == 'resume':
+                self._handle_resume(client_socket, msg)
+            elif msg_type == 'queue_join':
+                self._handle_queue_join(client_socket, msg)
+            elif msg_type == 'queue_leave':
+                self._handle_queue_leave(client_socket, msg)
+            elif msg_type == 'create_room':
+                self._handle_create_room(client_socket, msg)
+            elif msg_type == 'list_rooms':
+                self._handle_list_rooms(client_socket, msg)
+            elif msg_type == 'leave_room':
+                self._handle_leave_room(client_socket, msg)
             elif msg_type == 'create_game':
                 self._handle_create_game(client_socket, msg)
             elif msg_type == 'move':
@@ -170,361 +312,828 @@ class GameServer:
                 self._handle_undo_request(client_socket, msg)
             elif msg_type == 'undo_response':
                 self._handle_undo_response(client_socket, msg)
+            elif msg_type == 'sync_request':
+                self._handle_sync_request(client_socket, msg)
             else:
                 self.log(f"未知消息类型: {msg_type}")
                 
-        except json.JSONDecodeError as e:
-            self.log(f"JSON解析错误: {e}")
         except Exception as e:
             self.log(f"处理消息出错: {e}")
             import traceback
             traceback.print_exc()
     
+    def _client_room(self, client_socket):
+        """获取客户端信息及其所在房间"""
+        client_info = self.clients.get(client_socket)
+        if client_info is None:
+            return None, None
+        return client_info, client_info.get('room')
+    
+    def _send_error(self, client_socket, message):
+        self._send_to_client(client_socket, {
+            'type': 'error',
+            'message': message
+        })
+    
+    def _check_board_size(self, client_socket, board_size):
+        """棋盘大小是否在 Board 支持的范围内，不在时回复错误"""
+        if isinstance(board_size, int) and Board.MIN_SIZE <= board_size <= Board.MAX_SIZE:
+            return True
+        self._send_error(client_socket, f'棋盘大小必须在{Board.MIN_SIZE}到{Board.MAX_SIZE}之间')
+        return False
+    
     def _handle_join(self, client_socket, msg):
-        """处理加入请求"""
+        """处理加入请求（不指定 room_id 时加入默认房间，带 spectate 时以观战者身份加入）"""
         username = msg.get('username', 'Player')
         preferred_color = msg.get('color', 'black')
+        room_id = msg.get('room_id') or RoomManager.DEFAULT_ROOM
+        spectate = bool(msg.get('spectate'))
         
-        self.log(f"处理 join: {username}, 偏好颜色: {preferred_color}")
+        self.log(f"处理 join: {username}, 房间: {room_id}, 偏好颜色: {preferred_color}")
         
-        assigned_color = None
+        client_info, current_room = self._client_room(client_socket)
+        if client_info is None:
+            self.log(f"错误: client_socket 不在 clients 中")
+            return
         
-        with self.lock:
-            # 检查已占用的颜色
-            taken_colors = set()
-            for sock, info in self.clients.items():
-                if info.get('color'):
-                    taken_colors.add(info['color'])
-            
-            self.log(f"已占用颜色: {taken_colors}")
-            
-            # 分配颜色
-            if preferred_color not in taken_colors:
-                assigned_color = preferred_color
-            elif 'black' not in taken_colors:
-                assigned_color = 'black'
-            elif 'white' not in taken_colors:
-                assigned_color = 'white'
+        room = self.rooms.get(room_id)
+        if room is None:
+            self._send_error(client_socket, '房间不存在')
+            return
+        
+        if current_room is not None and current_room is not room:
+            self._leave_room(client_socket, client_info)
+        
+        with room.lock:
+            was_player = client_socket in room.members and bool(client_info.get('color'))
+            if spectate:
+                assigned_color = None
+            elif was_player:
+                assigned_color = client_info['color']
             else:
-                self.log(f"房间已满，拒绝 {username}")
-                self._send_to_client(client_socket, {
-                    'type': 'error',
-                    'message': '房间已满'
-                })
-                return
-            
-            # 更新客户端信息
-            if client_socket in self.clients:
-                self.clients[client_socket]['username'] = username
-                self.clients[client_socket]['color'] = assigned_color
-                self.log(f"玩家 {username} 加入，分配颜色: {assigned_color}")
+                assigned_color = room.assign_color(preferred_color)
+            accepted = spectate or assigned_color is not None
+            if not accepted:
+                self.log(f"房间 {room_id} 已满，拒绝 {username}")
             else:
-                self.log(f"错误: client_socket 不在 clients 中")
-                return
+                client_info['username'] = username
+                client_info['color'] = assigned_color
+                client_info['spectator'] = spectate
+                client_info['room'] = room
+                room.members[client_socket] = client_info
+                if spectate:
+                    self.log(f"{username} 进入房间 {room_id} 观战")
+                else:
+                    self.log(f"玩家 {username} 加入房间 {room_id}，分配颜色: {assigned_color}")
+            players = room.players()
+        
+        if not accepted:
+            self._send_error(client_socket, '房间已满')
+            return
         
-        # 发送颜色分配（在锁外）
-        self.log(f"发送 color_assigned 给 {username}: {assigned_color}")
+        # 第一次加入时分配会话令牌，断线重连时凭它恢复座位
+        token = client_info.get('session')
+        if token is None:
+            token = client_info['session'] = secrets.token_hex(16)
+            with self.lock:
+                self.sessions[token] = client_info
+        
+        # 发送颜色分配（在锁外）；客户端提出二进制升级时在这里确认，之后改发二进制帧
+        upgrade = bool(msg.get('binary')) and not client_info.get('binary')
         self._send_to_client(client_socket, {
             'type': 'color_assigned',
             'color': assigned_color,
-            'username': username
+            'username': username,
+            'room_id': room.room_id,
+            'role': 'spectator' if spectate else 'player',
+            'session': token,
+            'binary': upgrade or client_info.get('binary', False)
         })
+        if upgrade:
+            client_info['binary'] = True
+        
+        # 座位有变化时广播玩家列表；观战者进出不打扰其他成员
+        if spectate and not was_player:
+            self._send_to_client(client_socket, {
+                'type': 'players_update',
+                'room_id': room.room_id,
+                'players': players
+            })
+        else:
+            self._broadcast_players(room)
         
-        # 广播玩家列表
-        self._broadcast_players()
+        # 中途加入已开始的房间，补发当前局面（完整快照）
+        if room.game_started:
+            with room.lock:
+                start_msg = self._start_message(room)
+                state = room.state_message()
+            self._send_to_client(client_socket, start_msg)
+            self._send_to_client(client_socket, state)
     
-    def _handle_create_game(self, client_socket, msg):
-        """处理创建游戏"""
-        self.game_type = msg.get('game_type', 'gomoku')
-        self.board_size = msg.get('board_size', 15)
-        
-        # 创建棋盘
-        if self.game_type == 'gomoku':
-            self.board = GomokuBoard(self.board_size)
-        elif self.game_type == 'go':
-            self.board = GoBoard(self.board_size)
-        elif self.game_type == 'othello':
-            self.board = OthelloBoard(self.board_size)
-            mid = self.board_size // 2
-            self.board.grid[mid-1][mid-1] = 'white'
-            self.board.grid[mid-1][mid] = 'black'
-            self.board.grid[mid][mid-1] = 'black'
-            self.board.grid[mid][mid] = 'white'
+    def _handle_resume(self, client_socket, msg):
+        """处理断线重连：凭会话令牌恢复房间和座位，补发错过的增量（落后太多时发完整快照）"""
+        token = msg.get('session')
+        client_info = self.clients.get(client_socket)
+        if client_info is None:
+            return
+        
+        with self.lock:
+            old_info = self.sessions.get(token) if isinstance(token, str) else None
+            room = old_info.get('room') if old_info is not None else None
+            if old_info is client_info or room is None or self.rooms.get(room.room_id) is not room:
+                old_info = None
+            else:
+                # 会话转到新连接上（新连接自己的会话作废）
+                if self.sessions.get(client_info.get('session')) is client_info:
+                    del self.sessions[client_info['session']]
+                self.sessions[token] = client_info
+                self._detached.pop(token, None)
+                old_connected = self.clients.get(old_info['conn']) is old_info
+        
+        if old_info is None:
+            self._send_to_client(client_socket, {
+                'type': 'resume_failed',
+                'message': '会话已失效，请重新加入'
+            })
+            return
+        
+        old_socket = old_info['conn']
+        color = old_info.get('color')
+        username = old_info.get('username')
+        with room.lock:
+            room.members.pop(old_socket, None)
+            seat = room.reserved.get(color) if color else None
+            was_offline = seat is not None and seat['session'] == token
+            if was_offline:
+                del room.reserved[color]
+            # 旧连接可能还没发现断开（半开连接）：与会话脱钩，它的清理不再影响座位
+            old_info['room'] = None
+            old_info['color'] = None
+            old_info['session'] = None
+            client_info['username'] = username
+            client_info['color'] = color
+            client_info['spectator'] = old_info.get('spectator', False)
+            client_info['room'] = room
+            client_info['session'] = token
+            room.members[client_socket] = client_info
+            
+            events = room.events_since(msg.get('seq'))
+            if events is None and room.game_started:
+                start_msg = self._start_message(room)
+                state = room.state_message()
+            seq = room.seq
+            players = room.players()
+        
+        if old_connected:
+            self._close_connection(old_socket)
+        
+        if events is None:
+            self.log(f"{username} 重连房间 {room.room_id}，发送完整快照")
         else:
-            self.board = GomokuBoard(self.board_size)
+            self.log(f"{username} 重连房间 {room.room_id}，补发 {len(events)} 条增量")
         
-        self.current_player = 'black'
-        self.game_started = True
-        self.game_over = False
-        self.winner = None
+        upgrade = bool(msg.get('binary')) and not client_info.get('binary')
+        self._send_to_client(client_socket, {
+            'type': 'resumed',
+            'color': color,
+            'username': username,
+            'room_id': room.room_id,
+            'role': 'spectator' if client_info['spectator'] else 'player',
+            'session': token,
+            'seq': seq,
+            'binary': upgrade or client_info.get('binary', False)
+        })
+        if upgrade:
+            client_info['binary'] = True
         
-        self.log(f"游戏已创建: {self.game_type} {self.board_size}x{self.board_size}")
+        self._send_to_client(client_socket, {
+            'type': 'players_update',
+            'room_id': room.room_id,
+            'players': players
+        })
+        if events is not None:
+            for delta in events:
+                self._send_to_client(client_socket, delta)
+            if events and events[-1]['game_over']:
+                # 错过了终局
+                self._send_to_client(client_socket, {
+                    'type': 'game_over',
+                    'room_id': room.room_id,
+                    'winner': events[-1]['winner']
+                })
+        elif room.game_started:
+            self._send_to_client(client_socket, start_msg)
+            self._send_to_client(client_socket, state)
         
-        self._broadcast({
-            'type': 'game_start',
-            'game_type': self.game_type,
-            'board_size': self.board_size
+        if was_offline:
+            self._broadcast({
+                'type': 'message',
+                'message': f"{username} 已重新连接"
+            }, room)
+    
+    def _handle_create_room(self, client_socket, msg):
+        """处理创建房间（带 username 时创建者直接加入）"""
+        game_type = msg.get('game_type', 'gomoku')
+        board_size = msg.get('board_size', 15)
+        room = self.rooms.create(msg.get('name'), game_type, board_size)
+        self.log(f"房间已创建: {room.room_id} {room.name}")
+        
+        with room.lock:
+            summary = room.summary()
+        self._send_to_client(client_socket, {
+            'type': 'room_created',
+            'room': summary
         })
         
-        self._broadcast_state()
+        if msg.get('username'):
+            self._handle_join(client_socket, {
+                'username': msg['username'],
+                'color': msg.get('color', 'black'),
+                'room_id': room.room_id
+            })
     
-    def _handle_move(self, client_socket, msg):
-        """处理落子"""
-        if not self.game_started or self.game_over:
+    def _handle_list_rooms(self, client_socket, msg):
+        """处理房间列表请求"""
+        self._send_to_client(client_socket, {
+            'type': 'room_list',
+            'rooms': self.rooms.list()
+        })
+    
+    def _handle_leave_room(self, client_socket, msg):
+        """处理离开房间"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            self._send_error(client_socket, '未加入房间')
+            return
+        
+        self._leave_room(client_socket, client_info)
+        self._send_to_client(client_socket, {
+            'type': 'room_left',
+            'room_id': room.room_id
+        })
+    
+    def _leave_room(self, client_socket, client_info):
+        """将客户端移出其所在房间"""
+        room = client_info.get('room')
+        if room is None:
+            return
+        
+        with room.lock:
+            room.members.pop(client_socket, None)
+            was_player = client_info.get('color') is not None
+            client_info['room'] = None
+            client_info['color'] = None
+        
+        self.log(f"{client_info.get('username')} 离开房间 {room.room_id}")
+        if not self.rooms.remove_if_empty(room) and was_player:
+            self._broadcast_players(room)
+    
+    def _handle_create_game(self, client_socket, msg):
+        """处理创建游戏（在客户端所在房间开新局）"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            self._send_error(client_socket, '未加入房间')
+            return
+        if not client_info.get('color'):
+            self._send_error(client_socket, '观战者不能开局')
+            return
+        
+        board_size = msg.get('board_size', 15)
+        if not self._check_board_size(client_socket, board_size):
+            return
+        
+        self._start_game(room, msg.get('game_type', 'gomoku'), board_size)
+    
+    def _start_game(self, room, game_type, board_size):
+        """在房间内开新局并广播"""
+        with room.lock:
+            setup = room.new_game(game_type, board_size)
+            start_msg = self._start_message(room)
+            delta = room.delta_message(setup)
+        
+        self.log(f"房间 {room.room_id} 游戏已创建: {room.game_type} {room.board_size}x{room.board_size}")
+        
+        # 客户端收到 game_start 后清空棋盘，开局棋子随第一条增量下发
+        self._broadcast(start_msg, room)
+        self._broadcast(delta, room)
+    
+    def _handle_queue_join(self, client_socket, msg):
+        """处理加入匹配队列（已在队列中时按新条件重新排队）"""
+        client_info = self.clients.get(client_socket)
+        if client_info is None:
+            return
+        
+        game_type = msg.get('game_type', 'gomoku')
+        board_size = msg.get('board_size', 15)
+        if game_type not in ('gomoku', 'go', 'othello'):
+            self._send_error(client_socket, '不支持的游戏类型')
+            return
+        # 配对后才开局，大小不合法的票会在定时任务里开局失败，入队前就拒绝
+        if not self._check_board_size(client_socket, board_size):
             return
         
-        row = msg.get('row')
-        col = msg.get('col')
+        username = msg.get('username') or client_info.get('username') or 'Player'
+        rating = user_rating(username)
+        self.matchmaker.enqueue(client_socket, username, game_type, board_size, rating)
+        self.log(f"{username}（{rating:.0f}）排队匹配 {game_type} {board_size}x{board_size}")
         
+        self._send_to_client(client_socket, {
+            'type': 'queued',
+            'game_type': game_type,
+            'board_size': board_size,
+            'rating': round(rating),
+            'waiting': self.matchmaker.waiting(game_type, board_size)
+        })
+    
+    def _handle_queue_leave(self, client_socket, msg):
+        """处理退出匹配队列"""
+        self._send_to_client(client_socket, {
+            'type': 'queue_left',
+            'cancelled': self.matchmaker.cancel(client_socket)
+        })
+    
+    def _run_matchmaking(self):
+        """配对一轮，为每一对玩家开房间"""
+        for first, second in self.matchmaker.match():
+            self._start_match(first, second)
+    
+    def _start_match(self, black, white):
+        """新建房间，配上的两人入座（先入队的执黑）并开局"""
         with self.lock:
-            client_info = self.clients.get(client_socket, {})
-            client_color = client_info.get('color')
-            
-            if client_color != self.current_player:
-                self._send_to_client(client_socket, {
-                    'type': 'error',
-                    'message': '不是你的回合'
-                })
-                return
-            
-            if row is None or col is None:
-                return
-            if not (0 <= row < self.board_size and 0 <= col < self.board_size):
-                return
-            if self.board.grid[row][col] is not None:
-                self._send_to_client(client_socket, {
-                    'type': 'error',
-                    'message': '该位置已有棋子'
-                })
+            alive = [ticket for ticket in (black, white) if ticket['player'] in self.clients]
+        if len(alive) < 2:
+            # 配对后有一方已断开：另一方按原来的入队时间重新排队
+            for ticket in alive:
+                self.matchmaker.enqueue(ticket['player'], ticket['username'], ticket['game_type'],
+                                        ticket['board_size'], ticket['rating'], now=ticket['queued_at'])
+            return
+        
+        game_type = black['game_type']
+        board_size = black['board_size']
+        room = self.rooms.create(f"匹配: {black['username']} vs {white['username']}", game_type, board_size)
+        self.log(f"匹配成功: {black['username']}（{black['rating']:.0f}）vs "
+                 f"{white['username']}（{white['rating']:.0f}），房间 {room.room_id}")
+        
+        for ticket, color, opponent in ((black, 'black', white), (white, 'white', black)):
+            self._send_to_client(ticket['player'], {
+                'type': 'match_found',
+                'room_id': room.room_id,
+                'color': color,
+                'rating': round(ticket['rating']),
+                'opponent': opponent['username'],
+                'opponent_rating': round(opponent['rating'])
+            })
+            self._handle_join(ticket['player'], {
+                'username': ticket['username'],
+                'color': color,
+                'room_id': room.room_id
+            })
+        
+        self._start_game(room, game_type, board_size)
+    
+    def _handle_move(self, client_socket, msg):
+        """处理落子（规则由房间内的 Game 校验）"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            return
+        
+        with room.lock:
+            if not room.game_started or room.game_over:
                 return
             
-            self.board.grid[row][col] = self.current_player
-            
-            if self.game_type == 'othello':
-                self._flip_stones(row, col, self.current_player)
-            
-            self.log(f"{self.current_player} 落子: ({row}, {col})")
-            
-            if self._check_winner():
-                self.game_over = True
-                self.log(f"游戏结束，胜者: {self.winner}")
+            player = room.current_player
+            if client_info.get('color') != player:
+                error = '不是你的回合'
+            else:
+                error, changes = room.apply_move(msg.get('row'), msg.get('col'))
+            if not error:
+                delta = room.delta_message(changes)
+            game_over = room.game_over
+            winner = room.winner
+        
+        if error:
+            self._send_error(client_socket, error)
+            return
+        
+        self.log(f"房间 {room.room_id} {player} 落子: ({msg.get('row')}, {msg.get('col')})")
         
-        if self.game_over:
+        # 先发最后一步的增量，客户端收到 game_over 时棋盘已是终局
+        self._broadcast(delta, room)
+        
+        if game_over:
+            self.log(f"房间 {room.room_id} 游戏结束，胜者: {winner}")
             self._broadcast({
                 'type': 'game_over',
-                'winner': self.winner
-            })
-        else:
-            self.current_player = 'white' if self.current_player == 'black' else 'black'
-        
-        self._broadcast_state()
+                'room_id': room.room_id,
+                'winner': winner
+            }, room)
     
     def _handle_pass(self, client_socket, msg):
         """处理弃权"""
-        if not self.game_started or self.game_over:
+        client_info, room = self._client_room(client_socket)
+        if room is None:
             return
         
-        with self.lock:
-            client_info = self.clients.get(client_socket, {})
-            if client_info.get('color') != self.current_player:
+        with room.lock:
+            if not room.game_started or room.game_over:
+                return
+            player = room.current_player
+            if client_info.get('color') != player:
                 return
             
-            self.log(f"{self.current_player} 弃权")
-            self.current_player = 'white' if self.current_player == 'black' else 'black'
+            error = room.apply_pass()
+            if not error:
+                delta = room.delta_message([])
+            game_over = room.game_over
+            winner = room.winner
+        
+        if error:
+            self._send_error(client_socket, error)
+            return
         
-        self._broadcast_state()
+        self.log(f"房间 {room.room_id} {player} 弃权")
+        
+        self._broadcast(delta, room)
+        
+        if game_over:
+            # 围棋双方连续虚着、黑白棋双方都无子可下时终局
+            self.log(f"房间 {room.room_id} 游戏结束，胜者: {winner}")
+            self._broadcast({
+                'type': 'game_over',
+                'room_id': room.room_id,
+                'winner': winner
+            }, room)
     
     def _handle_resign(self, client_socket, msg):
         """处理认输"""
-        if not self.game_started or self.game_over:
+        client_info, room = self._client_room(client_socket)
+        if room is None:
             return
         
-        with self.lock:
-            client_info = self.clients.get(client_socket, {})
-            loser_color = client_info.get('color')
+        with room.lock:
+            if not room.game_started or room.game_over:
+                return
             
+            loser_color = client_info.get('color')
             if not loser_color:
                 return
             
-            self.game_over = True
-            self.winner = 'white' if loser_color == 'black' else 'black'
-            self.log(f"{loser_color} 认输，{self.winner} 获胜")
+            room.resign(loser_color)
+            winner = room.winner
+            delta = room.delta_message([])
+            self.log(f"房间 {room.room_id} {loser_color} 认输，{winner} 获胜")
         
+        self._broadcast(delta, room)
         self._broadcast({
             'type': 'game_over',
-            'winner': self.winner
-        })
+            'room_id': room.room_id,
+            'winner': winner
+        }, room)
     
     def _handle_undo_request(self, client_socket, msg):
-        """处理悔棋请求"""
-        with self.lock:
-            client_info = self.clients.get(client_socket, {})
-            from_user = client_info.get('username', '对方')
-            
-            for sock, info in self.clients.items():
-                if sock != client_socket:
-                    self._send_to_client(sock, {
-                        'type': 'undo_request',
-                        'from': from_user
-                    })
+        """处理悔棋请求（记下请求方，转发给房间内其他成员）"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            return
+        
+        from_user = client_info.get('username', '对方')
+        with room.lock:
+            color = client_info.get('color')
+            if not room.game_started or not color:
+                return
+            room.undo_requester = color
+            others = [sock for sock, info in room.members.items()
+                      if sock != client_socket and info.get('color')]
+        
+        for sock in others:
+            self._send_to_client(sock, {
+                'type': 'undo_request',
+                'from': from_user
+            })
     
     def _handle_undo_response(self, client_socket, msg):
         """处理悔棋响应"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            return
+        
         accepted = msg.get('accepted', False)
+        delta = None
+        
+        with room.lock:
+            requester = room.undo_requester
+            color = client_info.get('color')
+            # 只有对手能答复；请求之后又有人落子则请求作废
+            if requester is None or not color or color == requester:
+                return
+            room.undo_requester = None
+            if accepted:
+                error, changes = room.undo(requester)
+                if error:
+                    accepted = False
+                else:
+                    delta = room.delta_message(changes)
         
         self._broadcast({
             'type': 'message',
             'message': '悔棋已同意' if accepted else '悔棋被拒绝'
-        })
+        }, room)
+        if delta:
+            self._broadcast(delta, room)
     
-    def _flip_stones(self, row, col, color):
-        """黑白棋翻转"""
-        opponent = 'white' if color == 'black' else 'black'
-        directions = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
+    def _handle_sync_request(self, client_socket, msg):
+        """处理同步请求：客户端增量序号不连续时，单独补发完整快照"""
+        client_info, room = self._client_room(client_socket)
+        if room is None:
+            return
         
-        for dr, dc in directions:
-            to_flip = []
-            r, c = row + dr, col + dc
-            
-            while 0 <= r < self.board_size and 0 <= c < self.board_size:
-                if self.board.grid[r][c] == opponent:
-                    to_flip.append((r, c))
-                    r, c = r + dr, c + dc
-                elif self.board.grid[r][c] == color:
-                    for fr, fc in to_flip:
-                        self.board.grid[fr][fc] = color
-                    break
-                else:
-                    break
+        with room.lock:
+            if not room.board:
+                return
+            state = room.state_message()
+        
+        self._send_to_client(client_socket, state)
     
-    def _check_winner(self):
-        """检查胜负"""
-        if self.game_type == 'gomoku':
-            return self._check_gomoku_winner()
-        elif self.game_type == 'othello':
-            return self._check_othello_winner()
-        return False
+    def _handle_pong(self, client_socket, msg):
+        """处理心跳回应：更新连接的往返时间（与 TCP 相同的平滑系数 1/8）"""
+        info = self.clients.get(client_socket)
+        sent_at = msg.get('time')
+        if info is None or not isinstance(sent_at, (int, float)):
+            return
+        sample = time.monotonic() - sent_at
+        if sample < 0:
+            return
+        rtt = info.get('rtt')
+        info['rtt'] = sample if rtt is None else rtt + (sample - rtt) / 8
+    
+    def _start_message(self, room):
+        """开局消息，seq 为开局时的状态序号（调用方持有 room.lock）"""
+        return {
+            'type': 'game_start',
+            'room_id': room.room_id,
+            'seq': room.seq,
+            'game_type': room.game_type,
+            'board_size': room.board_size
+        }
     
-    def _check_gomoku_winner(self):
-        """五子棋胜负"""
-        directions = [(0,1),(1,0),(1,1),(1,-1)]
+    def _broadcast_players(self, room):
+        """广播房间的玩家列表"""
+        with room.lock:
+            players = room.players()
         
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                stone = self.board.grid[i][j]
-                if not stone:
-                    continue
-                
-                for dr, dc in directions:
-                    count = 1
-                    r, c = i + dr, j + dc
-                    while 0 <= r < self.board_size and 0 <= c < self.board_size:
-                        if self.board.grid[r][c] == stone:
-                            count += 1
-                            r, c = r + dr, c + dc
-                        else:
-                            break
-                    
-                    if count >= 5:
-                        self.winner = stone
-                        return True
-        return False
+        self.log(f"房间 {room.room_id} 广播玩家: {players}")
+        
+        self._broadcast({
+            'type': 'players_update',
+            'room_id': room.room_id,
+            'players': players
+        }, room)
     
-    def _check_othello_winner(self):
-        """黑白棋胜负"""
-        empty = black = white = 0
-        
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                stone = self.board.grid[i][j]
-                if stone is None:
-                    empty += 1
-                elif stone == 'black':
-                    black += 1
+    def _broadcast(self, msg, room):
+        """向房间内所有成员广播
+        
+        每种编码（JSON 行 / 二进制帧）只序列化一次。开启观战合并时，增量消息对观战者
+        只并入房间的待发增量；其他消息发出前先把待发增量推给观战者，保证顺序。
+        """
+        coalesce = self.spectator_interval > 0
+        pending = None
+        with room.lock:
+            members = list(room.members.items())
+            if coalesce:
+                if msg.get('type') == 'state_delta':
+                    room.merge_spectator_delta(msg)
                 else:
-                    white += 1
+                    pending = room.take_spectator_delta()
         
-        if empty == 0:
-            if black > white:
-                self.winner = 'black'
-            elif white > black:
-                self.winner = 'white'
-            else:
-                self.winner = 'draw'
-            return True
-        return False
+        if pending:
+            self._fan_out(pending, [(sock, info) for sock, info in members if info.get('spectator')])
+        if coalesce and msg.get('type') == 'state_delta':
+            members = [(sock, info) for sock, info in members if not info.get('spectator')]
+        self._fan_out(msg, members)
+    
+    def _fan_out(self, msg, members):
+        """把同一条消息放进多个连接的发送队列（每种编码只序列化一次）"""
+        encoded = {}
+        for sock, info in members:
+            binary = info.get('binary', False)
+            data = encoded.get(binary)
+            if data is None:
+                data = encoded[binary] = encode_frame(msg) if binary else encode_line(msg)
+            self._send_encoded(sock, info, data)
+    
+    def _flush_spectators(self):
+        """把各房间合并的待发增量推给观战者"""
+        for room in self.rooms.rooms():
+            with room.lock:
+                pending = room.take_spectator_delta()
+                if pending is None:
+                    continue
+                spectators = [(sock, info) for sock, info in room.members.items()
+                              if info.get('spectator')]
+            self._fan_out(pending, spectators)
     
-    def _broadcast_players(self):
-        """广播玩家列表"""
-        players = {}
+    def _maintenance_interval(self):
+        """定时任务的间隔：最长一秒，观战合并间隔或心跳间隔更短时按更短的"""
+        intervals = [value for value in (self.spectator_interval, self.heartbeat_interval) if value > 0]
+        return min(intervals + [1.0])
+    
+    def _maintenance(self):
+        """定时任务：推送观战者的合并增量，检查心跳，释放重连超时的座位，匹配配对"""
+        if self.spectator_interval > 0:
+            self._flush_spectators()
+        if self.heartbeat_interval > 0 or self.idle_timeout > 0:
+            self._check_heartbeats()
+        if self._detached:
+            self._expire_sessions()
+        if len(self.matchmaker):
+            self._run_matchmaking()
+    
+    def _check_heartbeats(self):
+        """断开超时未收到数据的连接；到了心跳间隔时向其余连接发 ping"""
+        now = time.monotonic()
         with self.lock:
-            for info in self.clients.values():
-                color = info.get('color')
-                username = info.get('username')
-                if color and username:
-                    players[color] = username
+            clients = list(self.clients.items())
         
-        self.log(f"广播玩家: {players}")
+        alive = []
+        for client_socket, info in clients:
+            if self.idle_timeout > 0 and now - info['last_seen'] > self.idle_timeout:
+                self.log(f"客户端 {info.get('addr')} 心跳超时，断开连接")
+                self.timeouts += 1
+                self._close_connection(client_socket)
+            else:
+                alive.append((client_socket, info))
         
-        self._broadcast({
-            'type': 'players_update',
-            'players': players
-        })
+        if self.heartbeat_interval > 0 and now >= self._next_heartbeat:
+            self._next_heartbeat = now + self.heartbeat_interval
+            self._fan_out({'type': 'ping', 'time': now}, alive)
     
-    def _broadcast_state(self):
-        """广播游戏状态"""
-        if not self.board:
-            return
-        
-        board_data = [[self.board.grid[i][j] for j in range(self.board_size)] 
-                      for i in range(self.board_size)]
+    def _maintenance_loop(self):
+        """定时任务（线程版）"""
+        interval = self._maintenance_interval()
+        while self.running:
+            time.sleep(interval)
+            try:
+                self._maintenance()
+            except Exception as e:
+                # 单次出错不能让心跳、会话过期和匹配全部停掉
+                self.log(f"定时任务出错: {e}")
+                import traceback
+                traceback.print_exc()
+    
+    def _detach_session(self, client_socket, client_info):
+        """连接断开但保留会话：玩家的座位留给重连的客户端，返回是否保留"""
+        token = client_info.get('session')
+        room = client_info.get('room')
+        if token is None or room is None or self.session_timeout <= 0 or not self.running:
+            return False
         
-        players = {}
+        with room.lock:
+            if client_info.get('room') is not room:
+                # 会话已被新连接接管
+                return True
+            room.members.pop(client_socket, None)
+            color = client_info.get('color')
+            if color:
+                room.reserved[color] = {'session': token, 'username': client_info.get('username')}
         with self.lock:
-            for info in self.clients.values():
-                color = info.get('color')
-                username = info.get('username')
-                if color and username:
-                    players[color] = username
+            if self.sessions.get(token) is client_info:
+                self._detached[token] = time.monotonic() + self.session_timeout
         
-        self._broadcast({
-            'type': 'state_update',
-            'board': board_data,
-            'board_size': self.board_size,
-            'current_player': self.current_player,
-            'game_over': self.game_over,
-            'winner': self.winner,
-            'game_type': self.game_type,
-            'players': players
-        })
+        self.log(f"{client_info.get('username')} 断线，保留会话 {self.session_timeout:g} 秒")
+        if color:
+            self._broadcast({
+                'type': 'message',
+                'message': f"{client_info.get('username')} 断线，等待重连"
+            }, room)
+        return True
     
-    def _broadcast(self, msg):
-        """广播"""
+    def _expire_sessions(self):
+        """释放重连超时的会话和座位"""
+        now = time.monotonic()
+        expired = []
         with self.lock:
-            sockets = list(self.clients.keys())
+            for token, deadline in list(self._detached.items()):
+                if deadline <= now:
+                    del self._detached[token]
+                    info = self.sessions.pop(token, None)
+                    if info is not None:
+                        expired.append((token, info))
         
-        for sock in sockets:
-            self._send_to_client(sock, msg)
+        for token, info in expired:
+            room = info.get('room')
+            if room is None:
+                continue
+            with room.lock:
+                color = info.get('color')
+                seat = room.reserved.get(color) if color else None
+                freed = seat is not None and seat['session'] == token
+                if freed:
+                    del room.reserved[color]
+                info['room'] = None
+                info['color'] = None
+            self.log(f"{info.get('username')} 重连超时，释放房间 {room.room_id} 的座位")
+            if not self.rooms.remove_if_empty(room) and freed:
+                self._broadcast_players(room)
+    
+    def _encode(self, info, msg):
+        """按连接协商的格式编码消息"""
+        if info.get('binary'):
+            return encode_frame(msg)
+        return encode_line(msg)
     
     def _send_to_client(self, client_socket, msg):
-        """发送消息"""
+        """发送消息（只入队，不阻塞；不要在持有 room.lock 时调用）"""
+        info = self.clients.get(client_socket)
+        if info is None:
+            return
         try:
-            data = json.dumps(msg) + '\n'
-            client_socket.sendall(data.encode('utf-8'))
+            data = self._encode(info, msg)
         except Exception as e:
-            self.log(f"发送失败: {e}")
+            self.log(f"编码失败: {e}")
+            return
+        self._send_encoded(client_socket, info, data)
+    
+    def _send_encoded(self, client_socket, info, data):
+        """把已编码的消息放进连接的发送队列"""
+        if info['outbox'].put(data):
+            self._wake_writer(client_socket)
+        elif not info['outbox'].closed:
+            self._on_queue_full(client_socket, info)
+    
+    def _wake_writer(self, client_socket):
+        """通知写端有新消息（线程版由 Outbox 的条件变量唤醒）"""
+        pass
+    
+    def _on_queue_full(self, client_socket, info):
+        """发送队列已满：按 queue_policy 断开，或清空队列改发完整快照"""
+        if self.queue_policy == 'disconnect':
+            self.log(f"客户端 {info.get('addr')} 接收过慢，断开连接")
+            self.disconnects += 1
+            info['outbox'].close()
+            self._close_connection(client_socket)
+            return
+        
+        dropped = info['outbox'].clear()
+        self.log(f"客户端 {info.get('addr')} 接收过慢，丢弃 {dropped} 条消息，改发快照")
+        room = info.get('room')
+        if room is None:
+            return
+        with room.lock:
+            snapshot = [{
+                'type': 'players_update',
+                'room_id': room.room_id,
+                'players': room.players()
+            }]
+            if room.board:
+                snapshot.append(room.state_message())
+        for msg in snapshot:
+            info['outbox'].put(self._encode(info, msg))
+        self._wake_writer(client_socket)
+    
+    def queue_stats(self):
+        """发送队列和往返时间统计：所有连接的汇总和每个连接的明细"""
+        with self.lock:
+            clients = list(self.clients.values())
+        per_client = []
+        for info in clients:
+            stats = info['outbox'].stats()
+            stats['username'] = info.get('username')
+            stats['addr'] = info.get('addr')
+            stats['rtt_ms'] = info['rtt'] * 1000 if info.get('rtt') is not None else None
+            per_client.append(stats)
+        
+        sent = sum(s['sent'] for s in per_client)
+        rtts = [s['rtt_ms'] for s in per_client if s['rtt_ms'] is not None]
+        return {
+            'clients': len(per_client),
+            'depth': sum(s['depth'] for s in per_client),
+            'max_depth': max((s['max_depth'] for s in per_client), default=0),
+            'sent': sent,
+            'dropped': sum(s['dropped'] for s in per_client),
+            'overflows': sum(s['overflows'] for s in per_client),
+            'disconnects': self.disconnects,
+            'timeouts': self.timeouts,
+            'avg_latency_ms': sum(s['avg_latency_ms'] * s['sent'] for s in per_client) / sent if sent else 0.0,
+            'max_latency_ms': max((s['max_latency_ms'] for s in per_client), default=0.0),
+            'avg_rtt_ms': sum(rtts) / len(rtts) if rtts else None,
+            'max_rtt_ms': max(rtts, default=None),
+            'per_client': per_client,
+        }
     
     def _remove_client(self, client_socket):
         """移除客户端"""
         with self.lock:
-            if client_socket in self.clients:
-                info = self.clients[client_socket]
-                self.log(f"移除玩家: {info.get('username')}")
-                del self.clients[client_socket]
+            info = self.clients.pop(client_socket, None)
         
-        try:
-            client_socket.close()
-        except:
-            pass
+        if info is not None:
+            self.log(f"移除玩家: {info.get('username')}")
+            self.matchmaker.cancel(client_socket)
+            if not self._detach_session(client_socket, info):
+                self._leave_room(client_socket, info)
+                with self.lock:
+                    if self.sessions.get(info.get('session')) is info:
+                        del self.sessions[info['session']]
+            info['outbox'].close()
+            self._wake_writer(client_socket)
         
-        self._broadcast_players()
\ No newline at end of file
+        self._close_connection(client_socket)
\ No newline at end of file
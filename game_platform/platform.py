@@ -38,6 +38,20 @@ class GamePlatform:
         self.is_recording = False
         self.replay_mode = False
         
+        # 人类思考期间AI后台预读
+        self.ponder_enabled = True
+        
+        # 最近一次AI落子的搜索统计
+        self.last_ai_stats = None
+        
+        # AI落子方式：True 为同步搜索（控制台客户端），
+        # False 为后台搜索，由界面调用 poll_ai_move 轮询结果
+        self.blocking_ai = True
+        self._ai_handle = None
+        
+        # 共享AI服务（AIService），设置后AI玩家的搜索提交给该服务
+        self.ai_service = None
+    
     def create_game(self, game_type, board_size, 
                     black_player_type='human', white_player_type='human',
                     black_ai_level=1, white_ai_level=1,
@@ -49,8 +63,8 @@ class GamePlatform:
             board_size: 棋盘大小 (8-19)
             black_player_type: 黑方类型 ('human' 或 'ai')
             white_player_type: 白方类型 ('human' 或 'ai')
-            black_ai_level: 黑方AI等级 (1-3)
-            white_ai_level: 白方AI等级 (1-3)
+            black_ai_level: 黑方AI等级 (1-4)
+            white_ai_level: 白方AI等级 (1-4)
             black_user: 黑方用户账户
             white_user: 白方用户账户
         """
@@ -60,6 +74,8 @@ class GamePlatform:
         if game_type not in self.GAME_CLASSES:
             raise ValueError("不支持的游戏类型")
         
+        self.cancel_ai_move()
+        self._stop_pondering()
         self.current_game = self.GAME_CLASSES[game_type](board_size)
         
         self._create_players(game_type, black_player_type, white_player_type,
@@ -67,6 +83,7 @@ class GamePlatform:
         
         self.undo_count = 0
         self.replay_mode = False
+        self.last_ai_stats = None
         
         self.recorder.start_recording(self.current_game, 
                                       self.black_player, self.white_player)
@@ -75,20 +92,27 @@ class GamePlatform:
         # 如果黑方是AI，自动落子
         if not self.black_player.is_human():
             self._ai_move()
+        else:
+            self._start_pondering()
     
     def _create_players(self, game_type, black_type, white_type,
                        black_ai_level, white_ai_level, black_user, white_user):
         """创建玩家"""
         if black_type == 'ai':
-            self.black_player = PlayerFactory.create_ai_player('black', black_ai_level, game_type)
+            self.black_player = self._create_ai_player('black', black_ai_level, game_type)
         else:
             self.black_player = PlayerFactory.create_human_player('black', black_user)
         
         if white_type == 'ai':
-            self.white_player = PlayerFactory.create_ai_player('white', white_ai_level, game_type)
+            self.white_player = self._create_ai_player('white', white_ai_level, game_type)
         else:
             self.white_player = PlayerFactory.create_human_player('white', white_user)
     
+    def _create_ai_player(self, color, level, game_type):
+        """创建AI玩家（使用共享AI服务时以平台实例区分对局）"""
+        return PlayerFactory.create_ai_player(color, level, game_type,
+                                              self.ai_service, id(self))
+    
     def get_current_player(self):
         """获取当前玩家"""
         if not self.current_game:
@@ -126,6 +150,12 @@ class GamePlatform:
     
     def _ai_move(self):
         """AI自动落子"""
+        if not self.blocking_ai:
+            # 后台搜索：只启动当前AI的搜索，结果由 poll_ai_move 处理
+            if self.start_ai_move() is None:
+                self._start_pondering()
+            return
+        
         while not self.current_game.game_over:
             current_player = self.get_current_player()
             
@@ -133,30 +163,107 @@ class GamePlatform:
                 break
             
             move = current_player.get_move(self.current_game)
+            self.last_ai_stats = current_player.last_stats
             
+            if not self._apply_ai_move(move):
+                break
+        
+        if self.current_game.game_over:
+            self._on_game_over()
+        else:
+            self._start_pondering()
+    
+    def _apply_ai_move(self, move):
+        """执行AI的落子（None 表示弃权），成功返回 True"""
+        try:
             if move is None:
                 # 没有合法落子，尝试弃权
-                if hasattr(self.current_game, 'pass_move'):
-                    try:
-                        self.current_game.pass_move()
-                        if self.is_recording and self.current_game.move_history:
-                            self.recorder.record_move(self.current_game,
-                                                     self.current_game.move_history[-1])
-                    except ValueError:
-                        break
-                else:
-                    break
+                if not hasattr(self.current_game, 'pass_move'):
+                    return False
+                self.current_game.pass_move()
             else:
-                try:
-                    self.current_game.make_move(move[0], move[1])
-                    if self.is_recording and self.current_game.move_history:
-                        self.recorder.record_move(self.current_game,
-                                                 self.current_game.move_history[-1])
-                except ValueError:
-                    break
+                self.current_game.make_move(move[0], move[1])
+        except ValueError:
+            return False
+        
+        if self.is_recording and self.current_game.move_history:
+            self.recorder.record_move(self.current_game,
+                                     self.current_game.move_history[-1])
+        return True
+    
+    def start_ai_move(self):
+        """轮到AI时在后台开始搜索，立即返回 SearchHandle
+        
+        已有进行中的搜索时返回该搜索的句柄；不是AI回合时返回 None。
+        """
+        if self._ai_handle is not None:
+            return self._ai_handle
+        if self.current_game is None or self.current_game.game_over or self.replay_mode:
+            return None
+        
+        current_player = self.get_current_player()
+        if current_player is None or current_player.is_human():
+            return None
+        
+        # 当前AI的预读由它自己决定沿用（命中时等待）还是取消
+        for player in (self.black_player, self.white_player):
+            if isinstance(player, AIPlayer) and player is not current_player:
+                player.stop_ponder()
+        self._ai_handle = current_player.get_move_async(self.current_game)
+        return self._ai_handle
+    
+    def poll_ai_move(self):
+        """检查后台AI搜索，完成则执行落子
+        
+        Returns:
+            bool: 本次是否执行了AI的落子
+        """
+        handle = self._ai_handle
+        if handle is None or not handle.done():
+            return False
+        
+        self._ai_handle = None
+        if handle.cancelled():
+            # 被取消（如AI服务停止）的搜索没有可用的落子，丢弃而不是当作停一手
+            return False
+        move = handle.result()
+        self.last_ai_stats = handle.stats
+        
+        if not self._apply_ai_move(move):
+            return False
         
         if self.current_game.game_over:
             self._on_game_over()
+        elif self.get_current_player().is_human():
+            self._start_pondering()
+        return True
+    
+    def cancel_ai_move(self):
+        """取消进行中的后台AI搜索（结果将被丢弃）"""
+        if self._ai_handle is not None:
+            self._ai_handle.cancel()
+            self._ai_handle = None
+    
+    def is_ai_thinking(self):
+        """是否有进行中的后台AI搜索"""
+        return self._ai_handle is not None
+    
+    def _start_pondering(self):
+        """人类玩家回合开始时，让对方AI在后台预读"""
+        if not self.ponder_enabled or self.current_game is None:
+            return
+        if self.current_game.game_over or self.replay_mode:
+            return
+        
+        for player in (self.black_player, self.white_player):
+            if isinstance(player, AIPlayer) and player.color != self.current_game.current_player:
+                player.start_ponder(self.current_game)
+    
+    def _stop_pondering(self):
+        """停止所有AI的后台预读"""
+        for player in (self.black_player, self.white_player):
+            if isinstance(player, AIPlayer):
+                player.stop_ponder()
     
     def pass_move(self):
         """虚着/弃权"""
@@ -184,6 +291,9 @@ class GamePlatform:
     
     def _on_game_over(self):
         """游戏结束处理"""
+        self.cancel_ai_move()
+        self._stop_pondering()
+        
         if self.is_recording:
             self.recorder.stop_recording(self.current_game)
             self.is_recording = False
@@ -215,8 +325,11 @@ class GamePlatform:
         if self.undo_count >= self.max_undo_count:
             raise ValueError(f"悔棋次数已达上限（{self.max_undo_count}次）")
         
+        self.cancel_ai_move()
+        self._stop_pondering()
         self.current_game.undo_move()
         self.undo_count += 1
+        self._start_pondering()
         
     def resign(self):
         """认输"""
@@ -237,6 +350,8 @@ class GamePlatform:
         if board_size is not None and not (8 <= board_size <= 19):
             raise ValueError("棋盘大小必须在8到19之间")
         
+        self.cancel_ai_move()
+        self._stop_pondering()
         self.current_game.reset(board_size)
         self.undo_count = 0
         self.replay_mode = False
@@ -247,6 +362,8 @@ class GamePlatform:
         
         if self.black_player and not self.black_player.is_human():
             self._ai_move()
+        else:
+            self._start_pondering()
     
     def save_to_file(self, filename):
         """保存游戏到文件"""
@@ -295,6 +412,8 @@ class GamePlatform:
             if game_type not in self.GAME_CLASSES:
                 raise ValueError("不支持的游戏类型")
             
+            self.cancel_ai_move()
+            self._stop_pondering()
             self.current_game = self.GAME_CLASSES[game_type](board_size)
             self.current_game.load_game(game_state)
             
@@ -321,7 +440,7 @@ class GamePlatform:
             self.black_player = PlayerFactory.create_human_player('black', user)
         else:
             level = black_data.get('ai_level', 1)
-            self.black_player = PlayerFactory.create_ai_player('black', level, game_type)
+            self.black_player = self._create_ai_player('black', level, game_type)
         
         if not white_data or white_data.get('is_human', True):
             username = white_data.get('username') if white_data else None
@@ -329,7 +448,7 @@ class GamePlatform:
             self.white_player = PlayerFactory.create_human_player('white', user)
         else:
             level = white_data.get('ai_level', 1)
-            self.white_player = PlayerFactory.create_ai_player('white', level, game_type)
+            self.white_player = self._create_ai_player('white', level, game_type)
     
     def save_replay(self, filename):
         """保存录像"""
@@ -349,6 +468,8 @@ class GamePlatform:
     
     def load_replay(self, filename):
         """加载录像进入回放模式"""
+        self.cancel_ai_move()
+        self._stop_pondering()
         self.replayer.load_replay(filename)
         self.current_game = self.replayer.game
         self.replay_mode = True
@@ -380,6 +501,7 @@ class GamePlatform:
     
     def exit_replay(self):
         """退出回放模式"""
+        self.cancel_ai_move()
         self.replay_mode = False
         self.current_game = None
     
@@ -397,7 +519,8 @@ class GamePlatform:
             'max_undo_count': self.max_undo_count,
             'black_player': self.black_player,
             'white_player': self.white_player,
-            'replay_mode': self.replay_mode
+            'replay_mode': self.replay_mode,
+            'ai_thinking': self.is_ai_thinking()
         }
         
         if self.replay_mode:
@@ -408,6 +531,9 @@ class GamePlatform:
         if hasattr(self.current_game, 'final_score'):
             state['final_score'] = self.current_game.final_score
         
+        if self.last_ai_stats is not None:
+            state['ai_stats'] = self.last_ai_stats
+        
         return state
     
     def register_user(self, username, password):
@@ -4,7 +4,12 @@
 设计模式：策略模式 - 统一处理人类玩家和AI玩家
 """
 
+import copy
+import threading
 from abc import ABC, abstractmethod
+from game_platform.ai.cache import TranspositionTable
+from game_platform.ai.handle import SearchHandle
+from game_platform.ai.stats import SearchStats
 
 
 class Player(ABC):
@@ -67,16 +72,229 @@ class GuestPlayer(HumanPlayer):
 
 
 class AIPlayer(Player):
-    """AI玩家基类"""
+    """AI玩家基类
     
-    def __init__(self, color, ai_strategy, level=1, name=None):
+    支持后台预读（ponder）：在人类玩家思考期间，预测对方的应手并提前搜索
+    己方的回应。实际走法命中预读局面时，get_move 直接返回预读结果；
+    命中的局面还在预读中时等待这次搜索完成，而不是取消后重新搜索。
+    不使用AI服务时策略带一个本地置换表，预读的搜索结果也写入其中。
+    
+    get_move_async 在后台线程中搜索并立即返回 SearchHandle，
+    可随时取消或查询当前最佳落子，界面不会因搜索而卡住。
+    
+    设置 service（AIService）后，局面提交给共享的AI服务搜索，不再使用本地
+    策略实例和后台预读。
+    """
+    
+    # 本地置换表的最大条目数
+    LOCAL_TABLE_SIZE = 10000
+    
+    def __init__(self, color, ai_strategy, level=1, name=None, service=None):
         super().__init__(color, name or f"AI-Lv{level}")
         self.ai_strategy = ai_strategy
         self.level = level
+        self.last_stats = None
+        if service is None and ai_strategy.transposition_table is None:
+            ai_strategy.transposition_table = TranspositionTable(self.LOCAL_TABLE_SIZE)
+        
+        # 共享AI服务
+        self.service = service
+        self.game_id = None      # 提交给服务时的对局标识（用于公平调度）
+        self.time_budget = None  # 每步时间预算（秒），None 使用服务默认值
         
+        # 预读状态
+        self.ponder_width = 1  # 预读的对方应手数
+        self.ponder_hits = 0
+        self._ponder_results = {}  # {(规范编码, 执子方): 规范坐标下的落子}
+        self._ponder_handle = None
+        self._ponder_thread = None
+        self._ponder_line = None   # 正在预读的 (规范编码, SearchHandle)
+        self._ponder_lock = threading.Lock()
+        self._search_lock = threading.Lock()  # 同一时刻只允许一个搜索使用策略
+    
     def get_move(self, game):
-        """获取AI的落子"""
-        return self.ai_strategy.get_move(game, self.color)
+        """获取AI的落子（优先使用预读结果）"""
+        if self.service is not None:
+            handle = self.get_move_async(game)
+            move = handle.result()
+            self.last_stats = handle.stats
+            return move
+        return self._search_move(game)
+    
+    def get_move_async(self, game):
+        """在后台线程中搜索落子，立即返回 SearchHandle
+        
+        搜索使用局面的副本，调用方之后修改 game 不影响搜索。
+        """
+        if self.service is not None:
+            game_id = self.game_id if self.game_id is not None else id(self)
+            handle = self.service.submit(game, self.color, self.level, game_id,
+                                         self.time_budget)
+            handle.add_done_callback(self._on_service_done)
+            return handle
+        
+        handle = SearchHandle()
+        thread = threading.Thread(target=self._run_search,
+                                  args=(copy.deepcopy(game), handle))
+        thread.daemon = True
+        thread.start()
+        return handle
+    
+    def _run_search(self, game, handle):
+        """后台搜索线程"""
+        try:
+            move = self._search_move(game, handle)
+        except Exception as e:
+            handle.set_exception(e)
+        else:
+            handle.stats = self.last_stats
+            handle.set_result(move)
+    
+    def _on_service_done(self, handle):
+        """AI服务完成搜索的回调"""
+        if handle.stats is not None:
+            self.last_stats = handle.stats
+    
+    def _search_move(self, game, handle=None):
+        """搜索落子（优先使用预读结果）"""
+        move = self._lookup_ponder(game)
+        if move is None:
+            move = self._wait_ponder(game, handle)
+        self.stop_ponder()
+        
+        if move is None:
+            with self._search_lock:
+                # 预读线程可能刚好完成了当前局面的搜索
+                move = self._lookup_ponder(game)
+                if move is None:
+                    move = self.ai_strategy.search(game, self.color, handle)
+                    self.last_stats = self.ai_strategy.stats
+                    return move
+        
+        self.ponder_hits += 1
+        self.last_stats = SearchStats()
+        self.last_stats.move = move
+        self.last_stats.ponder_hit = True
+        return move
+    
+    def start_ponder(self, game):
+        """对方回合开始时启动后台预读"""
+        self.stop_ponder()
+        # 使用共享AI服务时不预读，避免占用其他对局的计算资源
+        if self.service is not None:
+            return
+        if game.game_over or game.current_player == self.color:
+            return
+        
+        self._ponder_results = {}
+        self._ponder_handle = SearchHandle()
+        self._ponder_thread = threading.Thread(
+            target=self._ponder,
+            args=(copy.deepcopy(game), self._ponder_handle, self._ponder_results))
+        self._ponder_thread.daemon = True
+        self._ponder_thread.start()
+    
+    def stop_ponder(self):
+        """停止后台预读（不等待线程结束，正在进行的搜索会被取消）"""
+        with self._ponder_lock:
+            if self._ponder_handle is not None:
+                self._ponder_handle.cancel()
+                self._ponder_handle = None
+            if self._ponder_line is not None:
+                self._ponder_line[1].cancel()
+                self._ponder_line = None
+        self._ponder_thread = None
+    
+    def is_pondering(self):
+        """是否正在预读"""
+        return self._ponder_thread is not None and self._ponder_thread.is_alive()
+    
+    def _ponder(self, game, handle, results):
+        """预读线程：预测对方应手，并搜索每个应手之后己方的最佳落子"""
+        opponent = game.current_player
+        strategy = self.ai_strategy
+        
+        with self._search_lock:
+            if handle.cancelled():
+                return
+            # 用廉价的走法排序预测对方应手，不做完整搜索
+            predicted = strategy.predict_moves(game, opponent, self.ponder_width)
+        
+        for row, col in predicted:
+            if handle.cancelled():
+                return
+            
+            line = copy.deepcopy(game)
+            try:
+                line.make_move(row, col)
+            except ValueError:
+                continue
+            if line.game_over or line.current_player != self.color:
+                continue
+            
+            # 每条预读线单独一个句柄：实际走法命中这条线时 get_move 等待它完成
+            key, transform = line.board.get_canonical_key()
+            line_handle = SearchHandle()
+            with self._ponder_lock:
+                if handle.cancelled():
+                    return
+                self._ponder_line = (key, line_handle)
+            
+            canonical_move = None
+            try:
+                with self._search_lock:
+                    if not line_handle.cancelled():
+                        move = strategy.search(line, self.color, line_handle)
+                        # 被取消的搜索结果不完整，不保存
+                        if move is not None and not line_handle.cancelled():
+                            canonical_move = line.board.transform_position(
+                                move[0], move[1], transform)
+                            results[(key, self.color)] = canonical_move
+            finally:
+                with self._ponder_lock:
+                    if self._ponder_line is not None and self._ponder_line[1] is line_handle:
+                        self._ponder_line = None
+                line_handle.set_result(canonical_move)
+    
+    def _wait_ponder(self, game, handle=None):
+        """当前局面正在预读时等待该搜索完成并返回其落子，否则返回 None"""
+        with self._ponder_lock:
+            line = self._ponder_line
+        if line is None:
+            return None
+        key, transform = game.board.get_canonical_key()
+        line_key, line_handle = line
+        if line_key != key:
+            return None
+        
+        # 调用方取消本次搜索时一并取消预读
+        while not line_handle.wait(0.05):
+            if handle is not None and handle.cancelled():
+                line_handle.cancel()
+        canonical_move = line_handle.result()
+        if canonical_move is None:
+            return None
+        move = game.board.inverse_transform_position(
+            canonical_move[0], canonical_move[1], transform)
+        if move not in game.get_valid_moves():
+            return None
+        return move
+    
+    def _lookup_ponder(self, game):
+        """查找当前局面的预读结果"""
+        if not self._ponder_results:
+            return None
+        
+        key, transform = game.board.get_canonical_key()
+        canonical_move = self._ponder_results.get((key, self.color))
+        if canonical_move is None:
+            return None
+        
+        move = game.board.inverse_transform_position(
+            canonical_move[0], canonical_move[1], transform)
+        if move not in game.get_valid_moves():
+            return None
+        return move
     
     def is_human(self):
         return False
@@ -102,8 +320,10 @@ class PlayerFactory:
         return player
     
     @staticmethod
-    def create_ai_player(color, level, game_type):
-        """创建AI玩家"""
+    def create_ai_player(color, level, game_type, service=None, game_id=None):
+        """创建AI玩家（可指定共享的AI服务）"""
         from game_platform.ai import AIFactory
         ai_strategy = AIFactory.create_ai(game_type, level)
-        return AIPlayer(color, ai_strategy, level)
\ No newline at end of file
+        player = AIPlayer(color, ai_strategy, level, service=service)
+        player.game_id = game_id
+        return player
\ No newline at end of file
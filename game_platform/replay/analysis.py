@@ -0,0 +1,276 @@
+# game_platform/replay/analysis.py
+"""
+录像批量分析：为每一步标注AI推荐的落子和评分
+
+逐个读取录像文件，按规范局面去重（对称等价的局面只分析一次），
+再分发给进程池中的AI工作进程。结果按录像写入旁路文件
+（game.replay 对应 game.analysis.jsonl），每分析完一个局面立即追加，
+中断后重新运行会跳过已标注的步数。
+
+只分析落子的步数，虚着和认输不标注。规范局面由棋盘编码、执子方和
+（围棋的）劫争禁着点组成；提子数、连续虚着数等其余历史不在其中，
+这些不同但棋子相同的局面会被当作同一局面只分析一次。
+
+用法:
+    python -m game_platform.replay.analysis replays/*.replay --level 3 --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from game_platform.ai.factory import AIFactory
+from game_platform.board import Board, GomokuBoard
+from game_platform.game import GAME_CLASSES
+from game_platform.replay.replayer import GameReplayer
+
+
+# 编码字符到棋子颜色
+_CHAR_STONES = {char: stone for stone, char in Board.STONE_CHARS.items()}
+
+# 坐标变换只与棋盘大小有关，按大小缓存一个棋盘用于变换 {size: Board}
+_transform_boards = {}
+
+# 每个工作进程内缓存的AI实例 {(game_type, level, options): AIStrategy}
+_worker_strategies = {}
+
+
+def analysis_path(replay_path):
+    """录像对应的分析旁路文件路径"""
+    base = replay_path[:-len('.replay')] if replay_path.endswith('.replay') else replay_path
+    return base + '.analysis.jsonl'
+
+
+def iter_positions(replay_path):
+    """按步遍历录像中每一步落子前的局面（虚着、认输等非落子记录跳过）
+    
+    Yields:
+        dict: ply（步数，从1开始）、player（执子方）、played（实际落子）、
+        game_type、board_size、key（规范局面编码）、transform（到规范局面的变换）、
+        ko（规范局面上的劫争禁着点，没有为 None）
+    """
+    replayer = GameReplayer()
+    replayer.load_replay(replay_path)
+    metadata = replayer.get_metadata()
+    board = replayer.get_current_board()
+    ko_point = None
+    
+    for ply in range(1, replayer.get_total_steps() + 1):
+        record = replayer.get_step_info(ply)
+        is_move = record.get('type', 'move') == 'move' and record.get('row') is not None
+        if is_move:
+            key, transform = board.get_canonical_key()
+            ko = None
+            if ko_point is not None:
+                ko = board.transform_position(ko_point[0], ko_point[1], transform)
+            yield {
+                'ply': ply,
+                'player': record['player'],
+                'played': (record['row'], record['col']),
+                'game_type': metadata['game_type'],
+                'board_size': metadata['board_size'],
+                'key': key,
+                'transform': transform,
+                'ko': ko,
+            }
+        # 与 GoGame.make_move 相同：只提一子时该点下一步不能立即提回
+        captured = record.get('captured') if is_move else None
+        ko_point = tuple(captured[0]) if captured and len(captured) == 1 else None
+        replayer.next_step()
+
+
+def game_from_key(game_type, board_size, key, color, ko=None):
+    """由局面编码构造游戏实例（执子方为 color，ko 为围棋的劫争禁着点）"""
+    game = GAME_CLASSES[game_type](board_size)
+    grid = game.board.grid
+    for index, char in enumerate(key):
+        row, col = divmod(index, board_size)
+        grid[row][col] = _CHAR_STONES[char]
+    game.current_player = color
+    if ko is not None:
+        game.ko_point = ko
+    return game
+
+
+def _analyze_task(task):
+    """进程池任务：分析一个规范局面"""
+    game_type, board_size, key, ko, color, level, options = task
+    strategy_key = (game_type, level, options)
+    strategy = _worker_strategies.get(strategy_key)
+    if strategy is None:
+        strategy = AIFactory.create_ai(game_type, level, **dict(options))
+        _worker_strategies[strategy_key] = strategy
+    
+    game = game_from_key(game_type, board_size, key, color, ko)
+    move = strategy.search(game, color)
+    stats = strategy.stats
+    return task, move, stats.score, stats.nodes, stats.time_spent
+
+
+def load_analysis(replay_path):
+    """读取录像的分析结果
+    
+    Returns:
+        tuple: (header, {ply: 标注})。文件不存在时为 (None, {})，
+        末尾未写完的行（中断时）会被忽略。
+    """
+    path = analysis_path(replay_path)
+    header = None
+    annotations = {}
+    if not os.path.exists(path):
+        return header, annotations
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry.get('type') == 'header':
+                header = entry
+            else:
+                annotations[entry['ply']] = entry
+    return header, annotations
+
+
+class _SidecarWriter:
+    """一个录像的分析旁路文件（追加写入）"""
+    
+    def __init__(self, replay_path, header, resume):
+        self.path = analysis_path(replay_path)
+        # 续写前先截掉中断时未写完的最后一行
+        self._truncate_partial_line()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if not resume:
+            self.write(header)
+    
+    def _truncate_partial_line(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+    
+    def write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+
+
+def analyze_replays(paths, level=3, options=None, workers=None, on_progress=None):
+    """批量分析录像
+    
+    Args:
+        paths: 录像文件路径列表
+        level: AI等级
+        options: 传给AI构造函数的参数
+        workers: 进程数（默认CPU核数）
+        on_progress: 每分析完一个局面后的回调，参数为 (已完成数, 总数)
+    
+    Returns:
+        dict: 统计（局面数、去重后的局面数、跳过的已标注步数、用时等）
+    """
+    options = tuple(sorted((options or {}).items()))
+    header = {'type': 'header', 'level': level, 'options': dict(options)}
+    
+    # 收集待分析的局面：{任务: [(录像, 步信息), ...]}
+    pending = {}
+    writers = {}
+    total_plies = 0
+    skipped = 0
+    for path in paths:
+        old_header, done = load_analysis(path)
+        resume = old_header is not None and old_header.get('level') == level \
+            and old_header.get('options') == header['options']
+        if not resume:
+            done = {}
+        writers[path] = _SidecarWriter(path, header, resume)
+        
+        for position in iter_positions(path):
+            total_plies += 1
+            if position['ply'] in done:
+                skipped += 1
+                continue
+            task = (position['game_type'], position['board_size'], position['key'],
+                    position['ko'], position['player'], level, options)
+            pending.setdefault(task, []).append((path, position))
+    
+    start = time.perf_counter()
+    nodes = 0
+    workers = workers or os.cpu_count() or 1
+    tasks = list(pending)
+    try:
+        if tasks:
+            chunksize = max(1, min(16, len(tasks) // (workers * 4)))
+            with multiprocessing.Pool(workers) as pool:
+                results = pool.imap_unordered(_analyze_task, tasks, chunksize)
+                for finished, (task, move, score, task_nodes, seconds) in enumerate(results, 1):
+                    nodes += task_nodes
+                    for path, position in pending[task]:
+                        writers[path].write(_annotation(position, move, score, task_nodes, seconds))
+                    if on_progress:
+                        on_progress(finished, len(tasks))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    
+    return {
+        'files': len(paths),
+        'plies': total_plies,
+        'skipped': skipped,
+        'positions': len(tasks),
+        'duplicates': total_plies - skipped - len(tasks),
+        'nodes': nodes,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _annotation(position, canonical_move, score, nodes, seconds):
+    """将规范局面上的分析结果映射回原局面，生成一步的标注"""
+    best = None
+    if canonical_move is not None:
+        size = position['board_size']
+        board = _transform_boards.get(size)
+        if board is None:
+            board = _transform_boards[size] = GomokuBoard(size)
+        best = list(board.inverse_transform_position(
+            canonical_move[0], canonical_move[1], position['transform']))
+    played = position['played']
+    return {
+        'ply': position['ply'],
+        'player': position['player'],
+        'played': list(played) if played else None,
+        'best': best,
+        'score': score,
+        'matched': played is not None and best == list(played),
+        'nodes': nodes,
+        'seconds': round(seconds, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录像批量分析")
+    parser.add_argument('replays', nargs='+', help="录像文件")
+    parser.add_argument('--level', type=int, default=3, help="AI等级")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认CPU核数）")
+    args = parser.parse_args(argv)
+    
+    def progress(finished, total):
+        if finished % 20 == 0 or finished == total:
+            print(f"已分析 {finished}/{total} 个局面")
+    
+    summary = analyze_replays(args.replays, args.level, workers=args.workers,
+                              on_progress=progress)
+    print(f"{summary['files']} 个录像, {summary['plies']} 步: "
+          f"跳过已标注 {summary['skipped']}, 重复局面 {summary['duplicates']}, "
+          f"分析 {summary['positions']} 个局面")
+    print(f"用时 {summary['seconds']:.1f}s, 节点 {summary['nodes']}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
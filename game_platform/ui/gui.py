@@ -249,7 +249,7 @@ class NewGameDialog(tk.Toplevel):
         tk.Label(frame, text="AI等级:").grid(row=2, column=3)
         self.black_ai_level = tk.IntVar(value=2)
         self.black_level_combo = ttk.Combobox(frame, textvariable=self.black_ai_level, 
-                                              values=[1, 2, 3], width=3, state='disabled')
+                                              values=[1, 2, 3, 4], width=3, state='disabled')
         self.black_level_combo.grid(row=2, column=4)
         
         # 白方设置
@@ -263,11 +263,11 @@ class NewGameDialog(tk.Toplevel):
         tk.Label(frame, text="AI等级:").grid(row=3, column=3)
         self.white_ai_level = tk.IntVar(value=2)
         self.white_level_combo = ttk.Combobox(frame, textvariable=self.white_ai_level,
-                                              values=[1, 2, 3], width=3, state='disabled')
+                                              values=[1, 2, 3, 4], width=3, state='disabled')
         self.white_level_combo.grid(row=3, column=4)
         
         # AI等级说明
-        tk.Label(frame, text="AI等级: 1=随机, 2=评估函数, 3=MCTS", 
+        tk.Label(frame, text="AI等级: 1=随机, 2=评估函数, 3=MCTS, 4=UCT(仅五子棋)", 
                 font=('Arial', 8), fg='gray').grid(row=4, column=0, columnspan=5, pady=5)
         
         # 按钮
@@ -599,6 +599,7 @@ class GameGUI:
         self.window.resizable(True, True)
         
         self.platform = GamePlatform()
+        self.platform.blocking_ai = False  # AI在后台线程搜索，界面轮询结果
         self.canvas = None
         self.control_panel = None
         self.replay_dialog = None
@@ -612,6 +613,9 @@ class GameGUI:
         self.server = None
         self.network_move_count = 0
         
+        # 轮询AI搜索结果的定时任务
+        self._ai_poll_job = None
+        
         self._setup_menu()
         self._setup_main_layout()
         self._setup_status_bar()
@@ -660,6 +664,7 @@ class GameGUI:
         menubar.add_cascade(label="网络对战", menu=network_menu)
         network_menu.add_command(label="创建房间(服务器)", command=self._start_server)
         network_menu.add_command(label="加入房间(客户端)", command=self._connect_to_server)
+        network_menu.add_command(label="快速匹配", command=self._quick_match)
         network_menu.add_separator()
         network_menu.add_command(label="断开连接", command=self._disconnect_network)
         
@@ -796,7 +801,7 @@ class GameGUI:
 
 
     def _check_ai_turn(self):
-        """检查是否轮到AI落子 - 修复版：逐步显示"""
+        """检查是否轮到AI落子，是则启动后台搜索并轮询结果"""
         if not self.platform.current_game:
             return
         if self.platform.current_game.game_over:
@@ -819,58 +824,67 @@ class GameGUI:
             ai_name = f"AI Lv.{player.level}" if hasattr(player, 'level') else "AI"
             color_name = "黑方" if current_player == 'black' else "白方"
             self.status_bar.config(text=f"{color_name} {ai_name} 正在思考...")
-            self.window.update()  # 强制更新UI
             
-            # 使用 after 延迟执行AI落子，让UI有时间更新
-            self.window.after(100, self._execute_ai_move)
+            # AI在后台线程搜索，界面定时轮询，不阻塞Tk事件循环
+            self.platform.start_ai_move()
+            self._schedule_ai_poll(50)
 
+    def _schedule_ai_poll(self, delay):
+        """安排轮询AI搜索结果（同一时刻只保留一个轮询任务）"""
+        if self._ai_poll_job is not None:
+            self.window.after_cancel(self._ai_poll_job)
+        self._ai_poll_job = self.window.after(delay, self._execute_ai_move)
 
     def _execute_ai_move(self):
-        """执行AI落子 - 分离出来以便异步调用"""
+        """轮询后台AI搜索，完成后显示落子"""
+        self._ai_poll_job = None
         if not self.platform.current_game:
             return
         if self.platform.current_game.game_over:
             return
+        # 搜索已被取消（悔棋、认输、新游戏等）
+        if not self.platform.is_ai_thinking():
+            return
         
-        state = self.platform.get_game_state()
-        current_player = state['current_player']
+        current_player = self.platform.current_game.current_player
+        try:
+            if not self.platform.poll_ai_move():
+                if self.platform.is_ai_thinking():
+                    self._schedule_ai_poll(50)
+                else:
+                    self.status_bar.config(text="AI无法落子")
+                return
+        except Exception as e:
+            self.status_bar.config(text=f"AI出错: {e}")
+            import traceback
+            traceback.print_exc()
+            return
         
-        if current_player == 'black':
-            player = state.get('black_player')
+        # 记录到历史
+        last_move = self.platform.current_game.move_history[-1]
+        move_num = len(self.platform.current_game.move_history)
+        if last_move.get('row') is None:
+            self.control_panel.add_pass_to_history(move_num, current_player)
         else:
-            player = state.get('white_player')
+            self.control_panel.add_move_to_history(move_num, current_player,
+                                                   last_move['row'], last_move['col'])
         
-        if player and not player.is_human():
-            try:
-                # 获取AI的落子
-                move = player.get_move(self.platform.current_game)
-                
-                if move:
-                    row, col = move
-                    # 执行落子
-                    self.platform.make_move(row, col)
-                    
-                    # 记录到历史
-                    move_num = len(self.platform.current_game.move_history)
-                    self.control_panel.add_move_to_history(move_num, current_player, row, col)
-                    
-                    # 更新显示
-                    self._update_display()
-                    
-                    # 检查游戏是否结束
-                    if self.platform.current_game.game_over:
-                        self._show_game_over()
-                    else:
-                        # 延迟500ms后检查下一个AI（让玩家能看到棋子）
-                        self.window.after(500, self._check_ai_turn)
-                else:
-                    self.status_bar.config(text="AI无法落子")
-                    
-            except Exception as e:
-                self.status_bar.config(text=f"AI出错: {e}")
-                import traceback
-                traceback.print_exc()
+        # 更新显示
+        self._update_display()
+        self._show_ai_stats(self.platform.last_ai_stats)
+        
+        # 检查游戏是否结束
+        if self.platform.current_game.game_over:
+            self._show_game_over()
+        else:
+            # 延迟500ms后检查下一个AI（让玩家能看到棋子）
+            self.window.after(500, self._check_ai_turn)
                 
+    def _show_ai_stats(self, stats):
+        """在状态栏显示AI落子的搜索统计"""
+        if stats is not None:
+            self.status_bar.config(text=f"AI落子: {stats.summary()}")
+    
     def _update_display(self):
         """更新显示"""
         if not self.platform.current_game:
@@ -1527,6 +1541,116 @@ class GameGUI:
         
         dialog.protocol("WM_DELETE_WINDOW", disconnect_and_close)
     
+    def _quick_match(self):
+        """快速匹配：连接服务器后进入匹配队列，按等级分自动配对开局"""
+        if not self.current_user:
+            messagebox.showwarning("提示", "请先登录账号才能匹配！")
+            return
+        
+        from game_platform.network.client import NetworkClient
+        
+        dialog = tk.Toplevel(self.window)
+        dialog.title("快速匹配")
+        dialog.transient(self.window)
+        
+        frame = tk.Frame(dialog, padx=20, pady=20)
+        frame.pack()
+        
+        tk.Label(frame, text="服务器地址:").grid(row=0, column=0, sticky='e', pady=5)
+        host_entry = tk.Entry(frame, width=15)
+        host_entry.insert(0, "localhost")
+        host_entry.grid(row=0, column=1, columnspan=3, sticky='w', pady=5)
+        
+        tk.Label(frame, text="端口:").grid(row=1, column=0, sticky='e', pady=5)
+        port_entry = tk.Entry(frame, width=15)
+        port_entry.insert(0, "9999")
+        port_entry.grid(row=1, column=1, columnspan=3, sticky='w', pady=5)
+        
+        tk.Label(frame, text="游戏类型:").grid(row=2, column=0, sticky='e')
+        game_type_var = tk.StringVar(value='gomoku')
+        tk.Radiobutton(frame, text="五子棋", variable=game_type_var, value='gomoku').grid(row=2, column=1)
+        tk.Radiobutton(frame, text="围棋", variable=game_type_var, value='go').grid(row=2, column=2)
+        tk.Radiobutton(frame, text="黑白棋", variable=game_type_var, value='othello').grid(row=2, column=3)
+        
+        tk.Label(frame, text="棋盘大小:").grid(row=3, column=0, sticky='e', pady=10)
+        size_var = tk.IntVar(value=15)
+        tk.Spinbox(frame, from_=8, to=19, textvariable=size_var, width=5).grid(row=3, column=1, sticky='w')
+        
+        status_label = tk.Label(frame, text="", fg='blue')
+        status_label.grid(row=4, column=0, columnspan=4, pady=5)
+        
+        check_match_job = [None]
+        
+        def check_match_update():
+            client = self.network_client
+            if not client or not client.connected:
+                return
+            if client.color:
+                color_name = "黑" if client.color == 'black' else "白"
+                opponent = client.players.get('white' if client.color == 'black' else 'black', '')
+                status_label.config(text=f"匹配成功! 对手 {opponent}，你是 {color_name} 方", fg='green')
+                self.status_bar.config(text=f"匹配成功，你是{color_name}方")
+                return
+            check_match_job[0] = dialog.after(300, check_match_update)
+        
+        def start_match():
+            host = host_entry.get().strip()
+            port = port_entry.get().strip()
+            if not host or not port:
+                messagebox.showerror("错误", "请输入服务器地址和端口")
+                return
+            
+            try:
+                status_label.config(text="正在连接...", fg='blue')
+                dialog.update()
+                
+                if self.network_client:
+                    self.network_client.disconnect()
+                self.network_client = NetworkClient()
+                self.network_client.on_message = self._on_network_message
+                self.network_client.on_state_update = self._on_network_state_update
+                self.network_client.on_game_start = self._on_network_game_start
+                self.network_client.on_game_over = self._on_network_game_over
+                self.network_client.on_undo_request = self._on_network_undo_request
+                
+                self.network_client.connect(host, port, self.current_user.username, join=False)
+                self.network_client.find_match(game_type_var.get(), size_var.get())
+                self.network_mode = True
+                self.network_move_count = 0
+                self.control_panel.clear_history()
+                
+                status_label.config(text=f"正在匹配 ({self.current_user.wins}胜/{self.current_user.games}场)...", fg='blue')
+                check_match_job[0] = dialog.after(300, check_match_update)
+            
+            except Exception as e:
+                status_label.config(text=f"连接失败: {e}", fg='red')
+                self.network_client = None
+                self.network_mode = False
+        
+        def cancel_and_close():
+            if check_match_job[0]:
+                try:
+                    dialog.after_cancel(check_match_job[0])
+                except:
+                    pass
+            
+            # 已配对开局的保留连接，只取消还在排队的
+            if self.network_client and not self.network_client.color:
+                self.network_client.cancel_match()
+                self.network_client.disconnect()
+                self.network_client = None
+                self.network_mode = False
+            dialog.destroy()
+        
+        btn_frame = tk.Frame(frame)
+        btn_frame.grid(row=5, column=0, columnspan=4, pady=15)
+        
+        tk.Button(btn_frame, text="开始匹配", command=start_match,
+                bg='#4CAF50', fg='white', width=8).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="关闭", command=cancel_and_close, width=8).pack(side=tk.LEFT, padx=5)
+        
+        dialog.protocol("WM_DELETE_WINDOW", cancel_and_close)
+    
     def _disconnect_network(self):
         """断开网络连接"""
         if hasattr(self, 'network_client') and self.network_client: